@@ -29,6 +29,13 @@ def create_app() -> Flask:
     app.register_blueprint(public_bp)
     app.register_blueprint(api_bp)
 
+    # Scheduled campaign transitions + CLI
+    from .services.scheduler import init_scheduler
+    from .commands import register_commands
+
+    init_scheduler(app)
+    register_commands(app)
+
     # Jinja filters: Mexico local time
     app.jinja_env.filters["mx_dt"] = lambda dt, fmt="%Y-%m-%d %H:%M": fmt_dt_local(dt, app.config.get("TIME_ZONE"), fmt)
     app.jinja_env.filters["mx_dt_input"] = lambda dt: fmt_dt_input_local(dt, app.config.get("TIME_ZONE"))
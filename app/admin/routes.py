@@ -1,39 +1,40 @@
 #routes.py
 
-import csv
 import io
 import json
-from datetime import datetime
+import os
+import re
+import tempfile
+import uuid
+from datetime import datetime, timedelta
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file, abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file, abort, stream_with_context
 from flask_login import login_required, logout_user
+from sqlalchemy.orm import joinedload
 
 from ..extensions import db
-from ..models import Area, Survey, Campaign, Response
-
-
-# Auto state sync for scheduled campaigns (UTC naive)
-def sync_campaign_activity(now=None):
-    if now is None:
-        now = datetime.utcnow()
-    changed = False
-    qs = Campaign.query.filter((Campaign.start_at.isnot(None)) | (Campaign.end_at.isnot(None))).all()
-    for c in qs:
-        if c.end_at and now > c.end_at:
-            if c.is_active:
-                c.is_active = False
-                changed = True
-            continue
-        if c.start_at and now >= c.start_at:
-            if not c.is_active:
-                c.is_active = True
-                changed = True
-    if changed:
-        db.session.commit()
-
-from ..services.analytics import compute_campaign_analytics
-from ..services.pdf import build_campaign_pdf
-from ..services.excel import import_areas_from_excel
+from ..models import Area, Survey, Campaign, CampaignArtifact, ExportJob, Response, ResponseComment
+from ..services.area_catalog import invalidate_area_catalog
+from ..services.campaign_cache import invalidate_campaign
+from ..services.analytics import parse_sections
+from ..services.analytics_cache import analytics_cache_stats, get_campaign_analytics, invalidate_analytics
+from ..services.artifacts import (
+    ARTIFACT_KINDS, artifact_file, artifact_info, finalize_campaign, frozen_analytics, get_artifact,
+    invalidate_artifacts, is_closed, list_artifacts,
+)
+from ..services.bundles import bundle_status, iter_bundle_zip, select_campaigns
+from ..services.chart_cache import chart_cache_stats
+from ..services.comment_search import highlight_html, search_comments
+from ..services.comments import forget_text_questions, question_label, text_questions
+from ..services.rollups import COMMENTS, forget_campaign, rollup_count
+from ..services.csv_export import gzip_stream, iter_responses_csv, iter_wide_csv
+# services.pdf (reportlab) and services.excel (openpyxl) are imported in the
+# views that use them, so workers do not load them until the first export
+from ..services.export_jobs import (
+    EXPORT_KINDS, artifact_path, delete_campaign_exports, job_status, remove_files, submit_export,
+)
+from ..services.group_commit import get_buffer
+from ..utils.pagination import keyset_page
 from ..utils.time import local_naive_to_utc_naive, fmt_dt_local
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -79,6 +80,7 @@ def areas_create():
     a = Area(name=name, is_active=True)
     db.session.add(a)
     db.session.commit()
+    invalidate_area_catalog()
     flash('Área creada.', 'success')
     return redirect(url_for('admin.areas_list'))
 
@@ -89,6 +91,7 @@ def areas_toggle(area_id: int):
     a = Area.query.get_or_404(area_id)
     a.is_active = not a.is_active
     db.session.commit()
+    invalidate_area_catalog()
     return redirect(url_for('admin.areas_list'))
 
 
@@ -99,9 +102,12 @@ def areas_import():
     if not f:
         flash('Selecciona un archivo Excel.', 'error')
         return redirect(url_for('admin.areas_list'))
+    from ..services.excel import import_areas_from_excel
+
     try:
         created, skipped = import_areas_from_excel(f.stream)
         db.session.commit()
+        invalidate_area_catalog()
         flash(f'Importación completa. Nuevas: {created}, Omitidas: {skipped}', 'success')
     except Exception as e:
         db.session.rollback()
@@ -369,7 +375,7 @@ def surveys_delete(survey_id: int):
 @bp.get('/campaigns')
 @login_required
 def campaigns_list():
-    sync_campaign_activity(datetime.utcnow())
+    now = datetime.utcnow()
     # Filters
     page = max(int(request.args.get('page', 1) or 1), 1)
     per_page = 10
@@ -384,9 +390,9 @@ def campaigns_list():
         query = query.filter((Campaign.name.ilike(like)) | (Campaign.token.ilike(like)))
 
     if status == 'active':
-        query = query.filter(Campaign.is_active.is_(True))
+        query = query.filter(Campaign.active_at_clause(now))
     elif status == 'inactive':
-        query = query.filter(Campaign.is_active.is_(False))
+        query = query.filter(~Campaign.active_at_clause(now))
 
     if category != 'ALL':
         query = query.filter(Survey.category == category)
@@ -407,6 +413,7 @@ def campaigns_list():
         categories=categories,
         filters={'q': q, 'status': status, 'category': category},
         pagination={'page': page, 'pages': pages, 'total': total, 'per_page': per_page},
+        now=now,
     )
 
 
@@ -455,6 +462,7 @@ def campaigns_create():
 
     db.session.add(c)
     db.session.commit()
+    invalidate_campaign(c.token)
     flash('Campaña creada (snapshot). Ahora puedes activarla.', 'success')
     return redirect(url_for('admin.campaigns_list'))
 
@@ -465,6 +473,8 @@ def campaigns_toggle(campaign_id: int):
     c = Campaign.query.get_or_404(campaign_id)
     c.is_active = not c.is_active
     db.session.commit()
+    invalidate_campaign(c.token)
+    invalidate_artifacts(c.id)
     return redirect(url_for('admin.campaigns_list'))
 
 
@@ -502,6 +512,9 @@ def campaigns_edit_post(campaign_id: int):
     c.require_shift = bool(request.form.get('require_shift'))
 
     db.session.commit()
+    invalidate_campaign(c.token)
+    # name/window may have changed: rebuilt by the transition job if still closed
+    invalidate_artifacts(c.id)
     flash('Campaña actualizada.', 'success')
     return redirect(url_for('admin.campaigns_list'))
 
@@ -510,32 +523,64 @@ def campaigns_edit_post(campaign_id: int):
 @login_required
 def campaigns_report(campaign_id: int):
     c = Campaign.query.get_or_404(campaign_id)
-    return render_template('admin/report.html', campaign=c, shifts=current_app.config['SHIFTS'])
+    return render_template('admin/report.html', campaign=c, shifts=current_app.config['SHIFTS'],
+                           closed=is_closed(c), artifacts=list_artifacts(c.id))
 
 
 @bp.get('/api/campaigns/<int:campaign_id>/analytics')
 @login_required
 def api_campaign_analytics(campaign_id: int):
     c = Campaign.query.get_or_404(campaign_id)
-    data = compute_campaign_analytics(c)
+    try:
+        sections = parse_sections(request.args.get('sections'))
+    except ValueError:
+        return {'error': 'invalid_sections'}, 400
+    data = frozen_analytics(c, sections)
+    if data is None:
+        data = get_campaign_analytics(c, sections)
     return data
 
 
+@bp.get('/api/analytics/cache/stats')
+@login_required
+def api_analytics_cache_stats():
+    """Analytics result cache counters of this worker."""
+    return analytics_cache_stats()
+
+
+@bp.get('/api/charts/cache/stats')
+@login_required
+def api_chart_cache_stats():
+    """PDF chart image cache counters (memory: this worker; disk: shared)."""
+    return chart_cache_stats()
+
+
+@bp.get('/api/ingest/stats')
+@login_required
+def api_ingest_stats():
+    """Group-commit counters of this worker (batch size, flush latency, queue depth)."""
+    if not current_app.config['SUBMIT_GROUP_COMMIT']:
+        return {'enabled': False}
+    return {'enabled': True, **get_buffer(current_app._get_current_object()).stats()}
+
+
+def _cursor_args():
+    per_page = min(max(int(request.args.get('per_page', 10) or 10), 1), 50)
+    return (request.args.get('cursor') or None), per_page
+
 
 @bp.get('/api/campaigns/<int:campaign_id>/responses')
 @login_required
 def api_campaign_responses(campaign_id: int):
     c = Campaign.query.get_or_404(campaign_id)
-    page = max(int(request.args.get('page', 1) or 1), 1)
-    per_page = min(max(int(request.args.get('per_page', 10) or 10), 1), 50)
+    cursor, per_page = _cursor_args()
 
-    q = Response.query.filter_by(campaign_id=c.id)
-    total = q.count()
-    pages = max((total + per_page - 1) // per_page, 1)
-    if page > pages:
-        page = pages
+    q = Response.query.options(joinedload(Response.area)).filter(Response.campaign_id == c.id)
+    try:
+        rows, next_cursor = keyset_page(q, Response.submitted_at, Response.id, cursor, per_page)
+    except ValueError:
+        return {'error': 'invalid_cursor'}, 400
 
-    rows = q.order_by(Response.submitted_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
     items = []
     for r in rows:
         items.append({
@@ -551,106 +596,103 @@ def api_campaign_responses(campaign_id: int):
 
     return {
         'items': items,
-        'page': page,
         'per_page': per_page,
-        'total': total,
-        'pages': pages,
+        'next_cursor': next_cursor,
+        'total': rollup_count(c.id, 'total'),
     }
 
 
-def _extract_text_comments(snapshot: dict, answers: dict, lang: str) -> list:
-    """Return list of {question, text} for non-empty text answers.
+@bp.get('/api/campaigns/<int:campaign_id>/comments')
+@login_required
+def api_campaign_comments(campaign_id: int):
+    c = Campaign.query.get_or_404(campaign_id)
+    cursor, per_page = _cursor_args()
 
-    Snapshot formats supported:
-      - snapshot['questions'] (legacy)
-      - snapshot['schema']['questions'] (current)
+    q = ResponseComment.query.options(joinedload(ResponseComment.area)).filter(ResponseComment.campaign_id == c.id)
+    try:
+        rows, next_cursor = keyset_page(q, ResponseComment.submitted_at, ResponseComment.id, cursor, per_page)
+    except ValueError:
+        return {'error': 'invalid_cursor'}, 400
 
-    Answer formats supported:
-      - string (preferred)
-      - dict with 'text' or 'value' (compat with older clients)
-    """
-    schema = snapshot.get('schema') if isinstance(snapshot, dict) else None
-    questions = []
-    if isinstance(snapshot, dict) and isinstance(snapshot.get('questions'), list):
-        questions = snapshot.get('questions') or []
-    elif isinstance(schema, dict) and isinstance(schema.get('questions'), list):
-        questions = schema.get('questions') or []
-
-    qmeta = {str(q.get('id')): q for q in questions if isinstance(q, dict)}
-    out = []
-
-    for qid, val in (answers or {}).items():
-        q = qmeta.get(str(qid))
-        if not q:
-            continue
-
-        qtype = (q.get('type') or '').lower()
-        if qtype not in ('text', 'textarea', 'comment'):
-            continue
-
-        text_val = None
-        if isinstance(val, str):
-            text_val = val
-        elif isinstance(val, dict):
-            if isinstance(val.get('text'), str):
-                text_val = val.get('text')
-            elif isinstance(val.get('value'), str):
-                text_val = val.get('value')
-
-        if not text_val:
-            continue
-
-        text_val = str(text_val).strip()
-        if not text_val:
-            continue
-
-        qtext = q.get('text') or {}
-        if isinstance(qtext, dict):
-            qlabel = qtext.get(lang) or qtext.get('es') or qtext.get('en')
-        else:
-            qlabel = str(qtext)
-
-        out.append({'question': qlabel or str(qid), 'text': text_val})
-
-    return out
+    qmeta = text_questions(c.snapshot_json or {})
+    items = []
+    for r in rows:
+        items.append({
+            'response_id': r.response_id,
+            'submitted_at': r.submitted_at.isoformat(),
+            'submitted_at_mx': fmt_dt_local(r.submitted_at, current_app.config.get('TIME_ZONE')),
+            'lang': r.lang,
+            'area': (r.area.name if r.area else None),
+            'shift': r.shift,
+            'question': question_label(qmeta.get(r.question_id), r.question_id, r.lang or 'es'),
+            'text': r.text,
+        })
 
-@bp.get('/api/campaigns/<int:campaign_id>/comments')
+    return {
+        'items': items,
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'total': rollup_count(c.id, COMMENTS),
+    }
+
+
+def _local_day(raw: str, tz_name: str):
+    """'YYYY-MM-DD' (local day) -> naive UTC datetime of its start; None if empty."""
+    if not raw:
+        return None
+    return local_naive_to_utc_naive(datetime.strptime(raw, '%Y-%m-%d'), tz_name)
+
+
+@bp.get('/api/campaigns/<int:campaign_id>/comments/search')
 @login_required
-def api_campaign_comments(campaign_id: int):
+def api_campaign_comments_search(campaign_id: int):
+    """Full-text search over a campaign's comments (?q=&area_id=&shift=&from=&to=&page=)."""
     c = Campaign.query.get_or_404(campaign_id)
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return {'error': 'q_required'}, 400
     page = max(int(request.args.get('page', 1) or 1), 1)
-    per_page = min(max(int(request.args.get('per_page', 10) or 10), 1), 50)
+    per_page = min(max(int(request.args.get('per_page', 20) or 20), 1), 50)
+    area_id = request.args.get('area_id', type=int)
+    shift = (request.args.get('shift') or '').strip() or None
+
+    tz_name = current_app.config.get('TIME_ZONE')
+    try:
+        since = _local_day(request.args.get('from'), tz_name)
+        until = _local_day(request.args.get('to'), tz_name)
+    except ValueError:
+        return {'error': 'invalid_date'}, 400
+    if until is not None:
+        until += timedelta(days=1)  # 'to' is inclusive
+
+    rows, has_more = search_comments(
+        c.id, q, area_id=area_id, shift=shift, since=since, until=until,
+        limit=per_page, offset=(page - 1) * per_page,
+    )
 
-    # pull latest responses and extract text comments
-    q = Response.query.filter_by(campaign_id=c.id).order_by(Response.submitted_at.desc())
-    rows = q.all()
-    comments = []
+    qmeta = text_questions(c.snapshot_json or {})
+    area_ids = {r['area_id'] for r in rows if r['area_id']}
+    area_names = dict(db.session.query(Area.id, Area.name).filter(Area.id.in_(area_ids)).all()) if area_ids else {}
+    items = []
     for r in rows:
-        for it in _extract_text_comments(c.snapshot_json or {}, r.answers_json or {}, r.lang or 'es'):
-            comments.append({
-                'response_id': r.id,
-                'submitted_at': r.submitted_at.isoformat(),
-            'submitted_at_mx': fmt_dt_local(r.submitted_at, current_app.config.get('TIME_ZONE')),
-                'lang': r.lang,
-                'area': (r.area.name if r.area else None),
-                'shift': r.shift,
-                'question': it['question'],
-                'text': it['text'],
-            })
-
-    total = len(comments)
-    pages = max((total + per_page - 1) // per_page, 1)
-    if page > pages:
-        page = pages
-    start = (page - 1) * per_page
-    items = comments[start:start + per_page]
+        items.append({
+            'response_id': r['response_id'],
+            'submitted_at': r['submitted_at'].isoformat(),
+            'submitted_at_mx': fmt_dt_local(r['submitted_at'], tz_name),
+            'lang': r['lang'],
+            'area': area_names.get(r['area_id']),
+            'shift': r['shift'],
+            'question': question_label(qmeta.get(r['question_id']), r['question_id'], r['lang'] or 'es'),
+            'text': r['text'],
+            'highlight': highlight_html(r['hl']),
+            'rank': round(float(r['rank'] or 0), 4),
+        })
 
     return {
         'items': items,
         'page': page,
         'per_page': per_page,
-        'total': total,
-        'pages': pages,
+        'has_more': has_more,
     }
 
 
@@ -658,16 +700,17 @@ def api_campaign_comments(campaign_id: int):
 @login_required
 def api_campaign_followups(campaign_id: int):
     c = Campaign.query.get_or_404(campaign_id)
-    page = max(int(request.args.get('page', 1) or 1), 1)
-    per_page = min(max(int(request.args.get('per_page', 10) or 10), 1), 50)
+    cursor, per_page = _cursor_args()
 
-    q = Response.query.filter_by(campaign_id=c.id).filter(Response.wants_followup.is_(True))
-    total = q.count()
-    pages = max((total + per_page - 1) // per_page, 1)
-    if page > pages:
-        page = pages
+    q = (
+        Response.query.options(joinedload(Response.area))
+        .filter(Response.campaign_id == c.id, Response.wants_followup.is_(True))
+    )
+    try:
+        rows, next_cursor = keyset_page(q, Response.submitted_at, Response.id, cursor, per_page)
+    except ValueError:
+        return {'error': 'invalid_cursor'}, 400
 
-    rows = q.order_by(Response.submitted_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
     items = []
     for r in rows:
         items.append({
@@ -683,43 +726,106 @@ def api_campaign_followups(campaign_id: int):
 
     return {
         'items': items,
-        'page': page,
         'per_page': per_page,
-        'total': total,
-        'pages': pages,
+        'next_cursor': next_cursor,
+        'total': rollup_count(c.id, 'followup'),
     }
 
 
 @bp.get('/campaigns/<int:campaign_id>/export.csv')
 @login_required
 def campaigns_export_csv(campaign_id: int):
+    """Stream the CSV (gzip-encoded on the fly when the client accepts it)."""
     c = Campaign.query.get_or_404(campaign_id)
-    rows = Response.query.filter_by(campaign_id=c.id).order_by(Response.submitted_at.desc()).all()
+    art = get_artifact(c, 'csv')
+    if art is not None:
+        return _send_artifact(c, art)  # closed campaign: the frozen file, sent as is
+    body = iter_responses_csv(c.id)
+    headers = {
+        'Content-Disposition': f'attachment; filename="campaign_{c.id}_responses.csv"',
+        'Cache-Control': 'no-store',
+        'Vary': 'Accept-Encoding',
+    }
+    if 'gzip' in request.accept_encodings:
+        body = gzip_stream(body)
+        headers['Content-Encoding'] = 'gzip'
+    return current_app.response_class(
+        stream_with_context(body),
+        mimetype='text/csv',
+        headers=headers,
+    )
 
-    out = io.StringIO()
-    writer = csv.writer(out)
-    writer.writerow([
-        'response_id', 'submitted_at', 'lang', 'area', 'shift', 'wants_followup', 'contact_name', 'employee_no', 'source', 'answers_json'
-    ])
-    for r in rows:
-        writer.writerow([
-            r.id,
-            r.submitted_at.isoformat(sep=' ', timespec='seconds'),
-            r.lang,
-            r.area.name if r.area else '',
-            r.shift or '',
-            '1' if r.wants_followup else '0',
-            r.contact_name or '',
-            r.employee_no or '',
-            r.source or '',
-            json.dumps(r.answers_json, ensure_ascii=False),
-        ])
-
-    data = out.getvalue().encode('utf-8')
+
+@bp.get('/campaigns/<int:campaign_id>/export_wide.csv')
+@login_required
+def campaigns_export_wide_csv(campaign_id: int):
+    """One column per question (snapshot schema), streamed like export.csv."""
+    c = Campaign.query.get_or_404(campaign_id)
+    body = iter_wide_csv(c)
+    headers = {
+        'Content-Disposition': f'attachment; filename="campaign_{c.id}_responses_wide.csv"',
+        'Cache-Control': 'no-store',
+        'Vary': 'Accept-Encoding',
+    }
+    if 'gzip' in request.accept_encodings:
+        body = gzip_stream(body)
+        headers['Content-Encoding'] = 'gzip'
+    return current_app.response_class(
+        stream_with_context(body),
+        mimetype='text/csv',
+        headers=headers,
+    )
+
+
+@bp.get('/campaigns/<int:campaign_id>/export.xlsx')
+@login_required
+def campaigns_export_xlsx(campaign_id: int):
+    from ..services.excel import write_responses_xlsx
+
+    c = Campaign.query.get_or_404(campaign_id)
+    tmp = tempfile.TemporaryFile()  # closed (and removed) by send_file once sent
+    write_responses_xlsx(c, tmp)
+    tmp.seek(0)
+    return send_file(
+        tmp,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        download_name=f"campaign_{c.id}_responses.xlsx",
+        as_attachment=True,
+    )
+
+
+@bp.post('/api/campaigns/<int:campaign_id>/exports')
+@login_required
+def api_campaign_export_start(campaign_id: int):
+    """Queue a background export ({"kind": "pdf|csv|csv_wide|xlsx"})."""
+    c = Campaign.query.get_or_404(campaign_id)
+    kind = ((request.get_json(silent=True) or {}).get('kind') or request.form.get('kind') or '').strip()
+    if kind not in EXPORT_KINDS:
+        return {'error': 'invalid_kind'}, 400
+    job = submit_export(c, kind)
+    return {**job_status(job), 'status_url': url_for('admin.api_export_status', job_id=job.id),
+            'download_url': url_for('admin.export_download', job_id=job.id)}, 202
+
+
+@bp.get('/api/exports/<job_id>')
+@login_required
+def api_export_status(job_id: str):
+    job = db.session.get(ExportJob, job_id) or abort(404)
+    return job_status(job)
+
+
+@bp.get('/exports/<job_id>/download')
+@login_required
+def export_download(job_id: str):
+    job = db.session.get(ExportJob, job_id) or abort(404)
+    path = artifact_path(current_app._get_current_object(), job)
+    if job.status != 'done' or not path or not os.path.exists(path):
+        abort(404)
+    kind = EXPORT_KINDS[job.kind]
     return send_file(
-        io.BytesIO(data),
-        mimetype='text/csv; charset=utf-8',
-        download_name=f"campaign_{c.id}_responses.csv",
+        path,
+        mimetype=kind.mimetype,
+        download_name=f"campaign_{job.campaign_id}_{kind.suffix}",
         as_attachment=True,
     )
 
@@ -727,7 +833,12 @@ def campaigns_export_csv(campaign_id: int):
 @bp.get('/campaigns/<int:campaign_id>/export.pdf')
 @login_required
 def campaigns_export_pdf(campaign_id: int):
+    from ..services.pdf import build_campaign_pdf
+
     c = Campaign.query.get_or_404(campaign_id)
+    art = get_artifact(c, 'pdf')
+    if art is not None:
+        return _send_artifact(c, art)
     pdf_bytes = build_campaign_pdf(c)
     return send_file(
         io.BytesIO(pdf_bytes),
@@ -737,6 +848,105 @@ def campaigns_export_pdf(campaign_id: int):
     )
 
 
+def _send_artifact(c: Campaign, art: CampaignArtifact):
+    """Frozen file as a download; the sha256 is the ETag (conditional requests get 304)."""
+    kind = ARTIFACT_KINDS[art.kind]
+    resp = send_file(
+        artifact_file(current_app._get_current_object(), art),
+        mimetype=kind.mimetype,
+        download_name=f"campaign_{c.id}_{kind.suffix}",
+        as_attachment=True,
+        etag=art.sha256,
+        conditional=True,
+    )
+    resp.headers['X-Checksum-SHA256'] = art.sha256
+    return resp
+
+
+@bp.get('/api/campaigns/<int:campaign_id>/artifacts')
+@login_required
+def api_campaign_artifacts(campaign_id: int):
+    """Frozen report files of a closed campaign (empty while open or not yet built)."""
+    c = Campaign.query.get_or_404(campaign_id)
+    items = []
+    for art in list_artifacts(c.id):
+        info = artifact_info(art)
+        info['valid'] = get_artifact(c, art.kind) is not None
+        info['download_url'] = url_for('admin.campaign_artifact_download', campaign_id=c.id, kind=art.kind)
+        items.append(info)
+    return {'campaign_id': c.id, 'closed': is_closed(c), 'items': items}
+
+
+@bp.get('/campaigns/<int:campaign_id>/artifacts/<kind>')
+@login_required
+def campaign_artifact_download(campaign_id: int, kind: str):
+    c = Campaign.query.get_or_404(campaign_id)
+    if kind not in ARTIFACT_KINDS:
+        abort(404)
+    art = get_artifact(c, kind) or abort(404)
+    return _send_artifact(c, art)
+
+
+@bp.post('/campaigns/<int:campaign_id>/artifacts/refresh')
+@login_required
+def campaign_artifacts_refresh(campaign_id: int):
+    """Drop the frozen report and, if the campaign is still closed, rebuild it now."""
+    c = Campaign.query.get_or_404(campaign_id)
+    invalidate_artifacts(c.id)
+    invalidate_analytics(c.id)
+    if is_closed(c):
+        finalize_campaign(c)
+        flash('Reporte final regenerado.', 'success')
+    else:
+        flash('Reporte final descartado: la campaña sigue abierta.', 'success')
+    return redirect(url_for('admin.campaigns_report', campaign_id=c.id))
+
+
+@bp.get('/campaigns/export_bundle.zip')
+@login_required
+def campaigns_export_bundle():
+    """PDF + CSV of many campaigns as one streamed ZIP (?category=&from=&to=&ids=1,2)."""
+    category = (request.args.get('category') or '').strip().upper()
+    if category == 'ALL':
+        category = ''
+    try:
+        ids = [int(x) for x in (request.args.get('ids') or '').replace(' ', '').split(',') if x]
+    except ValueError:
+        return {'error': 'invalid_ids'}, 400
+    tz_name = current_app.config.get('TIME_ZONE')
+    try:
+        since = _local_day(request.args.get('from'), tz_name)
+        until = _local_day(request.args.get('to'), tz_name)
+    except ValueError:
+        return {'error': 'invalid_date'}, 400
+    if until is not None:
+        until += timedelta(days=1)  # 'to' is inclusive
+
+    campaigns = select_campaigns(category or None, since, until, ids or None)
+    if not campaigns:
+        return {'error': 'no_campaigns'}, 404
+    label = '_'.join(p for p in (category.lower(), request.args.get('from'), request.args.get('to')) if p)
+    label = re.sub(r'[^a-z0-9_-]+', '', label) or 'campaigns'
+    bundle_id = uuid.uuid4().hex
+    return current_app.response_class(
+        stream_with_context(iter_bundle_zip([c.id for c in campaigns], label, bundle_id)),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename="bundle_{label}.zip"',
+            'Cache-Control': 'no-store',
+            'X-Bundle-Id': bundle_id,
+            'X-Bundle-Campaigns': str(len(campaigns)),
+        },
+    )
+
+
+@bp.get('/api/bundles/<bundle_id>')
+@login_required
+def api_bundle_status(bundle_id: str):
+    """Per-campaign progress of a bundle streamed by this worker."""
+    return bundle_status(bundle_id) or abort(404)
+
+
 @bp.post('/campaigns/<int:campaign_id>/delete')
 @login_required
 def campaigns_delete(campaign_id: int):
@@ -745,7 +955,15 @@ def campaigns_delete(campaign_id: int):
     if Response.query.filter_by(campaign_id=c.id).count() > 0:
         flash('No se puede eliminar: la campaña ya tiene respuestas.', 'error')
         return redirect(url_for('admin.campaigns_list'))
+    token, cid = c.token, c.id
+    invalidate_artifacts(cid)
+    export_files = delete_campaign_exports(cid)
     db.session.delete(c)
     db.session.commit()
+    remove_files(export_files)
+    invalidate_campaign(token)
+    forget_campaign(cid)
+    forget_text_questions(cid)
+    invalidate_analytics(cid)
     flash('Campaña eliminada.', 'success')
     return redirect(url_for('admin.campaigns_list'))
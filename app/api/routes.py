@@ -3,9 +3,10 @@ from datetime import datetime
 
 from flask import Blueprint, request, abort, current_app, send_file
 
-from ..extensions import db
-from ..models import Campaign, Response, Area
-from ..services.qr import make_qr_png
+from ..services.area_catalog import get_area_catalog
+from ..services.campaign_cache import get_campaign_view, get_campaign_payload
+from ..services.group_commit import get_buffer
+from ..services.submissions import validate_submission, persist_each, persist_responses
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -15,97 +16,134 @@ def list_areas():
     """Return active Areas for public survey UI.
 
     The public survey runtime uses this endpoint to populate the Area selector
-    when a campaign has require_area enabled.
+    when a campaign has require_area enabled. The body comes pre-serialized
+    from the area catalog and carries an ETag, so kiosks revalidate with 304.
     """
-    areas = Area.query.filter_by(is_active=True).order_by(Area.name.asc()).all()
-    return {
-        'items': [{'id': a.id, 'name': a.name} for a in areas]
-    }
+    catalog = get_area_catalog()
+    resp = current_app.response_class(catalog.body, mimetype='application/json')
+    resp.set_etag(catalog.etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
 
 
 @bp.get('/campaign/<token>')
 def get_campaign(token: str):
-    c = Campaign.query.filter_by(token=token).first()
-    if not c or not c.is_active:
-        abort(404)
-    now = datetime.utcnow()
-    if c.start_at and now < c.start_at:
-        abort(404)
-    if c.end_at and now > c.end_at:
+    """Kiosk bootstrap: campaign flags + snapshot schema.
+
+    Served pre-serialized (and pre-compressed when the client accepts br or
+    gzip) with a strong ETag per encoding; kiosks revalidate and get a 304
+    until the campaign changes.
+    """
+    c = get_campaign_view(token)
+    if not c or not c.is_active_at(datetime.utcnow()):
         abort(404)
 
-    return {
-        'token': c.token,
-        'campaign_id': c.id,
-        'name': c.name,
-        'require_area': c.require_area,
-        'require_shift': c.require_shift,
-        'shifts': current_app.config['SHIFTS'],
-        'snapshot': c.snapshot_json,
-    }
+    payload = get_campaign_payload(c, current_app.config['SHIFTS'])
+    accept = request.accept_encodings
+    if payload.br is not None and accept['br']:
+        body, encoding, etag = payload.br, 'br', f'{payload.etag}-br'
+    elif accept['gzip']:
+        body, encoding, etag = payload.gzip, 'gzip', f'{payload.etag}-gz'
+    else:
+        body, encoding, etag = payload.body, None, payload.etag
+
+    resp = current_app.response_class(body, mimetype='application/json')
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.vary.add('Accept-Encoding')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
 
 
 @bp.post('/submit/<token>')
 def submit(token: str):
-    c = Campaign.query.filter_by(token=token).first()
-    if not c or not c.is_active:
+    c = get_campaign_view(token)
+    if not c or not c.is_active_at(datetime.utcnow()):
         abort(404)
 
     payload = request.get_json(silent=True) or {}
-    lang = (payload.get('lang') or current_app.config.get('DEFAULT_LANGUAGE', 'es'))[:8]
-
-    area_id = payload.get('area_id')
-    shift = payload.get('shift')
-    answers = payload.get('answers') or {}
-    wants_followup = bool(payload.get('wants_followup'))
-    contact_name = (payload.get('contact_name') or '').strip()[:200]
-    employee_no = (payload.get('employee_no') or '').strip()[:50]
-    source = (payload.get('source') or 'kiosko')[:20]
-
-    if c.require_area:
-        if not area_id:
-            return {'error': 'area_required'}, 400
-        area = Area.query.get(int(area_id))
-        if not area or not area.is_active:
-            return {'error': 'invalid_area'}, 400
-
-    if c.require_shift:
-        if not shift:
-            return {'error': 'shift_required'}, 400
-        if shift not in current_app.config['SHIFTS']:
-            return {'error': 'invalid_shift'}, 400
-    else:
-        if shift and shift not in current_app.config['SHIFTS']:
-            return {'error': 'invalid_shift'}, 400
+    values, error = validate_submission(
+        c, payload,
+        shifts=current_app.config['SHIFTS'],
+        default_lang=current_app.config.get('DEFAULT_LANGUAGE', 'es'),
+        active_areas=get_area_catalog().names,
+        user_agent=request.headers.get('User-Agent') or '',
+    )
+    if error:
+        return {'error': error}, 400
 
-    if wants_followup:
-        if not contact_name or not employee_no:
-            return {'error': 'contact_required'}, 400
+    if current_app.config['SUBMIT_GROUP_COMMIT']:
+        # Opt-in: share one INSERT/COMMIT with concurrent submissions
+        result = get_buffer(current_app._get_current_object()).submit(values)
     else:
-        contact_name = None
-        employee_no = None
-
-    r = Response(
-        campaign_id=c.id,
-        lang=lang,
-        area_id=int(area_id) if area_id else None,
-        shift=shift,
-        wants_followup=wants_followup,
-        contact_name=contact_name,
-        employee_no=employee_no,
-        answers_json=answers,
-        user_agent=(request.headers.get('User-Agent') or '')[:300],
-        source=source,
-    )
-    db.session.add(r)
-    db.session.commit()
+        result = persist_responses([values])[0]
+
+    if result.duplicate:
+        # Retry of an already stored submission: answer with the original id
+        return {'ok': True, 'id': result.id, 'duplicate': True}
+    return {'ok': True, 'id': result.id}
+
+
+@bp.post('/submit/batch')
+def submit_batch():
+    """Store many queued submissions (possibly for several campaigns) at once.
 
-    return {'ok': True, 'id': r.id}
+    Body: {"items": [{"token": "...", "payload": {...}}, ...]}, i.e. the same
+    shape the kiosk keeps in its offline queue. Campaigns and areas come
+    from the in-memory caches; valid items are inserted in one transaction
+    and the reply carries one result per item, in order. A 4xx item status
+    is final; items that could not be stored get 500 and can be retried.
+    """
+    body = request.get_json(silent=True) or {}
+    items = body.get('items')
+    if not isinstance(items, list):
+        return {'error': 'items_required'}, 400
+    if len(items) > current_app.config['SUBMIT_BATCH_MAX']:
+        return {'error': 'batch_too_large', 'max': current_app.config['SUBMIT_BATCH_MAX']}, 413
+
+    active_areas = get_area_catalog().names
+    shifts = current_app.config['SHIFTS']
+    default_lang = current_app.config.get('DEFAULT_LANGUAGE', 'es')
+    user_agent = request.headers.get('User-Agent') or ''
+    now = datetime.utcnow()
+
+    results = []
+    accepted = []
+    for i, it in enumerate(items):
+        it = it if isinstance(it, dict) else {}
+        c = get_campaign_view(str(it.get('token'))) if it.get('token') else None
+        if not c or not c.is_active_at(now):
+            results.append({'index': i, 'ok': False, 'error': 'not_found', 'status': 404})
+            continue
+        payload = it.get('payload') if isinstance(it.get('payload'), dict) else {}
+        values, error = validate_submission(
+            c, payload, shifts=shifts, default_lang=default_lang, active_areas=active_areas, user_agent=user_agent,
+        )
+        if error:
+            results.append({'index': i, 'ok': False, 'error': error, 'status': 400})
+            continue
+        results.append({'index': i, 'ok': True})
+        accepted.append((results[-1], values))
+
+    if accepted:
+        stored = persist_each([values for _, values in accepted])
+        for (res, _), result in zip(accepted, stored):
+            if result is None:
+                res.update(ok=False, error='server_error', status=500)
+                continue
+            res['id'] = result.id
+            if result.duplicate:
+                res['duplicate'] = True
+
+    return {'ok': True, 'results': results}
 
 
 @bp.get('/qr/<token>.png')
 def qr_png(token: str):
-    c = Campaign.query.filter_by(token=token).first()
+    from ..services.qr import make_qr_png  # qrcode/PIL: loaded on first use
+
+    c = get_campaign_view(token)
     if not c:
         abort(404)
 
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import click
+from flask import Flask, current_app
+
+
+def register_commands(app: Flask):
+    """Maintenance commands (flask --app wsgi <group> <command>)."""
+
+    @app.cli.group('campaigns')
+    def campaigns_cli():
+        """Campaign maintenance."""
+
+    @campaigns_cli.command('transition')
+    def campaigns_transition():
+        """Persist scheduled activations/deactivations (cron-friendly)."""
+        from .services.scheduler import run_transitions
+
+        changed = run_transitions()
+        if changed is None:
+            click.echo('Another worker is running the transition job.')
+            return
+        click.echo(f'Campaigns updated: {changed}')
+        if current_app.config['FINALIZE_CLOSED_CAMPAIGNS']:
+            from .services.artifacts import finalize_closed_campaigns
+
+            click.echo(f'Campaigns finalized: {finalize_closed_campaigns()}')
+
+    @app.cli.group('analytics')
+    def analytics_cli():
+        """Analytics rollup maintenance."""
+
+    @analytics_cli.command('rebuild')
+    @click.option('--campaign-id', type=int, default=None, help='Only this campaign (default: all).')
+    def analytics_rebuild(campaign_id):
+        """Recompute rollup counters from the responses table."""
+        from .models import Campaign
+        from .services.rollups import rebuild_rollups
+
+        if campaign_id is not None:
+            ids = [campaign_id]
+        else:
+            ids = [cid for (cid,) in Campaign.query.with_entities(Campaign.id).order_by(Campaign.id).all()]
+        for cid in ids:
+            n = rebuild_rollups(cid)
+            click.echo(f'Campaign {cid}: {n} responses')
+
+    @analytics_cli.command('parity')
+    @click.option('--campaign-id', type=int, default=None, help='Only this campaign (default: all).')
+    def analytics_parity(campaign_id):
+        """Check that every analytics backend returns the same result."""
+        from .models import Campaign
+        from .services.analytics import BACKENDS, compute_campaign_analytics
+
+        query = Campaign.query.order_by(Campaign.id)
+        if campaign_id is not None:
+            query = query.filter(Campaign.id == campaign_id)
+        failed = 0
+        for c in query.all():
+            results = {}
+            for backend in BACKENDS:
+                data = compute_campaign_analytics(c, backend=backend)
+                data.pop('generated_at', None)
+                results[backend] = data
+            reference = results['scan']
+            diff = [b for b, data in results.items() if data != reference]
+            if diff:
+                failed += 1
+                keys = sorted({k for b in diff for k in reference if results[b].get(k) != reference[k]})
+                click.echo(f'Campaign {c.id}: MISMATCH in {", ".join(diff)} ({", ".join(keys)})')
+            else:
+                click.echo(f'Campaign {c.id}: ok')
+        if failed:
+            raise SystemExit(1)
+
+    @app.cli.group('comments')
+    def comments_cli():
+        """Comment index maintenance."""
+
+    @comments_cli.command('backfill')
+    @click.option('--campaign-id', type=int, default=None, help='Only this campaign (default: all).')
+    def comments_backfill(campaign_id):
+        """Rebuild response_comments from the responses table."""
+        from .models import Campaign
+        from .services.comments import backfill_comments
+
+        if campaign_id is not None:
+            ids = [campaign_id]
+        else:
+            ids = [cid for (cid,) in Campaign.query.with_entities(Campaign.id).order_by(Campaign.id).all()]
+        for cid in ids:
+            n = backfill_comments(cid)
+            click.echo(f'Campaign {cid}: {n} comments')
+
+    @app.cli.group('exports')
+    def exports_cli():
+        """Background export maintenance."""
+
+    @exports_cli.command('purge')
+    def exports_purge():
+        """Delete expired export artifacts (the scheduler also does it; cron when it is off)."""
+        from .services.export_jobs import purge_expired_exports
+
+        click.echo(f'Export jobs removed: {purge_expired_exports()}')
+
+    @app.cli.group('artifacts')
+    def artifacts_cli():
+        """Frozen reports of closed campaigns."""
+
+    @artifacts_cli.command('finalize')
+    @click.option('--campaign-id', type=int, default=None, help='Rebuild this campaign (default: all pending).')
+    def artifacts_finalize(campaign_id):
+        """Freeze closed campaigns that have no artifacts yet or stale ones."""
+        from .models import Campaign
+        from .services.artifacts import finalize_campaign, finalize_closed_campaigns, invalidate_artifacts, is_closed
+
+        if campaign_id is None:
+            click.echo(f'Campaigns finalized: {finalize_closed_campaigns(limit=1000)}')
+            return
+        c = Campaign.query.get(campaign_id)
+        if c is None or not is_closed(c):
+            raise click.ClickException('Campaign not found or not closed.')
+        invalidate_artifacts(c.id)
+        finalize_campaign(c)
+        click.echo(f'Campaign {c.id}: finalized')
+
+    @artifacts_cli.command('verify')
+    def artifacts_verify():
+        """Recompute the sha256 of every artifact file."""
+        from .models import CampaignArtifact
+        from .services.artifacts import artifact_file, sha256_file
+
+        failed = 0
+        for art in CampaignArtifact.query.order_by(CampaignArtifact.campaign_id, CampaignArtifact.kind).all():
+            path = artifact_file(app, art)
+            try:
+                ok = sha256_file(path) == art.sha256
+            except OSError:
+                ok = False
+            if not ok:
+                failed += 1
+            click.echo(f'Campaign {art.campaign_id} {art.kind}: {"ok" if ok else "CORRUPT"}')
+        if failed:
+            raise SystemExit(1)
+
+    @app.cli.group('startup')
+    def startup_cli():
+        """Worker startup checks."""
+
+    @startup_cli.command('check')
+    @click.option('--budget-ms', type=float, default=None,
+                  help='Import time budget (default: STARTUP_IMPORT_BUDGET_MS).')
+    @click.option('--top', type=int, default=10, show_default=True, help='Slowest top-level imports to list.')
+    def startup_check(budget_ms, top):
+        """Fail when create_app() imports too slowly or loads reporting dependencies."""
+        from .utils.importtime import measure_startup
+
+        budget = budget_ms if budget_ms is not None else app.config['STARTUP_IMPORT_BUDGET_MS']
+        report = measure_startup(top=top)
+        for ms, name in report.top:
+            click.echo(f'{ms:9.1f} ms  {name}')
+        click.echo(f'Imports: {report.import_ms:.1f} ms (budget {budget:.0f} ms), '
+                   f'create_app() wall: {report.wall_ms:.1f} ms')
+        failed = False
+        if report.lazy_loaded:
+            failed = True
+            click.echo(f'FAIL: loaded at startup: {", ".join(report.lazy_loaded)}')
+        if report.import_ms > budget:
+            failed = True
+            click.echo('FAIL: import time over budget')
+        if failed:
+            raise SystemExit(1)
+        click.echo('ok')
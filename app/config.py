@@ -17,6 +17,56 @@ class Config:
 
     TIME_ZONE = os.getenv('TIME_ZONE', 'America/Mexico_City')
 
+    # Max items accepted by POST /api/submit/batch (kiosk offline queue)
+    SUBMIT_BATCH_MAX = int(os.getenv('SUBMIT_BATCH_MAX', '200'))
+
+    # Process-local cache of public campaign views (keyed by token)
+    CAMPAIGN_CACHE_TTL = int(os.getenv('CAMPAIGN_CACHE_TTL', '30'))
+    CAMPAIGN_CACHE_SIZE = int(os.getenv('CAMPAIGN_CACHE_SIZE', '256'))
+
+    # In-memory area catalog (submit validation + GET /api/areas)
+    AREA_CATALOG_TTL = int(os.getenv('AREA_CATALOG_TTL', '60'))
+
+    # Background job that persists scheduled campaign activations and purges expired
+    # exports (one worker at a time)
+    CAMPAIGN_SCHEDULER = os.getenv('CAMPAIGN_SCHEDULER', '1').lower() in ('1', 'true', 'yes')
+    CAMPAIGN_TRANSITION_INTERVAL = int(os.getenv('CAMPAIGN_TRANSITION_INTERVAL', '60'))
+    # Freeze analytics/PDF/CSV of campaigns whose end_at passed (instance/artifacts)
+    FINALIZE_CLOSED_CAMPAIGNS = os.getenv('FINALIZE_CLOSED_CAMPAIGNS', '1').lower() in ('1', 'true', 'yes')
+
+    # Opt-in group commit for POST /api/submit/<token>: flush every N rows or M ms
+    SUBMIT_GROUP_COMMIT = os.getenv('SUBMIT_GROUP_COMMIT', '0').lower() in ('1', 'true', 'yes')
+    SUBMIT_GROUP_COMMIT_MAX_ROWS = int(os.getenv('SUBMIT_GROUP_COMMIT_MAX_ROWS', '50'))
+    SUBMIT_GROUP_COMMIT_MAX_WAIT_MS = int(os.getenv('SUBMIT_GROUP_COMMIT_MAX_WAIT_MS', '20'))
+
+    # Source of analytics counts: rollups (counter tables), sql (GROUP BY) or scan (Python)
+    ANALYTICS_BACKEND = os.getenv('ANALYTICS_BACKEND', 'rollups').lower()
+    # Per-worker LRU of analytics results (one entry per campaign)
+    ANALYTICS_CACHE_SIZE = int(os.getenv('ANALYTICS_CACHE_SIZE', '32'))
+
+    # Background exports (admin report): worker threads, artifact lifetime, when a
+    # queued/running job is considered lost (e.g. the worker was restarted)
+    EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', '2'))
+    EXPORT_TTL_HOURS = int(os.getenv('EXPORT_TTL_HOURS', '24'))
+    EXPORT_STALE_MINUTES = int(os.getenv('EXPORT_STALE_MINUTES', '30'))
+
+    # Bulk (multi-campaign) PDF+CSV ZIP export: worker processes per web worker,
+    # 0 = one per CPU (max 8)
+    BUNDLE_WORKERS = int(os.getenv('BUNDLE_WORKERS', '2'))
+
+    # PDF charts: vector (reportlab drawing, default) or png (matplotlib images)
+    PDF_CHART_BACKEND = os.getenv('PDF_CHART_BACKEND', 'vector').lower()
+    # Processes rendering the PNG charts, per web worker: 0 = one per CPU (max 8),
+    # 1 = in-process
+    PDF_CHART_WORKERS = int(os.getenv('PDF_CHART_WORKERS', '2'))
+    # Rendered PNG charts: per-worker LRU (entries) and a shared disk tier
+    # under instance/chart_cache (MB, 0 disables it)
+    CHART_CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', '512'))
+    CHART_CACHE_DISK_MB = int(os.getenv('CHART_CACHE_DISK_MB', '128'))
+
+    # `flask startup check`: max import time of create_app() (ms, -X importtime)
+    STARTUP_IMPORT_BUDGET_MS = float(os.getenv('STARTUP_IMPORT_BUDGET_MS', '1500'))
+
     DATABASE_URL = os.getenv('DATABASE_URL')
     if DATABASE_URL:
         # Render provides postgres://; SQLAlchemy expects postgresql+psycopg2://
@@ -1,6 +1,6 @@
 import secrets
 from datetime import datetime
-from sqlalchemy import Index
+from sqlalchemy import Index, and_, or_
 from .extensions import db
 
 class Area(db.Model):
@@ -35,6 +35,8 @@ class Campaign(db.Model):
     require_area = db.Column(db.Boolean, default=True, nullable=False)
     require_shift = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Bumped when rollups/comments are rebuilt: part of every worker's analytics cache key
+    analytics_generation = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
     survey = db.relationship('Survey')
 
@@ -42,6 +44,38 @@ class Campaign(db.Model):
     def new_token() -> str:
         return secrets.token_urlsafe(16)[:24]
 
+    @property
+    def is_scheduled(self) -> bool:
+        return bool(self.start_at or self.end_at)
+
+    def is_active_at(self, now: datetime | None = None) -> bool:
+        """Whether the campaign is open right now.
+
+        Scheduled campaigns (start_at and/or end_at) follow their window;
+        unscheduled ones follow the manual is_active flag.
+        """
+        now = now or datetime.utcnow()
+        if not self.is_scheduled:
+            return bool(self.is_active)
+        if self.start_at and now < self.start_at:
+            return False
+        if self.end_at and now > self.end_at:
+            return False
+        return True
+
+    @classmethod
+    def active_at_clause(cls, now: datetime):
+        """SQL version of is_active_at() (served by ix_campaigns_activity)."""
+        unscheduled = and_(cls.start_at.is_(None), cls.end_at.is_(None))
+        in_window = and_(
+            or_(cls.start_at.is_(None), cls.start_at <= now),
+            or_(cls.end_at.is_(None), cls.end_at >= now),
+        )
+        return or_(
+            and_(unscheduled, cls.is_active.is_(True)),
+            and_(~unscheduled, in_window),
+        )
+
 class Response(db.Model):
     __tablename__ = 'responses'
     id = db.Column(db.Integer, primary_key=True)
@@ -59,8 +93,78 @@ class Response(db.Model):
     answers_json = db.Column(db.JSON, nullable=False, default=dict)
     user_agent = db.Column(db.String(300))
     source = db.Column(db.String(20), default='kiosko')  # kiosko|link
+    # client-generated UUID: lets kiosks retry without creating duplicates
+    submission_id = db.Column(db.String(36), unique=True, index=True)
 
     campaign = db.relationship('Campaign')
     area = db.relationship('Area')
 
+class CampaignRollup(db.Model):
+    """Per-campaign counters kept in sync on submit (see services/rollups).
+
+    dimension: total | followup | day (YYYY-MM-DD, UTC) | area (area id) | shift
+    """
+    __tablename__ = 'campaign_rollups'
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), primary_key=True)
+    dimension = db.Column(db.String(16), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class QuestionRollup(db.Model):
+    """Answer distribution per question; value is '*' for free-text questions."""
+    __tablename__ = 'question_rollups'
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), primary_key=True)
+    question_id = db.Column(db.String(120), primary_key=True)
+    value = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class ResponseComment(db.Model):
+    """Free-text answer extracted on submit (see services/comments); one row per question."""
+    __tablename__ = 'response_comments'
+    id = db.Column(db.Integer, primary_key=True)
+    response_id = db.Column(db.Integer, db.ForeignKey('responses.id'), nullable=False, index=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), nullable=False)
+    question_id = db.Column(db.String(120), nullable=False)
+    lang = db.Column(db.String(8), default='es', nullable=False)
+    area_id = db.Column(db.Integer, db.ForeignKey('areas.id'))
+    shift = db.Column(db.String(16))
+    submitted_at = db.Column(db.DateTime, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+
+    area = db.relationship('Area')
+
+class ExportJob(db.Model):
+    """Background export (see services/export_jobs); the file lives under instance/exports."""
+    __tablename__ = 'export_jobs'
+    id = db.Column(db.String(32), primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), nullable=False)
+    kind = db.Column(db.String(16), nullable=False)  # pdf|csv|csv_wide|xlsx
+    # max response id when requested: same export + same watermark = same file
+    watermark = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(16), nullable=False, default='queued')  # queued|running|done|error
+    progress = db.Column(db.Integer, nullable=False, default=0)  # 0-100
+    error = db.Column(db.String(300))
+    filename = db.Column(db.String(200))
+    size = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+
+    campaign = db.relationship('Campaign')
+
+class CampaignArtifact(db.Model):
+    """Frozen report file of a closed campaign (see services/artifacts); lives under instance/artifacts."""
+    __tablename__ = 'campaign_artifacts'
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), primary_key=True)
+    kind = db.Column(db.String(16), primary_key=True)  # analytics|pdf|csv
+    # max response id the file was built from; a different one means it is stale
+    watermark = db.Column(db.Integer, nullable=False, default=0)
+    filename = db.Column(db.String(200), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
 Index('ix_responses_campaign_date', Response.campaign_id, Response.submitted_at)
+Index('ix_campaigns_activity', Campaign.is_active, Campaign.start_at, Campaign.end_at)
+Index('ix_response_comments_page', ResponseComment.campaign_id, ResponseComment.submitted_at, ResponseComment.id)
+Index('ix_export_jobs_lookup', ExportJob.campaign_id, ExportJob.kind, ExportJob.watermark)
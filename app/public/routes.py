@@ -1,42 +1,40 @@
+import hashlib
 from datetime import datetime
-from flask import Blueprint, render_template, abort, request
+from flask import Blueprint, render_template, abort, request, current_app, session
+from flask_login import current_user
+from sqlalchemy import func, select
 
-from ..models import Campaign
 from ..extensions import db
+from ..models import Campaign
+from ..services.campaign_cache import get_campaign_view
+from ..utils.cache import LRUCache, MISSING
 
 bp = Blueprint('public', __name__)
 
-def sync_campaign_activity(now=None):
-    """
-    Synchronize Campaign.is_active based on start/end window (UTC naive).
-    Rules:
-      - If start_at is set and now < start_at -> inactive
-      - If end_at is set and now > end_at -> inactive
-      - Otherwise -> active
-    """
-    if now is None:
-        now = datetime.utcnow()
-
-    changed = False
-    qs = Campaign.query.filter(
-        (Campaign.start_at.isnot(None)) | (Campaign.end_at.isnot(None))
-    ).all()
-
-    for c in qs:
-        # Determine should_be_active
-        should_be_active = True
 
-        if c.start_at and now < c.start_at:
-            should_be_active = False
-        if c.end_at and now > c.end_at:
-            should_be_active = False
+def _menu_stamp(now: datetime) -> str:
+    """Cheap version of the menu: active campaigns (id, name) + next scheduled transition."""
+    active = db.session.execute(
+        select(Campaign.id, Campaign.name)
+        .where(Campaign.active_at_clause(now))
+        .order_by(Campaign.created_at.desc())
+    ).all()
+    next_transition = db.session.execute(
+        select(
+            select(func.min(Campaign.start_at)).where(Campaign.start_at > now).scalar_subquery(),
+            select(func.min(Campaign.end_at)).where(Campaign.end_at >= now).scalar_subquery(),
+        )
+    ).one()
+    parts = [f'{cid}:{name}' for cid, name in active]
+    parts += [dt.isoformat() if dt else '-' for dt in next_transition]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
 
-        if c.is_active != should_be_active:
-            c.is_active = should_be_active
-            changed = True
 
-    if changed:
-        db.session.commit()
+def _menu_cache() -> LRUCache:
+    cache = current_app.extensions.get('menu_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('menu_cache', LRUCache(maxsize=16))
+    return cache
 
 
 @bp.get('/')
@@ -48,39 +46,43 @@ def landing():
 def menu():
     now = datetime.utcnow()
 
-    # Sync scheduled activity (fixes "active" not updating and start not appearing)
-    sync_campaign_activity(now)
-
     # Auto-refresh for kiosk (default 60s), disable with ?norefresh=1
     no_refresh = request.args.get('norefresh') == '1'
     refresh_seconds = 60 if not no_refresh else 0
 
-    # Only active campaigns (already synced)
-    campaigns = (
-        Campaign.query
-        .filter_by(is_active=True)
-        .order_by(Campaign.created_at.desc())
-        .all()
-    )
-
-    return render_template(
-        'public/menu.html',
-        campaigns=campaigns,
-        refresh_seconds=refresh_seconds
-    )
+    # The page also depends on the refresh flag and on the login state (top bar)
+    etag = f'{_menu_stamp(now)}-{refresh_seconds}-{int(current_user.is_authenticated)}'
+    cacheable = '_flashes' not in session  # pending flash messages render once
+
+    html = _menu_cache().get(etag) if cacheable else MISSING
+    if html is MISSING:
+        # Activity is evaluated at read time (schedule window / manual flag); no writes here
+        campaigns = (
+            Campaign.query
+            .filter(Campaign.active_at_clause(now))
+            .order_by(Campaign.created_at.desc())
+            .all()
+        )
+        html = render_template(
+            'public/menu.html',
+            campaigns=campaigns,
+            refresh_seconds=refresh_seconds
+        )
+        if cacheable:
+            _menu_cache().set(etag, html)
+
+    resp = current_app.response_class(html, mimetype='text/html')
+    if cacheable:
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'private, no-cache'
+        return resp.make_conditional(request)
+    return resp
 
 
 @bp.get('/c/<token>')
 def campaign(token: str):
-    c = Campaign.query.filter_by(token=token).first()
-    if not c:
-        abort(404)
-
-    now = datetime.utcnow()
-    sync_campaign_activity(now)
-
-    # Reload is_active state after sync (optional but safe)
-    if not c.is_active:
+    c = get_campaign_view(token)
+    if not c or not c.is_active_at(datetime.utcnow()):
         abort(404)
 
     return render_template('public/campaign.html', campaign=c)
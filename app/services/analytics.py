@@ -1,7 +1,23 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
 from datetime import datetime
 
-from ..models import Response, Campaign
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from ..extensions import db
+from ..models import Area, Response, ResponseComment, Campaign
+from .analytics_sql import sql_counters
+from .comments import _comment_rows
+from .rollups import count_responses, counters_to_counts, load_counters, question_kinds
+
+# ANALYTICS_BACKEND values: where the counts come from
+BACKENDS = ('rollups', 'sql', 'scan')
+
+# Selectable parts of the result ('kpis' is the totals block); 'campaign' and
+# 'generated_at' are always included
+SECTIONS = ('kpis', 'by_day', 'by_area', 'by_shift', 'questions', 'special', 'comments', 'followups')
+_COUNT_SECTIONS = frozenset(('kpis', 'by_day', 'by_area', 'by_shift', 'questions', 'special'))
 
 
 LIKERT_PRESETS = {
@@ -22,17 +38,139 @@ def _get_label_text(label):
     return ''
 
 
-def _safe_str(x):
-    return str(x or '').strip()
+def _followup_field(r, answers, names):
+    for attr in names:
+        v = getattr(r, attr, None)
+        if v:
+            return v
+    for k in names:
+        v = answers.get(k)
+        if v:
+            return v
+    return None
+
+
+def _load_followups(campaign_id: int) -> list:
+    rows = (
+        Response.query
+        .options(joinedload(Response.area))
+        .filter(Response.campaign_id == campaign_id, Response.wants_followup.is_(True))
+        .all()
+    )
+    followups = []
+    for r in rows:
+        answers = r.answers_json or {}
+        followups.append({
+            'submitted_at': r.submitted_at,
+            'response_id': r.id,
+            'name': _followup_field(r, answers, ('contact_name', 'followup_name', 'employee_name', 'name')),
+            'employee_no': _followup_field(r, answers, ('employee_no', 'followup_employee_no', 'no_empleado', 'emp_no')),
+            'phone': _followup_field(r, answers, ('phone', 'followup_phone', 'telefono')),
+            'area': r.area.name if r.area else None,
+            'shift': r.shift or None,
+        })
+    return followups
+
 
+def _comment_entry(rid, submitted_at, qid, text, area_name, shift, qmeta: dict) -> dict:
+    qtext = (qmeta.get(qid, {}) or {}).get('text') or {}
+    return {
+        'submitted_at': submitted_at,
+        'response_id': rid,
+        'question': qtext.get('es') or qtext.get('en') or qid,
+        'text': text,
+        'area': area_name,
+        'shift': shift or None,
+    }
 
-def compute_campaign_analytics(campaign: Campaign) -> dict:
-    responses = Response.query.filter_by(campaign_id=campaign.id).order_by(Response.submitted_at.asc()).all()
-    total = len(responses)
 
-    by_day = defaultdict(int)
-    by_area = defaultdict(int)
-    by_shift = defaultdict(int)
+def _scan_comments(campaign_id: int, qmeta: dict, text_qids: list) -> list:
+    """Comments extracted from answers_json (campaigns not in response_comments yet)."""
+    text_meta = {str(qid): qmeta.get(qid) for qid in text_qids}
+    stmt = (
+        select(Response.id, Response.campaign_id, Response.lang, Response.area_id, Response.shift,
+               Response.submitted_at, Response.answers_json, Area.name.label('area_name'))
+        .outerjoin(Area, Area.id == Response.area_id)
+        .where(Response.campaign_id == campaign_id)
+        .execution_options(yield_per=1000)
+    )
+    comments = []
+    for row in db.session.execute(stmt):
+        for c in _comment_rows(row.id, row._mapping, text_meta):
+            comments.append(_comment_entry(row.id, c['submitted_at'], c['question_id'], c['text'],
+                                           row.area_name, c['shift'], qmeta))
+    return comments
+
+
+def _load_comments(campaign_id: int, qmeta: dict, text_qids: list) -> list:
+    """Comments from the response_comments index (one indexed query).
+
+    Falls back to scanning the responses when the campaign has no indexed
+    comment yet (responses stored before the index; see `comments backfill`).
+    """
+    if not text_qids:
+        return []
+    stmt = (
+        select(ResponseComment.response_id, ResponseComment.submitted_at, ResponseComment.question_id,
+               ResponseComment.text, Area.name, ResponseComment.shift)
+        .outerjoin(Area, Area.id == ResponseComment.area_id)
+        .where(ResponseComment.campaign_id == campaign_id)
+    )
+    comments = [_comment_entry(*row, qmeta) for row in db.session.execute(stmt)]
+    if not comments:
+        return _scan_comments(campaign_id, qmeta, text_qids)
+    return comments
+
+
+def parse_sections(raw: str):
+    """'kpis,by_day' -> frozenset; None for all sections. ValueError on unknown names."""
+    names = [p.strip().lower() for p in (raw or '').split(',') if p.strip()]
+    if not names:
+        return None
+    unknown = [n for n in names if n not in SECTIONS]
+    if unknown:
+        raise ValueError(', '.join(unknown))
+    return frozenset(names)
+
+
+def _load_counts(campaign: Campaign, backend: str) -> dict:
+    if backend is None:
+        return counters_to_counts(Counter(), Counter())
+    if backend == 'rollups':
+        counters = load_counters(campaign.id)
+    elif backend == 'sql':
+        counters = sql_counters(campaign.id, question_kinds(campaign.snapshot_json))
+    elif backend == 'scan':
+        counters = count_responses(campaign.id, question_kinds(campaign.snapshot_json))
+    else:
+        raise ValueError(f'unknown analytics backend: {backend}')
+    return counters_to_counts(*counters)
+
+
+def compute_campaign_analytics(campaign: Campaign, backend: str = None, sections=None) -> dict:
+    """Dashboard/PDF analytics.
+
+    Counts come from ANALYTICS_BACKEND: 'rollups' (default) reads the counter
+    tables maintained on submit, 'sql' aggregates the responses table with
+    GROUP BY queries and 'scan' counts in Python (reference implementation).
+    Comments come from response_comments and follow-ups from responses.
+
+    `sections` (see SECTIONS) limits what is loaded and returned; None means all.
+    """
+    wanted = frozenset(SECTIONS) if sections is None else frozenset(sections)
+    counts = _load_counts(
+        campaign,
+        (backend or current_app.config['ANALYTICS_BACKEND']) if wanted & _COUNT_SECTIONS else None,
+    )
+    total = counts['total']
+    followup_count = counts['followup']
+    by_day = counts['by_day']
+    by_shift = counts['by_shift']
+
+    area_names = dict(
+        db.session.query(Area.id, Area.name).filter(Area.id.in_(list(counts['by_area']))).all()
+    ) if counts['by_area'] and 'by_area' in wanted else {}
+    by_area = {area_names[aid]: n for aid, n in counts['by_area'].items() if aid in area_names}
 
     snapshot = campaign.snapshot_json or {}
     category = (snapshot.get('category') or 'GENERAL').upper()
@@ -41,135 +179,15 @@ def compute_campaign_analytics(campaign: Campaign) -> dict:
     qmeta = {q.get('id'): q for q in questions if q.get('id')}
 
     dist = {qid: defaultdict(int) for qid in qmeta.keys()}
-
-    followup_count = 0
-    comments = []
-    followups = []
+    for qid, values in counts['dist'].items():
+        if qid in dist:
+            dist[qid].update(values)
 
     # Identify text questions (to treat as comments)
     text_qids = [q.get('id') for q in questions if q.get('type') in ('text', 'textarea', 'comment') and q.get('id')]
 
-    def _area_name(r):
-        try:
-            return r.area.name if getattr(r, 'area', None) else None
-        except Exception:
-            return None
-
-    def _shift_value(r):
-        try:
-            return getattr(r, 'shift', None) or None
-        except Exception:
-            return None
-
-    def _followup_name(r, answers):
-        for attr in ('contact_name', 'followup_name', 'employee_name', 'name'):
-            v = getattr(r, attr, None)
-            if v:
-                return v
-        for k in ('contact_name', 'followup_name', 'employee_name', 'name'):
-            v = answers.get(k)
-            if v:
-                return v
-        return None
-
-    def _followup_empno(r, answers):
-        for attr in ('employee_no', 'followup_employee_no', 'no_empleado', 'emp_no'):
-            v = getattr(r, attr, None)
-            if v:
-                return v
-        for k in ('employee_no', 'followup_employee_no', 'no_empleado', 'emp_no'):
-            v = answers.get(k)
-            if v:
-                return v
-        return None
-
-    def _followup_phone(r, answers):
-        for attr in ('phone', 'followup_phone', 'telefono'):
-            v = getattr(r, attr, None)
-            if v:
-                return v
-        for k in ('phone', 'followup_phone', 'telefono'):
-            v = answers.get(k)
-            if v:
-                return v
-        return None
-
-    for r in responses:
-        day = r.submitted_at.date().isoformat()
-        by_day[day] += 1
-
-        an = _area_name(r)
-        if an:
-            by_area[an] += 1
-
-        sh = _shift_value(r)
-        if sh:
-            by_shift[sh] += 1
-
-        answers = r.answers_json or {}
-
-        # Followup extraction
-        if getattr(r, 'wants_followup', False):
-            followup_count += 1
-            followups.append({
-                'submitted_at': r.submitted_at,
-                'response_id': getattr(r, 'id', None),
-                'name': _followup_name(r, answers),
-                'employee_no': _followup_empno(r, answers),
-                'phone': _followup_phone(r, answers),
-                'area': an,
-                'shift': sh,
-            })
-
-        # Distributions + comments from text questions
-        for qid, val in answers.items():
-            if qid not in dist:
-                continue
-            if val is None:
-                continue
-
-            # normalize
-            if isinstance(val, dict) and 'value' in val:
-                v = val.get('value')
-            elif isinstance(val, dict) and 'text' in val:
-                v = val.get('text')
-            else:
-                v = val
-
-            # count distribution
-            dist[qid][str(v)] += 1
-
-            # extract comment if text question
-            if qid in text_qids:
-                txt = _safe_str(v)
-                if txt:
-                    q = qmeta.get(qid, {}) or {}
-                    qtext = (q.get('text') or {})
-                    question_label = qtext.get('es') or qtext.get('en') or qid
-                    comments.append({
-                        'submitted_at': r.submitted_at,
-                        'response_id': getattr(r, 'id', None),
-                        'question': question_label,
-                        'text': txt,
-                        'area': an,
-                        'shift': sh,
-                    })
-
-        # Optional: if Response has a dedicated comment field, include it too
-        for attr in ('comment', 'comments', 'comentario', 'notes', 'note'):
-            v = getattr(r, attr, None)
-            if v:
-                txt = _safe_str(v)
-                if txt:
-                    comments.append({
-                        'submitted_at': r.submitted_at,
-                        'response_id': getattr(r, 'id', None),
-                        'question': 'Comentario',
-                        'text': txt,
-                        'area': an,
-                        'shift': sh,
-                    })
-                break
+    followups = _load_followups(campaign.id) if 'followups' in wanted else []
+    comments = _load_comments(campaign.id, qmeta, text_qids) if 'comments' in wanted else []
 
     # build output for charts
     question_stats = []
@@ -293,7 +311,7 @@ def compute_campaign_analytics(campaign: Campaign) -> dict:
     comments_sorted = sorted(comments, key=lambda x: x.get('submitted_at') or datetime.min, reverse=True)
     followups_sorted = sorted(followups, key=lambda x: x.get('submitted_at') or datetime.min, reverse=True)
 
-    return {
+    out = {
         'campaign': {
             'id': campaign.id,
             'name': campaign.name,
@@ -314,3 +332,9 @@ def compute_campaign_analytics(campaign: Campaign) -> dict:
         'followups': followups_sorted,
         'generated_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z'
     }
+    if 'kpis' not in wanted:
+        del out['totals']
+    for name in SECTIONS[1:]:
+        if name not in wanted:
+            del out[name]
+    return out
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from typing import FrozenSet, Optional
+
+from flask import current_app
+from sqlalchemy import func
+
+from ..extensions import db
+from ..models import Campaign, Response
+from ..utils.cache import LRUCache, MISSING
+from .analytics import compute_campaign_analytics
+
+_init_lock = threading.Lock()
+
+
+def _cache() -> LRUCache:
+    app = current_app._get_current_object()
+    cache = app.extensions.get('analytics_cache')
+    if cache is None:
+        with _init_lock:
+            cache = app.extensions.get('analytics_cache')
+            if cache is None:
+                cache = LRUCache(app.config['ANALYTICS_CACHE_SIZE'])
+                app.extensions['analytics_cache'] = cache
+    return cache
+
+
+def response_watermark(campaign_id: int) -> int:
+    """Highest response id of the campaign (0 when empty); grows with every submit."""
+    return db.session.query(func.coalesce(func.max(Response.id), 0)) \
+        .filter(Response.campaign_id == campaign_id).scalar()
+
+
+def _snapshot_version(campaign: Campaign) -> str:
+    raw = json.dumps(campaign.snapshot_json or {}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def get_campaign_analytics(campaign: Campaign, sections: Optional[FrozenSet[str]] = None) -> dict:
+    """compute_campaign_analytics() behind a per-worker LRU.
+
+    One entry per (campaign, sections), valid while (max response id,
+    analytics generation, snapshot version, name, active flag, backend) is
+    unchanged, so repeated dashboard loads and PDF exports reuse it until a
+    new response arrives or the rollups/comments are rebuilt (which bumps
+    the generation stored in the campaign row, seen by every worker).
+    The returned dict is shared: treat it as read-only.
+    """
+    version = (
+        response_watermark(campaign.id),
+        campaign.analytics_generation,
+        _snapshot_version(campaign),
+        campaign.name,
+        bool(campaign.is_active),
+        current_app.config['ANALYTICS_BACKEND'],
+    )
+    key = (campaign.id, sections, version)
+    cache = _cache()
+    data = cache.get(key)
+    if data is MISSING:
+        data = compute_campaign_analytics(campaign, sections=sections)
+        # superseded versions of the same selection
+        cache.pop_where(lambda k: k[0] == campaign.id and k[1] == sections and k[2] != version)
+        cache.set(key, data)
+    return data
+
+
+def invalidate_analytics(campaign_id: Optional[int] = None) -> None:
+    """Drop cached results (one campaign or all) after edits that keep the watermark.
+
+    Process-local like the other caches: other workers keep their entry until
+    the next response for that campaign arrives.
+    """
+    if campaign_id is None:
+        _cache().clear()
+    else:
+        _cache().pop_where(lambda k: k[0] == campaign_id)
+
+
+def analytics_cache_stats() -> dict:
+    return _cache().stats()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from typing import Mapping, Tuple
+
+from sqlalchemy import String, Text, case, cast, column, func, select, true
+
+from ..extensions import db
+from ..models import Response
+from .rollups import FILLED, normalize_answer
+
+
+def _dimension_counts(campaign_id: int, dims: Counter):
+    base = Response.campaign_id == campaign_id
+
+    total, followup = db.session.execute(
+        select(func.count(Response.id),
+               func.coalesce(func.sum(case((Response.wants_followup.is_(True), 1), else_=0)), 0))
+        .where(base)
+    ).one()
+    if not total:
+        return
+    dims[('total', '')] = int(total)
+    if followup:
+        dims[('followup', '')] = int(followup)
+
+    day = func.date(Response.submitted_at)
+    for d, n in db.session.execute(select(day, func.count()).where(base).group_by(day)):
+        dims[('day', d if isinstance(d, str) else d.isoformat())] += n
+
+    for area_id, n in db.session.execute(
+        select(Response.area_id, func.count())
+        .where(base, Response.area_id.isnot(None))
+        .group_by(Response.area_id)
+    ):
+        dims[('area', str(area_id))] += n
+
+    for shift, n in db.session.execute(
+        select(Response.shift, func.count())
+        .where(base, Response.shift.isnot(None), Response.shift != '')
+        .group_by(Response.shift)
+    ):
+        dims[('shift', str(shift)[:64])] += n
+
+
+def _pg_answer_counts(campaign_id: int, kinds: Mapping[str, bool], answers: Counter):
+    """Per-question distributions aggregated by Postgres (jsonb_each over answers_json)."""
+    from sqlalchemy.dialects.postgresql import JSONB
+
+    data = cast(Response.answers_json, JSONB)
+    # legacy non-object rows expand to nothing instead of failing jsonb_each()
+    data = case((func.jsonb_typeof(data) == 'object', data), else_=func.jsonb_build_object())
+    entries = (
+        func.jsonb_each(data)
+        .table_valued(column('key', String), column('value', JSONB), joins_implicitly=True)
+        .render_derived(name='e')
+    )
+    value = entries.c.value
+    is_object = func.jsonb_typeof(value) == 'object'
+    normalized = case(
+        (is_object & value.has_key('value'), value.op('->')('value')),
+        (is_object & value.has_key('text'), value.op('->')('text')),
+        else_=value,
+    )
+    value_qids = [qid for qid, by_value in kinds.items() if by_value]
+    # Grouped as JSON text and decoded below, so values stringify exactly like normalize_answer()+str()
+    counted = case((entries.c.key.in_(value_qids), cast(normalized, Text)), else_=None) if value_qids else None
+
+    cols = [entries.c.key, counted] if counted is not None else [entries.c.key]
+    stmt = (
+        select(*cols, func.count())
+        .select_from(Response)
+        .join(entries, true())
+        .where(
+            Response.campaign_id == campaign_id,
+            entries.c.key.in_(list(kinds)),
+            func.jsonb_typeof(value) != 'null',
+        )
+        .group_by(*cols)
+    )
+    for row in db.session.execute(stmt):
+        qid, n = row[0], row[-1]
+        if kinds.get(qid) and counted is not None:
+            answers[(qid, str(json.loads(row[1]))[:255])] += n
+        else:
+            answers[(qid, FILLED)] += n
+
+
+def _py_answer_counts(campaign_id: int, kinds: Mapping[str, bool], answers: Counter):
+    """Fallback for databases without usable JSON operators (SQLite): stream answers_json only."""
+    stmt = (
+        select(Response.answers_json)
+        .where(Response.campaign_id == campaign_id)
+        .execution_options(yield_per=1000)
+    )
+    for (data,) in db.session.execute(stmt):
+        if not isinstance(data, dict):
+            continue
+        for qid, val in data.items():
+            if qid not in kinds or val is None:
+                continue
+            answers[(qid, str(normalize_answer(val))[:255] if kinds[qid] else FILLED)] += 1
+
+
+def sql_counters(campaign_id: int, kinds: Mapping[str, bool]) -> Tuple[Counter, Counter]:
+    """Same counters as rollups.count_responses(), aggregated in the database."""
+    dims, answers = Counter(), Counter()
+    _dimension_counts(campaign_id, dims)
+    if not dims or not kinds:
+        return dims, answers
+    if db.session.get_bind().dialect.name == 'postgresql':
+        _pg_answer_counts(campaign_id, kinds, answers)
+    else:
+        _py_answer_counts(campaign_id, kinds, answers)
+    return dims, answers
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
+from flask import current_app
+
+from ..models import Area
+
+
+@dataclass(frozen=True)
+class AreaCatalog:
+    """Active areas held in memory.
+
+    `names` maps id -> name for submit validation; `body` is the ready-to-send
+    JSON of GET /api/areas and `etag` a content hash of it (identical across
+    workers, so any of them can answer 304).
+    """
+    version: int
+    names: Mapping[int, str]
+    body: bytes
+    etag: str
+    loaded_at: float
+
+
+_lock = threading.Lock()
+_versions = itertools.count(1)
+
+
+def _load() -> AreaCatalog:
+    areas = Area.query.filter_by(is_active=True).order_by(Area.name.asc()).all()
+    body = json.dumps(
+        {'items': [{'id': a.id, 'name': a.name} for a in areas]},
+        ensure_ascii=False, separators=(',', ':'),
+    ).encode('utf-8')
+    return AreaCatalog(
+        version=next(_versions),
+        names=MappingProxyType({a.id: a.name for a in areas}),
+        body=body,
+        etag=hashlib.sha1(body).hexdigest(),
+        loaded_at=time.monotonic(),
+    )
+
+
+def get_area_catalog() -> AreaCatalog:
+    """Return the current catalog, reloading it after AREA_CATALOG_TTL seconds."""
+    app = current_app._get_current_object()
+    catalog = app.extensions.get('area_catalog')
+    ttl = app.config['AREA_CATALOG_TTL']
+    if catalog is None or (ttl and time.monotonic() - catalog.loaded_at > ttl):
+        with _lock:
+            catalog = app.extensions.get('area_catalog')
+            if catalog is None or (ttl and time.monotonic() - catalog.loaded_at > ttl):
+                catalog = _load()
+                app.extensions['area_catalog'] = catalog
+    return catalog
+
+
+def invalidate_area_catalog() -> None:
+    """Called after admin area changes; the next read reloads a new version."""
+    current_app.extensions.pop('area_catalog', None)
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import and_, delete, exists, func, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models import Campaign, CampaignArtifact, CampaignRollup, Response
+from ..utils.cache import LRUCache, MISSING
+from .analytics import compute_campaign_analytics
+from .analytics_cache import response_watermark
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactKind(NamedTuple):
+    suffix: str
+    mimetype: str
+    # (campaign, fileobj) -> None
+    write: Callable
+
+
+def _write_analytics(campaign, fh):
+    # app JSON provider: same encoding (dates included) as the analytics endpoint
+    data = compute_campaign_analytics(campaign)
+    fh.write(current_app.json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+
+def _write_pdf(campaign, fh):
+    from .pdf import build_campaign_pdf
+    fh.write(build_campaign_pdf(campaign))
+
+
+def _write_csv(campaign, fh):
+    from .csv_export import iter_responses_csv
+    for chunk in iter_responses_csv(campaign.id):
+        fh.write(chunk)
+
+
+ARTIFACT_KINDS: Dict[str, ArtifactKind] = {
+    'analytics': ArtifactKind('analytics.json', 'application/json', _write_analytics),
+    'pdf': ArtifactKind('report.pdf', 'application/pdf', _write_pdf),
+    'csv': ArtifactKind('responses.csv', 'text/csv', _write_csv),
+}
+
+# sha256 -> parsed analytics.json (content-addressed: never stale)
+_analytics_cache = LRUCache(maxsize=32)
+
+
+class _HashingWriter:
+    def __init__(self, fh):
+        self.fh = fh
+        self.sha = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes):
+        self.sha.update(data)
+        self.size += len(data)
+        self.fh.write(data)
+
+
+def artifacts_dir(app: Flask) -> str:
+    path = os.path.join(app.instance_path, 'artifacts')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def artifact_file(app: Flask, art: CampaignArtifact) -> str:
+    return os.path.join(artifacts_dir(app), art.filename)
+
+
+def closed_clause(now: datetime):
+    """Campaigns whose window ended: their responses can no longer change."""
+    return and_(Campaign.end_at.isnot(None), Campaign.end_at < now)
+
+
+def is_closed(campaign: Campaign, now: Optional[datetime] = None) -> bool:
+    return bool(campaign.end_at and campaign.end_at < (now or datetime.utcnow()))
+
+
+def sha256_file(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def finalize_campaign(campaign: Campaign) -> bool:
+    """Build the analytics JSON, PDF and CSV of a closed campaign. Commits.
+
+    Files are written next to their final name and renamed, then recorded
+    with their sha256 in one transaction that also replaces any previous
+    (stale) rows; the old files are removed after the commit. Returns False
+    when another worker finalized the campaign first (its files are kept,
+    ours removed).
+    """
+    app = current_app._get_current_object()
+    watermark = response_watermark(campaign.id)
+    previous = [artifact_file(app, art) for art in list_artifacts(campaign.id)]
+    written: List[str] = []
+    rows = []
+    part = None
+    try:
+        for kind, spec in ARTIFACT_KINDS.items():
+            filename = f'campaign_{campaign.id}_{watermark}_{uuid.uuid4().hex[:8]}_{spec.suffix}'
+            path = os.path.join(artifacts_dir(app), filename)
+            part = path + '.part'
+            with open(part, 'wb') as fh:
+                out = _HashingWriter(fh)
+                spec.write(campaign, out)
+            os.replace(part, path)
+            part = None
+            written.append(path)
+            rows.append(CampaignArtifact(campaign_id=campaign.id, kind=kind, watermark=watermark,
+                                         filename=filename, size=out.size, sha256=out.sha.hexdigest()))
+        db.session.execute(delete(CampaignArtifact).where(CampaignArtifact.campaign_id == campaign.id))
+        db.session.add_all(rows)
+        db.session.commit()
+        _remove(previous)
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        _remove(written)
+        return False
+    except Exception:
+        db.session.rollback()
+        _remove(written + ([part] if part else []))
+        raise
+
+
+def _remove(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def finalize_closed_campaigns(now: Optional[datetime] = None, limit: int = 5) -> int:
+    """Finalize closed campaigns that have no artifacts yet, or stale ones (oldest end first).
+
+    Artifacts are stale when responses were added after they were built
+    (e.g. an import): get_artifact() no longer serves them. Campaigns with
+    responses but no rollups yet are skipped: freezing them would freeze
+    zero counts.
+    """
+    now = now or datetime.utcnow()
+    latest = (
+        select(func.coalesce(func.max(Response.id), 0))
+        .where(Response.campaign_id == Campaign.id)
+        .scalar_subquery()
+    )
+    frozen = CampaignArtifact.campaign_id == Campaign.id
+    counted = or_(
+        ~exists().where(Response.campaign_id == Campaign.id),
+        exists().where(CampaignRollup.campaign_id == Campaign.id, CampaignRollup.dimension == 'total'),
+    )
+    pending = (
+        Campaign.query
+        .filter(closed_clause(now), counted,
+                or_(~exists().where(frozen), exists().where(frozen, CampaignArtifact.watermark != latest)))
+        .order_by(Campaign.end_at)
+        .limit(limit)
+        .all()
+    )
+    done = 0
+    for campaign in pending:
+        try:
+            done += finalize_campaign(campaign)
+        except Exception:
+            logger.exception('Finalizing campaign %s failed', campaign.id)
+    return done
+
+
+def invalidate_artifacts(campaign_id: int) -> int:
+    """Delete the frozen artifacts of a campaign (refresh/reopen). Commits."""
+    app = current_app._get_current_object()
+    rows = CampaignArtifact.query.filter_by(campaign_id=campaign_id).all()
+    paths = [artifact_file(app, art) for art in rows]
+    for art in rows:
+        db.session.delete(art)
+    db.session.commit()
+    _remove(paths)
+    return len(rows)
+
+
+def list_artifacts(campaign_id: int) -> List[CampaignArtifact]:
+    return CampaignArtifact.query.filter_by(campaign_id=campaign_id).order_by(CampaignArtifact.kind).all()
+
+
+def get_artifact(campaign: Campaign, kind: str) -> Optional[CampaignArtifact]:
+    """The artifact to serve instead of recomputing, or None.
+
+    Only while the campaign is still closed and no response was added since
+    it was built (e.g. an import), and only if the file is still there.
+    """
+    if not is_closed(campaign):
+        return None
+    art = db.session.get(CampaignArtifact, (campaign.id, kind))
+    if art is None or art.watermark != response_watermark(campaign.id):
+        return None
+    if not os.path.exists(artifact_file(current_app._get_current_object(), art)):
+        return None
+    return art
+
+
+def frozen_analytics(campaign: Campaign, sections=None) -> Optional[dict]:
+    """Analytics from the frozen JSON (same shape as compute_campaign_analytics), or None."""
+    art = get_artifact(campaign, 'analytics')
+    if art is None:
+        return None
+    data = _analytics_cache.get(art.sha256)
+    if data is MISSING:
+        with open(artifact_file(current_app._get_current_object(), art), 'rb') as fh:
+            data = json.loads(fh.read().decode('utf-8'))
+        _analytics_cache.set(art.sha256, data)
+    if sections is None:
+        return data
+    keep = set(sections) | {'campaign', 'generated_at'}
+    if 'kpis' in sections:
+        keep.add('totals')
+    return {k: v for k, v in data.items() if k in keep}
+
+
+def copy_artifact(campaign: Campaign, kind: str, fh) -> bool:
+    """Write the frozen file of `kind` to fh; False when there is none."""
+    art = get_artifact(campaign, kind)
+    if art is None:
+        return False
+    with open(artifact_file(current_app._get_current_object(), art), 'rb') as src:
+        for block in iter(lambda: src.read(1024 * 1024), b''):
+            fh.write(block)
+    return True
+
+
+def artifact_info(art: CampaignArtifact) -> dict:
+    return {
+        'kind': art.kind,
+        'size': art.size,
+        'sha256': art.sha256,
+        'watermark': art.watermark,
+        'created_at': art.created_at.isoformat() if art.created_at else None,
+    }
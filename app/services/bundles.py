@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence
+
+from flask import Flask, current_app
+from sqlalchemy import func, or_
+
+from ..extensions import db
+from ..models import Campaign, Survey
+from ..utils.cache import LRUCache, MISSING
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_KINDS = ('pdf', 'csv')
+
+_init_lock = threading.Lock()
+
+# bundle id -> progress of the bundles streamed by this worker (latest ones)
+_progress = LRUCache(maxsize=32)
+
+
+def select_campaigns(category: Optional[str] = None, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None, ids: Optional[Sequence[int]] = None) -> List[Campaign]:
+    """Campaigns for a bundle, oldest first.
+
+    category: survey category (COMEDOR, ...). since/until: campaigns whose
+    window (start_at or created_at .. end_at) overlaps [since, until).
+    ids: explicit campaign ids. Filters combine with AND.
+    """
+    query = Campaign.query.join(Survey, Campaign.survey_id == Survey.id)
+    if category:
+        query = query.filter(Survey.category == category.upper())
+    if ids:
+        query = query.filter(Campaign.id.in_(list(ids)))
+    if until is not None:
+        query = query.filter(func.coalesce(Campaign.start_at, Campaign.created_at) < until)
+    if since is not None:
+        query = query.filter(or_(Campaign.end_at.is_(None), Campaign.end_at >= since))
+    return query.order_by(Campaign.created_at, Campaign.id).all()
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', name or '').strip('_')[:60] or 'campaign'
+
+
+def build_campaign_files(campaign_id: int, out_dir: str) -> dict:
+    """Write the PDF report and responses CSV of a campaign into out_dir.
+
+    Uses the export writers, so closed campaigns copy their frozen files.
+    Never raises: failures are reported in the returned dict.
+    """
+    from .export_jobs import EXPORT_KINDS
+
+    started = time.perf_counter()
+    result = {'campaign_id': campaign_id, 'name': None, 'files': [], 'error': None}
+    try:
+        campaign = db.session.get(Campaign, campaign_id)
+        if campaign is None:
+            raise LookupError('campaign not found')
+        result['name'] = campaign.name
+        for kind in BUNDLE_KINDS:
+            spec = EXPORT_KINDS[kind]
+            path = os.path.join(out_dir, f'{campaign_id}_{spec.suffix}')
+            with open(path, 'wb') as fh:
+                spec.write(campaign, fh, lambda fraction: None)
+            result['files'].append({'kind': kind, 'path': path, 'suffix': spec.suffix})
+    except Exception as exc:
+        logger.exception('Bundle: campaign %s failed', campaign_id)
+        result['error'] = str(exc)[:300]
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+# ---------------------- process pool ----------------------
+# Each worker process builds its own app (same environment/config) once.
+
+_worker_app: Optional[Flask] = None
+
+
+def _init_worker():
+    global _worker_app
+    from .. import create_app
+
+    _worker_app = create_app()
+    # already one process per campaign: render charts in-process
+    _worker_app.config['PDF_CHART_WORKERS'] = 1
+
+
+def _build_in_worker(campaign_id: int, out_dir: str) -> dict:
+    with _worker_app.app_context():
+        try:
+            return build_campaign_files(campaign_id, out_dir)
+        finally:
+            db.session.remove()
+
+
+def bundle_workers(app: Flask) -> int:
+    """BUNDLE_WORKERS, 0 = one process per CPU (max 8)."""
+    configured = app.config['BUNDLE_WORKERS']
+    if configured > 0:
+        return configured
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def _pool(app: Flask) -> ProcessPoolExecutor:
+    pool = app.extensions.get('bundle_pool')
+    if pool is None:
+        with _init_lock:
+            pool = app.extensions.get('bundle_pool')
+            if pool is None:
+                pool = ProcessPoolExecutor(max_workers=bundle_workers(app), initializer=_init_worker,
+                                           mp_context=multiprocessing.get_context('spawn'))
+                app.extensions['bundle_pool'] = pool
+    return pool
+
+
+def _reset_pool(app: Flask):
+    with _init_lock:
+        pool = app.extensions.pop('bundle_pool', None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _failed(campaign_id: int, error: str) -> dict:
+    return {'campaign_id': campaign_id, 'name': None, 'files': [], 'error': error, 'seconds': 0}
+
+
+def _results(app: Flask, campaign_ids: List[int], out_dir: str) -> Iterator[dict]:
+    """Build results in completion order (pool) or in order (BUNDLE_WORKERS=1)."""
+    if bundle_workers(app) <= 1 or len(campaign_ids) < 2:
+        for cid in campaign_ids:
+            yield build_campaign_files(cid, out_dir)
+        return
+    futures = {}
+    try:
+        pool = _pool(app)
+        futures = {pool.submit(_build_in_worker, cid, out_dir): cid for cid in campaign_ids}
+        pending = dict(futures)
+        for fut in as_completed(futures):
+            cid = pending.pop(fut)
+            try:
+                yield fut.result()
+            except BrokenProcessPool:
+                # part of the ZIP is already sent: list the rest as failed and finish it
+                _reset_pool(app)
+                for cid in [cid, *pending.values()]:
+                    yield _failed(cid, 'worker pool failed')
+                return
+            except Exception as exc:  # the worker itself failed to start
+                yield _failed(cid, str(exc)[:300])
+    finally:
+        for fut in futures:
+            fut.cancel()  # client went away: drop what has not started yet
+
+
+class _ZipStream:
+    """Write-only sink for zipfile; no tell(), so entries use data descriptors."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _add_file(zf: zipfile.ZipFile, path: str, arcname: str, compress: bool) -> dict:
+    info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    sha = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as src, zf.open(info, 'w') as dest:
+        for block in iter(lambda: src.read(1024 * 1024), b''):
+            sha.update(block)
+            size += len(block)
+            dest.write(block)
+    return {'path': arcname, 'size': size, 'sha256': sha.hexdigest()}
+
+
+def bundle_status(bundle_id: str) -> Optional[dict]:
+    status = _progress.get(bundle_id)
+    return None if status is MISSING else status
+
+
+def iter_bundle_zip(campaign_ids: Sequence[int], label: str = 'bundle',
+                    bundle_id: Optional[str] = None) -> Iterator[bytes]:
+    """Stream a ZIP with the PDF and CSV of each campaign plus manifest.json.
+
+    Campaigns are built in parallel (BUNDLE_WORKERS processes) and added as
+    they finish, so the total time is close to that of the slowest one.
+    Progress is logged and kept per campaign under bundle_id (see
+    bundle_status); failures are listed in the manifest.
+    """
+    app = current_app._get_current_object()
+    campaign_ids = list(campaign_ids)
+    status = {'label': label, 'total': len(campaign_ids), 'done': 0, 'finished': False,
+              'campaigns': {str(cid): 'pending' for cid in campaign_ids}}
+    if bundle_id:
+        _progress.set(bundle_id, status)
+    base = os.path.join(app.instance_path, 'bundles')
+    os.makedirs(base, exist_ok=True)
+    out_dir = tempfile.mkdtemp(prefix='bundle_', dir=base)
+    sink = _ZipStream()
+    manifest = {'label': label, 'generated_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+                'campaigns': []}
+    started = time.perf_counter()
+    try:
+        with zipfile.ZipFile(sink, 'w') as zf:
+            for done, result in enumerate(_results(app, campaign_ids, out_dir), start=1):
+                cid = result['campaign_id']
+                entry = {'id': cid, 'name': result['name'], 'seconds': result['seconds'],
+                         'error': result['error'], 'files': []}
+                if result['error'] is None:
+                    folder = f'{cid}_{_slug(result["name"])}'
+                    for f in result['files']:
+                        entry['files'].append(
+                            _add_file(zf, f['path'], f'{folder}/{f["suffix"]}', compress=f['kind'] != 'pdf'))
+                        os.remove(f['path'])
+                manifest['campaigns'].append(entry)
+                status['done'] = done
+                status['campaigns'][str(cid)] = 'error' if result['error'] else 'done'
+                logger.info('Bundle %s: campaign %s %s (%d/%d, %.1fs)', label, cid,
+                            'failed' if result['error'] else 'done', done, len(campaign_ids), result['seconds'])
+                yield sink.drain()
+            manifest['seconds'] = round(time.perf_counter() - started, 3)
+            manifest['campaigns'].sort(key=lambda e: e['id'])
+            zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+        yield sink.drain()
+        status['finished'] = True
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import List, Mapping, Optional
+
+from flask import current_app
+
+from ..models import Campaign
+from ..utils.cache import LRUCache, MISSING
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+@dataclass(frozen=True)
+class CampaignView:
+    """Immutable, DB-detached view of a Campaign for the public endpoints.
+
+    `snapshot` is the parsed snapshot_json; treat it as read-only.
+    """
+    id: int
+    token: str
+    name: str
+    is_active: bool
+    start_at: Optional[datetime]
+    end_at: Optional[datetime]
+    require_area: bool
+    require_shift: bool
+    snapshot: Mapping
+
+    @classmethod
+    def from_model(cls, c: Campaign) -> "CampaignView":
+        return cls(
+            id=c.id,
+            token=c.token,
+            name=c.name,
+            is_active=bool(c.is_active),
+            start_at=c.start_at,
+            end_at=c.end_at,
+            require_area=bool(c.require_area),
+            require_shift=bool(c.require_shift),
+            snapshot=MappingProxyType(dict(c.snapshot_json or {})),
+        )
+
+    @property
+    def snapshot_json(self) -> Mapping:
+        # Templates were written against the model attribute name
+        return self.snapshot
+
+    def is_active_at(self, now: Optional[datetime] = None) -> bool:
+        """Same rule as Campaign.is_active_at()."""
+        now = now or datetime.utcnow()
+        if not (self.start_at or self.end_at):
+            return self.is_active
+        if self.start_at and now < self.start_at:
+            return False
+        if self.end_at and now > self.end_at:
+            return False
+        return True
+
+
+@dataclass(frozen=True)
+class CampaignPayload:
+    """GET /api/campaign/<token> body, serialized and compressed once per version."""
+    etag: str
+    body: bytes
+    gzip: bytes
+    br: Optional[bytes]
+
+
+_init_lock = threading.Lock()
+
+
+def _extension_cache(name: str, ttl: Optional[int] = None) -> LRUCache:
+    app = current_app._get_current_object()
+    cache = app.extensions.get(name)
+    if cache is None:
+        with _init_lock:
+            cache = app.extensions.get(name)
+            if cache is None:
+                cache = LRUCache(app.config['CAMPAIGN_CACHE_SIZE'], ttl=ttl)
+                app.extensions[name] = cache
+    return cache
+
+
+def _cache() -> LRUCache:
+    return _extension_cache('campaign_cache', ttl=current_app.config['CAMPAIGN_CACHE_TTL'])
+
+
+def get_campaign_view(token: str) -> Optional[CampaignView]:
+    """Return the cached view for token (None if it does not exist).
+
+    Misses are cached too, so unknown tokens do not hit the database either.
+    Admin changes invalidate the entry in the worker that handled them; other
+    workers see the change once CAMPAIGN_CACHE_TTL expires.
+    """
+    cache = _cache()
+    view = cache.get(token)
+    if view is MISSING:
+        c = Campaign.query.filter_by(token=token).first()
+        view = CampaignView.from_model(c) if c else None
+        cache.set(token, view)
+    return view
+
+
+def invalidate_campaign(token: Optional[str] = None) -> None:
+    """Drop one token (or every entry when token is None)."""
+    if token is None:
+        _cache().clear()
+    else:
+        _cache().pop(token)
+
+
+def cache_stats() -> dict:
+    return _cache().stats()
+
+
+def get_campaign_payload(view: CampaignView, shifts: List[str]) -> CampaignPayload:
+    """Return the public bootstrap payload of a campaign view.
+
+    The JSON is rebuilt only when the view object changes (cache refresh) and
+    recompressed only when its content hash (the ETag) changes.
+    """
+    cache = _extension_cache('campaign_payloads')
+    entry = cache.get(view.token, None)
+    if entry is not None and entry[0] is view:
+        return entry[1]
+
+    body = json.dumps({
+        'token': view.token,
+        'campaign_id': view.id,
+        'name': view.name,
+        'require_area': view.require_area,
+        'require_shift': view.require_shift,
+        'shifts': list(shifts),
+        'snapshot': dict(view.snapshot),
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    etag = hashlib.sha256(body).hexdigest()[:32]
+
+    if entry is not None and entry[1].etag == etag:
+        payload = entry[1]
+    else:
+        payload = CampaignPayload(
+            etag=etag,
+            body=body,
+            gzip=gzip.compress(body, compresslevel=9, mtime=0),
+            br=brotli.compress(body, quality=11) if brotli else None,
+        )
+    cache.set(view.token, (view, payload))
+    return payload
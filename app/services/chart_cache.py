@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional, Sequence
+
+from flask import Flask, current_app
+
+from ..utils.cache import LRUCache, MISSING
+from .charts import DPI, RENDER_VERSION, ChartSpec, chart_workers, figure_size, render_charts
+
+logger = logging.getLogger(__name__)
+
+_init_lock = threading.Lock()
+
+
+def chart_key(spec: ChartSpec) -> str:
+    """Content address of a chart: kind, labels, values, titles and size."""
+    raw = json.dumps(
+        [RENDER_VERSION, spec.kind, spec.labels, spec.values, spec.title, spec.subtitle,
+         figure_size(spec), DPI],
+        ensure_ascii=False, separators=(',', ':'),
+    )
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class DiskChartCache:
+    """PNG files under a directory, evicted least-recently-used by size.
+
+    Shared by every worker of the host: writes are atomic (temp file +
+    rename) and files removed by another process are just misses. Hits
+    touch the file's mtime, eviction removes the oldest mtimes until the
+    directory is under 80% of max_bytes.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None  # estimate; rescanned on eviction
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key + '.png')
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._file(key)
+        try:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def set(self, key: str, data: bytes):
+        path = self._file(key)
+        tmp = f'{path}.{uuid.uuid4().hex}.part'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, 'wb') as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning('Could not write chart cache file %s', path, exc_info=True)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan(self):
+        out = []
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if not name.endswith('.png'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def _evict(self):
+        files = sorted(self._scan())
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.8)
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self._size = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            files = self._scan()
+            self._size = sum(size for _, size, _ in files)
+            return {'path': self.path, 'files': len(files), 'bytes': self._size, 'max_bytes': self.max_bytes}
+
+
+def _memory(app: Flask) -> LRUCache:
+    cache = app.extensions.get('chart_cache')
+    if cache is None:
+        with _init_lock:
+            cache = app.extensions.get('chart_cache')
+            if cache is None:
+                cache = LRUCache(app.config['CHART_CACHE_SIZE'])
+                app.extensions['chart_cache'] = cache
+    return cache
+
+
+def _disk(app: Flask) -> Optional[DiskChartCache]:
+    if app.config['CHART_CACHE_DISK_MB'] <= 0:
+        return None
+    cache = app.extensions.get('chart_cache_disk')
+    if cache is None:
+        with _init_lock:
+            cache = app.extensions.get('chart_cache_disk')
+            if cache is None:
+                cache = DiskChartCache(os.path.join(app.instance_path, 'chart_cache'),
+                                       app.config['CHART_CACHE_DISK_MB'] * 1024 * 1024)
+                app.extensions['chart_cache_disk'] = cache
+    return cache
+
+
+def cached_render_charts(specs: Sequence[ChartSpec]) -> List[bytes]:
+    """render_charts() behind the chart cache (memory LRU, then disk).
+
+    Only the misses are rendered (in the chart process pool); an export of
+    data that did not change renders nothing.
+    """
+    app = current_app._get_current_object()
+    memory, disk = _memory(app), _disk(app)
+    keys = [chart_key(s) for s in specs]
+    found: Dict[str, bytes] = {}
+    for key in keys:
+        if key in found:
+            continue
+        png = memory.get(key)
+        if png is MISSING:
+            png = disk.get(key) if disk else None
+            if png is None:
+                continue
+            memory.set(key, png)
+        found[key] = png
+
+    missing = {}
+    for key, spec in zip(keys, specs):
+        if key not in found:
+            missing.setdefault(key, spec)
+    if missing:
+        rendered = render_charts(list(missing.values()), chart_workers(app.config['PDF_CHART_WORKERS']))
+        for key, png in zip(missing, rendered):
+            found[key] = png
+            memory.set(key, png)
+            if disk:
+                disk.set(key, png)
+    return [found[k] for k in keys]
+
+
+def chart_cache_stats() -> dict:
+    app = current_app._get_current_object()
+    disk = _disk(app)
+    return {'memory': _memory(app).stats(), 'disk': disk.stats() if disk else None}
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+
+class ChartSpec(NamedTuple):
+    """Everything needed to render one report chart (picklable, hashable)."""
+    kind: str  # bar | horizontal
+    labels: Tuple[str, ...]
+    values: Tuple[int, ...]
+    title: str = ""
+    subtitle: str = ""
+
+    @classmethod
+    def build(cls, kind: str, labels, values, title: str = "", subtitle: str = "") -> "ChartSpec":
+        return cls(kind, tuple(str(x) for x in labels),
+                   tuple(int(v) if v is not None else 0 for v in values), title or "", subtitle or "")
+
+
+# Bump when the look of the charts changes: cached images are keyed on it
+RENDER_VERSION = 1
+DPI = 180
+WIDTH_IN = 7.2
+
+
+def figure_size(spec: ChartSpec) -> Tuple[float, float]:
+    """(width, height) in inches of the rendered chart."""
+    if spec.kind == "horizontal":
+        return WIDTH_IN, 2.6 + (0.18 * min(len(spec.labels), 12))
+    return WIDTH_IN, 2.75
+
+
+def _pct(n: int, total: int) -> float:
+    if total <= 0:
+        return 0.0
+    return (float(n) / float(total)) * 100.0
+
+
+# ---------------------- matplotlib renderers ----------------------
+# (PDF_CHART_BACKEND=png; matplotlib is only imported when they are used)
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _style_axes(ax):
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    ax.spines["left"].set_alpha(0.35)
+    ax.spines["bottom"].set_alpha(0.35)
+    ax.grid(axis="y", alpha=0.18, linewidth=0.8)
+    ax.set_axisbelow(True)
+
+
+def _chart_png_bar(labels: List[str], values: List[int], title: str, subtitle: str = "") -> bytes:
+    labels = [str(x) for x in labels]
+    values = [int(v) if v is not None else 0 for v in values]
+    total = sum(values)
+
+    plt = _pyplot()
+    fig = plt.figure(figsize=figure_size(ChartSpec("bar", tuple(labels), ())), dpi=DPI)
+    ax = fig.add_subplot(111)
+
+    bar_color = "#00386C"  # BW_BLUE
+    bars = ax.bar(range(len(labels)), values, color=bar_color, alpha=0.92)
+
+    ax.set_title(title or "", fontsize=11.5, fontweight="bold", pad=10)
+    if subtitle:
+        ax.text(0.0, 1.02, subtitle, transform=ax.transAxes, fontsize=9.5, alpha=0.75)
+
+    _style_axes(ax)
+
+    max_len = max((len(x) for x in labels), default=0)
+    rot = 0 if max_len <= 12 and len(labels) <= 6 else 22
+    ax.set_xticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=rot, ha="right" if rot else "center", fontsize=9)
+
+    ax.set_ylabel("Respuestas", fontsize=9)
+
+    ymax = max(values) if values else 0
+    ax.set_ylim(0, max(1, int(ymax * 1.25)))
+
+    for rect, v in zip(bars, values):
+        if total > 0:
+            p = _pct(v, total)
+            lab = f"{v} ({p:.1f}%)"
+        else:
+            lab = f"{v}"
+        ax.text(
+            rect.get_x() + rect.get_width() / 2.0,
+            rect.get_height() + (0.03 * ax.get_ylim()[1]),
+            lab,
+            ha="center",
+            va="bottom",
+            fontsize=8.5,
+            color="#0B1E33",
+        )
+
+    fig.tight_layout()
+    out = io.BytesIO()
+    fig.savefig(out, format="png", transparent=False)
+    plt.close(fig)
+    return out.getvalue()
+
+
+def _chart_png_horizontal(labels: List[str], values: List[int], title: str, subtitle: str = "") -> bytes:
+    labels = [str(x) for x in labels]
+    values = [int(v) if v is not None else 0 for v in values]
+    total = sum(values)
+
+    plt = _pyplot()
+    fig = plt.figure(figsize=figure_size(ChartSpec("horizontal", tuple(labels), ())), dpi=DPI)
+    ax = fig.add_subplot(111)
+
+    bar_color = "#0E8187"  # BW_SEA
+    bars = ax.barh(range(len(labels)), values, color=bar_color, alpha=0.92)
+
+    ax.set_title(title or "", fontsize=11.5, fontweight="bold", pad=10)
+    if subtitle:
+        ax.text(0.0, 1.02, subtitle, transform=ax.transAxes, fontsize=9.5, alpha=0.75)
+
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    ax.spines["left"].set_alpha(0.35)
+    ax.spines["bottom"].set_alpha(0.35)
+    ax.grid(axis="x", alpha=0.18, linewidth=0.8)
+    ax.set_axisbelow(True)
+
+    ax.set_yticks(range(len(labels)))
+    ax.set_yticklabels(labels, fontsize=9)
+
+    ax.set_xlabel("Respuestas", fontsize=9)
+
+    xmax = max(values) if values else 0
+    ax.set_xlim(0, max(1, int(xmax * 1.30)))
+
+    for rect, v in zip(bars, values):
+        if total > 0:
+            p = _pct(v, total)
+            lab = f"{v} ({p:.1f}%)"
+        else:
+            lab = f"{v}"
+        ax.text(
+            rect.get_width() + (0.02 * ax.get_xlim()[1]),
+            rect.get_y() + rect.get_height() / 2.0,
+            lab,
+            va="center",
+            ha="left",
+            fontsize=8.5,
+            color="#0B1E33",
+        )
+
+    fig.tight_layout()
+    out = io.BytesIO()
+    fig.savefig(out, format="png", transparent=False)
+    plt.close(fig)
+    return out.getvalue()
+
+
+def render_chart(spec: ChartSpec) -> bytes:
+    """PNG of one chart (module-level so pool workers can run it)."""
+    if spec.kind == "horizontal":
+        return _chart_png_horizontal(list(spec.labels), list(spec.values), spec.title, spec.subtitle)
+    return _chart_png_bar(list(spec.labels), list(spec.values), spec.title, spec.subtitle)
+
+
+# ---------------------- process pool ----------------------
+# matplotlib is not thread-safe and holds the GIL while rendering, so charts
+# are rendered in worker processes ('spawn': no forked DB connections/locks).
+
+# The pool is shut down after POOL_IDLE_SECONDS without renders, so idle web
+# workers do not keep their chart processes around.
+
+POOL_IDLE_SECONDS = 300
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_busy = 0
+_idle_timer: Optional[threading.Timer] = None
+_pool_lock = threading.Lock()
+
+
+def chart_workers(configured: int) -> int:
+    """Worker count for a PDF_CHART_WORKERS value (0 = one per CPU, up to 8)."""
+    if configured and configured > 0:
+        return configured
+    return max(1, min(os.cpu_count() or 1, 8))
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """The shared pool, marked busy until _release_pool()."""
+    global _pool, _pool_workers, _pool_busy
+    with _pool_lock:
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        _pool_busy += 1
+        return _pool
+
+
+def _release_pool():
+    global _pool_busy, _idle_timer
+    with _pool_lock:
+        _pool_busy -= 1
+        if _pool is None or _pool_busy:
+            return
+        _idle_timer = threading.Timer(POOL_IDLE_SECONDS, _shutdown_idle_pool)
+        _idle_timer.daemon = True
+        _idle_timer.start()
+
+
+def _shutdown_idle_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool_busy:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def render_charts(specs: Sequence[ChartSpec], workers: int = 1) -> List[bytes]:
+    """Render specs, in order. Uses the process pool when workers > 1 and
+    there is more than one chart; falls back to in-process rendering if the
+    pool breaks (e.g. a worker was killed)."""
+    specs = list(specs)
+    if workers <= 1 or len(specs) < 2:
+        return [render_chart(s) for s in specs]
+    pool = _get_pool(workers)
+    try:
+        return list(pool.map(render_chart, specs))
+    except BrokenProcessPool:
+        _reset_pool()
+        return [render_chart(s) for s in specs]
+    finally:
+        _release_pool()
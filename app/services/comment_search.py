@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import html
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import DateTime, Float, Integer, String, Text, bindparam, text
+
+from ..extensions import db
+from ..models import ResponseComment
+
+# highlight markers: control characters never present in submitted text
+START, STOP = '\x02', '\x03'
+PG_CONFIG = 'spanish'
+
+_COLUMNS = dict(
+    id=Integer, response_id=Integer, question_id=String, lang=String, area_id=Integer,
+    shift=String, submitted_at=DateTime, text=Text, hl=Text, rank=Float,
+)
+
+
+def _backend() -> str:
+    """'pg' (tsvector), 'fts5' (SQLite) or 'like' when the search index is missing."""
+    app = current_app._get_current_object()
+    backend = app.extensions.get('comment_search_backend')
+    if backend is None:
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            backend = 'pg'
+        elif dialect == 'sqlite' and db.session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'response_comments_fts'")).first():
+            backend = 'fts5'
+        else:
+            backend = 'like'
+        app.extensions['comment_search_backend'] = backend
+    return backend
+
+
+def _terms(q: str) -> List[str]:
+    return re.findall(r'\w+', q or '', re.UNICODE)
+
+
+def _filters(params: dict, area_id, shift, since, until) -> str:
+    sql = ''
+    if area_id is not None:
+        sql += ' AND c.area_id = :area_id'
+        params['area_id'] = area_id
+    if shift:
+        sql += ' AND c.shift = :shift'
+        params['shift'] = shift
+    if since is not None:
+        sql += ' AND c.submitted_at >= :since'
+        params['since'] = since
+    if until is not None:
+        sql += ' AND c.submitted_at < :until'
+        params['until'] = until
+    return sql
+
+
+def highlight_html(marked: str) -> str:
+    """Escape text and turn the START/STOP markers into <mark> tags."""
+    return html.escape(marked or '').replace(START, '<mark>').replace(STOP, '</mark>')
+
+
+def _like_search(campaign_id, terms, area_id, shift, since, until, limit, offset):
+    q = ResponseComment.query.filter(ResponseComment.campaign_id == campaign_id)
+    for t in terms:
+        pattern = '%' + t.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        q = q.filter(ResponseComment.text.ilike(pattern, escape='\\'))
+    if area_id is not None:
+        q = q.filter(ResponseComment.area_id == area_id)
+    if shift:
+        q = q.filter(ResponseComment.shift == shift)
+    if since is not None:
+        q = q.filter(ResponseComment.submitted_at >= since)
+    if until is not None:
+        q = q.filter(ResponseComment.submitted_at < until)
+    rows = q.order_by(ResponseComment.submitted_at.desc(), ResponseComment.id.desc()) \
+        .offset(offset).limit(limit + 1).all()
+    pattern = re.compile('|'.join(re.escape(t) for t in terms), re.IGNORECASE)
+    out = []
+    for r in rows:
+        out.append({
+            'id': r.id, 'response_id': r.response_id, 'question_id': r.question_id, 'lang': r.lang,
+            'area_id': r.area_id, 'shift': r.shift, 'submitted_at': r.submitted_at, 'text': r.text,
+            'hl': pattern.sub(lambda m: START + m.group(0) + STOP, r.text), 'rank': 0.0,
+        })
+    return out
+
+
+def search_comments(campaign_id: int, q: str, *, area_id: Optional[int] = None, shift: Optional[str] = None,
+                    since: Optional[datetime] = None, until: Optional[datetime] = None,
+                    limit: int = 20, offset: int = 0) -> Tuple[List[dict], bool]:
+    """Ranked comment matches of one campaign; returns (rows, has_more).
+
+    Every word of q must match (prefix match on SQLite). Rows carry the
+    comment columns plus `hl` (text with START/STOP markers, see
+    highlight_html) and `rank` (higher is better).
+    """
+    terms = _terms(q)
+    if not terms:
+        return [], False
+    backend = _backend()
+    params = {'cid': campaign_id, 'limit': limit + 1, 'offset': offset}
+    where = _filters(params, area_id, shift, since, until)
+
+    if backend == 'fts5':
+        params['match'] = ' '.join(f'"{t}"*' for t in terms)
+        params.update(start=START, stop=STOP)
+        sql = (
+            'SELECT c.id, c.response_id, c.question_id, c.lang, c.area_id, c.shift, c.submitted_at, c.text, '
+            'highlight(response_comments_fts, 0, :start, :stop) AS hl, '
+            '-bm25(response_comments_fts) AS rank '
+            'FROM response_comments_fts JOIN response_comments c ON c.id = response_comments_fts.rowid '
+            'WHERE response_comments_fts MATCH :match AND c.campaign_id = :cid' + where +
+            ' ORDER BY rank DESC, c.id DESC LIMIT :limit OFFSET :offset'
+        )
+    elif backend == 'pg':
+        params['q'] = ' '.join(terms)
+        params['opts'] = f'StartSel={START}, StopSel={STOP}, HighlightAll=true'
+        sql = (
+            'SELECT c.id, c.response_id, c.question_id, c.lang, c.area_id, c.shift, c.submitted_at, c.text, '
+            f"ts_headline('{PG_CONFIG}', c.text, query, :opts) AS hl, "
+            'ts_rank(c.text_tsv, query) AS rank '
+            f"FROM response_comments c, websearch_to_tsquery('{PG_CONFIG}', :q) query "
+            'WHERE c.campaign_id = :cid AND c.text_tsv @@ query' + where +
+            ' ORDER BY rank DESC, c.id DESC LIMIT :limit OFFSET :offset'
+        )
+    else:
+        rows = _like_search(campaign_id, terms, area_id, shift, since, until, limit, offset)
+        return rows[:limit], len(rows) > limit
+
+    stmt = text(sql).bindparams(*[bindparam(k, type_=DateTime()) for k in ('since', 'until') if k in params])
+    stmt = stmt.columns(**_COLUMNS)
+    rows = [dict(r._mapping) for r in db.session.execute(stmt, params)]
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Dict, List, Mapping, Optional
+
+from sqlalchemy import delete, insert, select
+
+from ..extensions import db
+from ..models import Campaign, CampaignRollup, Response, ResponseComment
+from ..utils.cache import LRUCache, MISSING
+from .rollups import COMMENTS, add_counts, bump_generation
+
+TEXT_TYPES = ('text', 'textarea', 'comment')
+
+# campaign id -> text questions of its snapshot (snapshots do not change)
+_questions_cache = LRUCache(maxsize=256)
+
+
+def text_questions(snapshot: Optional[Mapping]) -> Dict[str, dict]:
+    """qid -> question for the free-text questions of a snapshot.
+
+    Snapshot formats supported:
+      - snapshot['questions'] (legacy)
+      - snapshot['schema']['questions'] (current)
+    """
+    schema = snapshot.get('schema') if isinstance(snapshot, Mapping) else None
+    questions = []
+    if isinstance(snapshot, Mapping) and isinstance(snapshot.get('questions'), list):
+        questions = snapshot.get('questions') or []
+    elif isinstance(schema, Mapping) and isinstance(schema.get('questions'), list):
+        questions = schema.get('questions') or []
+    return {
+        str(q.get('id')): q for q in questions
+        if isinstance(q, dict) and (q.get('type') or '').lower() in TEXT_TYPES
+    }
+
+
+def comment_text(val) -> Optional[str]:
+    """Stripped text of an answer, or None.
+
+    Answer formats supported:
+      - string (preferred)
+      - dict with 'text' or 'value' (compat with older clients)
+    """
+    text_val = None
+    if isinstance(val, str):
+        text_val = val
+    elif isinstance(val, dict):
+        if isinstance(val.get('text'), str):
+            text_val = val.get('text')
+        elif isinstance(val.get('value'), str):
+            text_val = val.get('value')
+    text_val = (text_val or '').strip()
+    return text_val or None
+
+
+def question_label(q: Optional[Mapping], qid: str, lang: str) -> str:
+    qtext = (q or {}).get('text') or {}
+    if isinstance(qtext, dict):
+        qlabel = qtext.get(lang) or qtext.get('es') or qtext.get('en')
+    else:
+        qlabel = str(qtext)
+    return qlabel or str(qid)
+
+
+def _text_questions_for(campaign_id: int) -> Dict[str, dict]:
+    qmeta = _questions_cache.get(campaign_id)
+    if qmeta is MISSING:
+        snapshot = db.session.query(Campaign.snapshot_json).filter(Campaign.id == campaign_id).scalar()
+        qmeta = text_questions(snapshot)
+        _questions_cache.set(campaign_id, qmeta)
+    return qmeta
+
+
+def forget_text_questions(campaign_id: int):
+    """Drop the cached text questions (campaign deleted; SQLite may reuse its id)."""
+    _questions_cache.pop(campaign_id)
+
+
+def _comment_rows(response_id: int, row: Mapping, qmeta: Mapping[str, dict]) -> List[dict]:
+    out = []
+    data = row.get('answers_json')
+    if not isinstance(data, dict):
+        return out  # legacy rows stored before answers were validated
+    for qid, val in data.items():
+        if str(qid) not in qmeta:
+            continue
+        text_val = comment_text(val)
+        if text_val:
+            out.append({
+                'response_id': response_id,
+                'campaign_id': row['campaign_id'],
+                'question_id': str(qid)[:120],
+                'lang': row.get('lang') or 'es',
+                'area_id': row.get('area_id'),
+                'shift': row.get('shift'),
+                'submitted_at': row['submitted_at'],
+                'text': text_val,
+            })
+    return out
+
+
+def index_comments(rows: List[Mapping], ids: List[int]):
+    """Store the text answers of freshly inserted responses, in the caller's transaction.
+
+    Also counts them in the campaign's 'comments' rollup (the comments page total).
+    """
+    out = []
+    for response_id, row in zip(ids, rows):
+        qmeta = _text_questions_for(row['campaign_id'])
+        if qmeta:
+            out.extend(_comment_rows(response_id, row, qmeta))
+    if out:
+        db.session.execute(insert(ResponseComment), out)
+        add_counts(COMMENTS, Counter(c['campaign_id'] for c in out))
+
+
+def backfill_comments(campaign_id: int) -> int:
+    """Rebuild a campaign's comment rows from its responses. Commits.
+
+    Frozen artifacts are dropped, as in rebuild_rollups().
+    """
+    qmeta = _text_questions_for(campaign_id)
+    stmt = (
+        select(Response.id, Response.campaign_id, Response.lang, Response.area_id,
+               Response.shift, Response.submitted_at, Response.answers_json)
+        .where(Response.campaign_id == campaign_id)
+        .execution_options(yield_per=1000)
+    )
+    total = 0
+    try:
+        db.session.execute(delete(ResponseComment).where(ResponseComment.campaign_id == campaign_id))
+        db.session.execute(delete(CampaignRollup).where(
+            CampaignRollup.campaign_id == campaign_id, CampaignRollup.dimension == COMMENTS))
+        if qmeta:
+            batch = []
+            for row in db.session.execute(stmt):
+                batch.extend(_comment_rows(row.id, row._mapping, qmeta))
+                if len(batch) >= 1000:
+                    db.session.execute(insert(ResponseComment), batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                db.session.execute(insert(ResponseComment), batch)
+                total += len(batch)
+        add_counts(COMMENTS, {campaign_id: total})
+        bump_generation(campaign_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    from .artifacts import invalidate_artifacts  # artifacts -> analytics -> comments
+    invalidate_artifacts(campaign_id)
+    return total
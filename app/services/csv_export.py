@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from typing import Any, Callable, Iterable, Iterator, List, Mapping, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from ..extensions import db
+from ..models import Area, Campaign, Response
+from .analytics import LIKERT_PRESETS
+from .rollups import normalize_answer
+
+HEADER = [
+    'response_id', 'submitted_at', 'lang', 'area', 'shift', 'wants_followup', 'contact_name', 'employee_no', 'source', 'answers_json'
+]
+
+# rows fetched per round trip / approximate bytes per yielded chunk
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+class WideColumn(NamedTuple):
+    """One exported column of a question: header and answer -> cell value."""
+    header: str
+    value: Callable[[Any], Any]
+
+
+def _stream_rows(campaign_id: int, progress: Optional[Callable[[int], None]] = None):
+    """Responses of a campaign, newest first, streamed in BATCH_SIZE batches.
+
+    progress(rows_done) is called after every batch.
+    """
+    stmt = (
+        select(Response.id, Response.submitted_at, Response.lang, Response.area_id, Response.shift,
+               Response.wants_followup, Response.contact_name, Response.employee_no, Response.source,
+               Response.answers_json)
+        .where(Response.campaign_id == campaign_id)
+        .order_by(Response.submitted_at.desc(), Response.id.desc())
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    result = db.session.execute(stmt)
+    if progress is None:
+        return result
+    return _counted(result, progress)
+
+
+def _counted(rows, progress):
+    n = 0
+    for n, row in enumerate(rows, start=1):
+        yield row
+        if n % BATCH_SIZE == 0:
+            progress(n)
+    progress(n)
+
+
+def _csv_chunks(rows: Iterable[list]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= CHUNK_SIZE:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+
+
+def iter_responses_csv(campaign_id: int, progress: Optional[Callable[[int], None]] = None) -> Iterator[bytes]:
+    """Yield the responses CSV of a campaign in ~CHUNK_SIZE pieces (UTF-8).
+
+    Rows are streamed with yield_per, so memory stays flat whatever the size
+    of the campaign; area names come from one lookup done up front.
+    """
+    area_names = dict(db.session.query(Area.id, Area.name).all())
+
+    def rows():
+        yield HEADER
+        for r in _stream_rows(campaign_id, progress):
+            yield [
+                r.id,
+                r.submitted_at.isoformat(sep=' ', timespec='seconds'),
+                r.lang,
+                area_names.get(r.area_id, '') if r.area_id else '',
+                r.shift or '',
+                '1' if r.wants_followup else '0',
+                r.contact_name or '',
+                r.employee_no or '',
+                r.source or '',
+                json.dumps(r.answers_json, ensure_ascii=False),
+            ]
+
+    return _csv_chunks(rows())
+
+
+# ---- Wide export: one column per question of the snapshot ----
+
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+WIDE_BASE_HEADER = [
+    'response_id', 'submitted_at', 'lang', 'area', 'shift', 'wants_followup', 'contact_name', 'employee_no', 'source'
+]
+
+
+def _label_text(label) -> str:
+    if isinstance(label, dict):
+        return label.get('es') or label.get('en') or ''
+    return label if isinstance(label, str) else ''
+
+
+def _as_number(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return v
+
+
+def _plain(v):
+    if v is None:
+        return None
+    if isinstance(v, (list, tuple)):
+        return '; '.join(str(x) for x in v)
+    if isinstance(v, dict):
+        return json.dumps(v, ensure_ascii=False)
+    return v
+
+
+def wide_columns(snapshot: Optional[Mapping]) -> List[WideColumn]:
+    """Columns for snapshot['schema']['questions'], in questionnaire order.
+
+    likert: number plus label (preset label for 5-point scales, as in the
+    report); single: option value plus label; anything else: the answer.
+    """
+    questions = ((snapshot or {}).get('schema') or {}).get('questions') or []
+    cols = []
+    for q in questions:
+        qid = q.get('id') if isinstance(q, dict) else None
+        if not qid:
+            continue
+        qtype = (q.get('type') or '').lower()
+        title = _label_text(q.get('text')) or qid
+
+        def get(answers, qid=qid):
+            return normalize_answer(answers.get(qid))
+
+        if qtype == 'likert':
+            scale = int(q.get('scale') or 5)
+            preset = LIKERT_PRESETS.get((q.get('likert_preset') or 'satisfaction').strip().lower())
+            labels = {str(i): (preset[i - 1] if preset and scale == 5 else str(i)) for i in range(1, scale + 1)}
+            cols.append(WideColumn(title, lambda a, get=get: _as_number(get(a))))
+            cols.append(WideColumn(f'{title} [etiqueta]', lambda a, get=get, labels=labels: labels.get(str(get(a)))))
+        elif qtype == 'single':
+            labels = {str(o.get('value')): _label_text(o.get('label')) or str(o.get('value'))
+                      for o in (q.get('options') or []) if isinstance(o, dict)}
+            cols.append(WideColumn(title, lambda a, get=get: _plain(get(a))))
+            cols.append(WideColumn(f'{title} [etiqueta]',
+                                   lambda a, get=get, labels=labels: labels.get(str(get(a)), _plain(get(a)))))
+        else:
+            cols.append(WideColumn(title, lambda a, get=get: _plain(get(a))))
+    return cols
+
+
+def iter_wide_rows(campaign: Campaign, progress: Optional[Callable[[int], None]] = None) -> Iterator[list]:
+    """Header, then one row per response with typed cell values (CSV and XLSX)."""
+    cols = wide_columns(campaign.snapshot_json)
+    area_names = dict(db.session.query(Area.id, Area.name).all())
+    yield WIDE_BASE_HEADER + [c.header for c in cols]
+    for r in _stream_rows(campaign.id, progress):
+        answers = r.answers_json or {}
+        yield [
+            r.id,
+            r.submitted_at.replace(microsecond=0),
+            r.lang,
+            area_names.get(r.area_id) if r.area_id else None,
+            r.shift,
+            1 if r.wants_followup else 0,
+            r.contact_name,
+            r.employee_no,
+            r.source,
+        ] + [c.value(answers) for c in cols]
+
+
+def _csv_cell(v):
+    if v is None:
+        return ''
+    if isinstance(v, str) and v[:1] in FORMULA_PREFIXES:
+        return "'" + v  # free text must not be evaluated by spreadsheet apps
+    return v
+
+
+def iter_wide_csv(campaign: Campaign, progress: Optional[Callable[[int], None]] = None) -> Iterator[bytes]:
+    """Wide CSV counterpart of iter_responses_csv()."""
+    def rows():
+        for row in iter_wide_rows(campaign, progress):
+            yield [_csv_cell(v) for v in row]
+    return _csv_chunks(rows())
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a byte stream on the fly (one gzip member)."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
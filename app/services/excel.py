@@ -1,9 +1,11 @@
-from typing import Tuple
+from typing import BinaryIO, Callable, Optional, Tuple
 
-from openpyxl import load_workbook
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 
 from ..extensions import db
-from ..models import Area
+from ..models import Area, Campaign
+from .csv_export import iter_wide_rows
 
 
 def import_areas_from_excel(file_like) -> Tuple[int, int]:
@@ -37,3 +39,25 @@ def import_areas_from_excel(file_like) -> Tuple[int, int]:
         created += 1
 
     return created, skipped
+
+
+def _text_cell(ws, value: str) -> WriteOnlyCell:
+    # openpyxl stores strings starting with '=' as formulas; answers are plain text
+    cell = WriteOnlyCell(ws, value=value)
+    cell.data_type = 's'
+    return cell
+
+
+def write_responses_xlsx(campaign: Campaign, fileobj: BinaryIO,
+                         progress: Optional[Callable[[int], None]] = None) -> None:
+    """Wide responses workbook (one column per question) written to fileobj.
+
+    Uses openpyxl write_only mode: rows are streamed to a temporary file
+    instead of building the whole sheet in memory.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title='Respuestas')
+    ws.freeze_panes = 'A2'
+    for row in iter_wide_rows(campaign, progress):
+        ws.append([_text_cell(ws, v) if isinstance(v, str) and v.startswith('=') else v for v in row])
+    wb.save(fileobj)
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from flask import Flask, current_app
+from sqlalchemy import and_, or_, update
+
+from ..extensions import db
+from ..models import Campaign, ExportJob
+from .analytics_cache import response_watermark
+from .artifacts import copy_artifact
+from .rollups import rollup_count
+
+logger = logging.getLogger(__name__)
+
+
+class ExportKind(NamedTuple):
+    suffix: str
+    mimetype: str
+    # (campaign, fileobj, progress(fraction)) -> None
+    write: Callable
+
+
+def _write_pdf(campaign, fh, progress):
+    if copy_artifact(campaign, 'pdf', fh):
+        return
+    from .pdf import build_campaign_pdf
+    fh.write(build_campaign_pdf(campaign, progress=progress))
+
+
+def _rows_progress(campaign, progress):
+    total = max(rollup_count(campaign.id, 'total'), 1)
+    return lambda rows_done: progress(min(rows_done / total, 1.0))
+
+
+def _write_csv(campaign, fh, progress):
+    if copy_artifact(campaign, 'csv', fh):
+        return
+    from .csv_export import iter_responses_csv
+    for chunk in iter_responses_csv(campaign.id, _rows_progress(campaign, progress)):
+        fh.write(chunk)
+
+
+def _write_wide_csv(campaign, fh, progress):
+    from .csv_export import iter_wide_csv
+    for chunk in iter_wide_csv(campaign, _rows_progress(campaign, progress)):
+        fh.write(chunk)
+
+
+def _write_xlsx(campaign, fh, progress):
+    from .excel import write_responses_xlsx
+    write_responses_xlsx(campaign, fh, _rows_progress(campaign, progress))
+
+
+EXPORT_KINDS: Dict[str, ExportKind] = {
+    'pdf': ExportKind('report.pdf', 'application/pdf', _write_pdf),
+    'csv': ExportKind('responses.csv', 'text/csv', _write_csv),
+    'csv_wide': ExportKind('responses_wide.csv', 'text/csv', _write_wide_csv),
+    'xlsx': ExportKind('responses.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                       _write_xlsx),
+}
+
+_init_lock = threading.Lock()
+
+
+def exports_dir(app: Flask) -> str:
+    path = os.path.join(app.instance_path, 'exports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def artifact_path(app: Flask, job: ExportJob) -> Optional[str]:
+    return os.path.join(exports_dir(app), job.filename) if job.filename else None
+
+
+def _pool(app: Flask) -> ThreadPoolExecutor:
+    pool = app.extensions.get('export_pool')
+    if pool is None:
+        with _init_lock:
+            pool = app.extensions.get('export_pool')
+            if pool is None:
+                pool = ThreadPoolExecutor(max_workers=app.config['EXPORT_WORKERS'], thread_name_prefix='export')
+                app.extensions['export_pool'] = pool
+    return pool
+
+
+def _reusable(app: Flask, job: ExportJob, now: datetime) -> bool:
+    if job.status in ('queued', 'running'):
+        # a job that never finished (worker restarted) is not waited on forever
+        return job.created_at > now - timedelta(minutes=app.config['EXPORT_STALE_MINUTES'])
+    if job.status == 'done':
+        path = artifact_path(app, job)
+        return bool(job.expires_at and job.expires_at > now and path and os.path.exists(path))
+    return False
+
+
+def submit_export(campaign: Campaign, kind: str) -> ExportJob:
+    """Queue an export, or return the job that already covers it.
+
+    Jobs are deduplicated on (campaign, kind, response watermark): asking
+    twice for the same data returns the queued/running job or the artifact
+    that is still valid.
+    """
+    if kind not in EXPORT_KINDS:
+        raise ValueError(kind)
+    app = current_app._get_current_object()
+    now = datetime.utcnow()
+    watermark = response_watermark(campaign.id)
+
+    candidates = (
+        ExportJob.query
+        .filter_by(campaign_id=campaign.id, kind=kind, watermark=watermark)
+        .order_by(ExportJob.created_at.desc())
+        .all()
+    )
+    for job in candidates:
+        if _reusable(app, job, now):
+            return job
+
+    job = ExportJob(id=uuid.uuid4().hex, campaign_id=campaign.id, kind=kind, watermark=watermark,
+                    status='queued', progress=0, created_at=now)
+    db.session.add(job)
+    db.session.commit()
+    _pool(app).submit(_run, app, job.id)
+    return job
+
+
+def _progress_file(app: Flask, job_id: str) -> str:
+    return os.path.join(exports_dir(app), f'{job_id}.progress')
+
+
+def _read_progress_file(app: Flask, job_id: str) -> int:
+    try:
+        with open(_progress_file(app, job_id)) as fh:
+            return int(fh.read() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+class _ProgressWriter:
+    """Throttled progress updates, visible to every worker.
+
+    Written to the job row on its own connection (the export may hold a
+    streaming cursor on the session). On SQLite that cursor's read lock
+    would block the write, so progress goes to a small file next to the
+    artifacts instead (all SQLite workers share the host's instance folder).
+    """
+
+    def __init__(self, app: Flask, job_id: str, interval: float = 1.0):
+        self.app = app
+        self.job_id = job_id
+        self.interval = interval
+        self.last = 0.0
+        self.value = -1
+        self.to_file = db.engine.dialect.name == 'sqlite'
+
+    def __call__(self, fraction: float):
+        pct = max(0, min(int(fraction * 100), 99))
+        now = time.monotonic()
+        if pct <= self.value or now - self.last < self.interval:
+            return
+        self.value = pct
+        self.last = now
+        if self.to_file:
+            path = _progress_file(self.app, self.job_id)
+            with open(path + '.part', 'w') as fh:
+                fh.write(str(pct))
+            os.replace(path + '.part', path)
+            return
+        with db.engine.begin() as conn:
+            conn.execute(update(ExportJob).where(ExportJob.id == self.job_id).values(progress=pct))
+
+
+def _run(app: Flask, job_id: str):
+    with app.app_context():
+        tmp_path = None
+        try:
+            job = db.session.get(ExportJob, job_id)
+            if job is None:
+                return
+            job.status = 'running'
+            db.session.commit()
+
+            kind = EXPORT_KINDS[job.kind]
+            filename = f'campaign_{job.campaign_id}_{job.watermark}_{job.id[:8]}_{kind.suffix}'
+            path = os.path.join(exports_dir(app), filename)
+            tmp_path = path + '.part'
+            with open(tmp_path, 'wb') as fh:
+                kind.write(job.campaign, fh, _ProgressWriter(app, job_id))
+            os.replace(tmp_path, path)
+            tmp_path = None
+
+            now = datetime.utcnow()
+            job.status = 'done'
+            job.progress = 100
+            job.filename = filename
+            job.size = os.path.getsize(path)
+            job.finished_at = now
+            job.expires_at = now + timedelta(hours=app.config['EXPORT_TTL_HOURS'])
+            db.session.commit()
+        except Exception as exc:
+            logger.exception('Export job %s failed', job_id)
+            db.session.rollback()
+            db.session.execute(
+                update(ExportJob).where(ExportJob.id == job_id)
+                .values(status='error', error=str(exc)[:300], finished_at=datetime.utcnow())
+            )
+            db.session.commit()
+        finally:
+            remove_files([p for p in (tmp_path, _progress_file(app, job_id)) if p])
+            db.session.remove()
+
+
+def job_status(job: ExportJob) -> dict:
+    if job.status == 'done':
+        progress = 100
+    elif job.status == 'running' and db.engine.dialect.name == 'sqlite':
+        progress = max(job.progress or 0, _read_progress_file(current_app._get_current_object(), job.id))
+    else:
+        progress = job.progress or 0
+    return {
+        'id': job.id,
+        'campaign_id': job.campaign_id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': progress,
+        'error': job.error,
+        'size': job.size,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+    }
+
+
+def _delete_jobs(app: Flask, jobs: Iterable[ExportJob]) -> List[str]:
+    """Delete job rows in the current transaction; returns their files."""
+    paths = []
+    for job in jobs:
+        path = artifact_path(app, job)
+        if path:
+            paths.append(path)
+        paths.append(_progress_file(app, job.id))  # left behind by a lost job
+        db.session.delete(job)
+    return paths
+
+
+def remove_files(paths: Iterable[str]):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def delete_campaign_exports(campaign_id: int) -> List[str]:
+    """Delete a campaign's export jobs in the current transaction.
+
+    Returns the artifact files, to be removed once the caller commits.
+    """
+    app = current_app._get_current_object()
+    return _delete_jobs(app, ExportJob.query.filter_by(campaign_id=campaign_id).all())
+
+
+def purge_expired_exports(now: Optional[datetime] = None) -> int:
+    """Delete expired artifacts and their job rows (plus unfinished jobs past the TTL). Commits."""
+    app = current_app._get_current_object()
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=app.config['EXPORT_TTL_HOURS'])
+    jobs = ExportJob.query.filter(
+        or_(ExportJob.expires_at < now, and_(ExportJob.status != 'done', ExportJob.created_at < cutoff))
+    ).all()
+    paths = _delete_jobs(app, jobs)
+    db.session.commit()
+    remove_files(paths)
+    return len(jobs)
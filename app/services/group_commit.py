@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import List, Optional
+
+from flask import Flask
+
+from .submissions import PersistResult, persist_responses
+
+
+class _Pending:
+    __slots__ = ('values', 'queued_at', 'done', 'result', 'error')
+
+    def __init__(self, values: dict):
+        self.values = values
+        self.queued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result: Optional[PersistResult] = None
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitBuffer:
+    """In-process write buffer for POST /api/submit/<token>.
+
+    Request threads enqueue validated rows and block until the batch holding
+    their row is committed. A single flusher thread writes every `max_rows`
+    rows or every `max_wait_ms` milliseconds, whichever comes first, as one
+    multi-row INSERT + one COMMIT. Batching only happens across threads of the
+    same process, so it pays off with threaded workers (gunicorn --threads).
+    """
+
+    def __init__(self, app: Flask, max_rows: int = 50, max_wait_ms: int = 20):
+        self.app = app
+        self.max_rows = max(1, int(max_rows))
+        self.max_wait = max(0, int(max_wait_ms)) / 1000.0
+        self._cond = threading.Condition()
+        self._queue: List[_Pending] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {
+            'batches': 0,
+            'rows': 0,
+            'errors': 0,
+            'last_batch_size': 0,
+            'max_batch_size': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'max_queue_depth': 0,
+        }
+
+    def submit(self, values: dict, timeout: float = 10.0) -> PersistResult:
+        """Enqueue one row and wait until it is durable."""
+        p = _Pending(values)
+        with self._cond:
+            self._ensure_thread()
+            self._queue.append(p)
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], len(self._queue))
+            self._cond.notify()
+        if not p.done.wait(timeout):
+            raise TimeoutError('group commit flush timed out')
+        if p.error is not None:
+            raise p.error
+        return p.result
+
+    def stats(self) -> dict:
+        with self._cond:
+            out = dict(self._stats)
+            out['queue_depth'] = len(self._queue)
+        out['avg_batch_size'] = round(out['rows'] / out['batches'], 2) if out['batches'] else 0.0
+        out['avg_flush_ms'] = round(out.pop('total_flush_ms') / out['batches'], 3) if out['batches'] else 0.0
+        out['max_rows'] = self.max_rows
+        out['max_wait_ms'] = int(self.max_wait * 1000)
+        return out
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+            self._thread.start()
+
+    def _take_batch(self) -> List[_Pending]:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0].queued_at + self.max_wait
+            while len(self._queue) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._queue[:self.max_rows]
+            del self._queue[:self.max_rows]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            self._flush(batch)
+
+    def _flush(self, batch: List[_Pending]):
+        t0 = time.perf_counter()
+        error = None
+        with self.app.app_context():
+            try:
+                for p, result in zip(batch, persist_responses([p.values for p in batch])):
+                    p.result = result
+            except Exception as e:
+                error = e
+                self.app.logger.exception('group commit flush failed (%s rows)', len(batch))
+                if len(batch) > 1:
+                    # Isolate the offending row(s): retry one by one
+                    for p in batch:
+                        try:
+                            p.result = persist_responses([p.values])[0]
+                        except Exception as row_error:  # reported to the waiting request
+                            p.error = row_error
+                else:
+                    batch[0].error = e
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+
+        with self._cond:
+            st = self._stats
+            st['batches'] += 1
+            st['last_batch_size'] = len(batch)
+            st['max_batch_size'] = max(st['max_batch_size'], len(batch))
+            st['last_flush_ms'] = round(elapsed_ms, 3)
+            st['max_flush_ms'] = max(st['max_flush_ms'], round(elapsed_ms, 3))
+            st['total_flush_ms'] += elapsed_ms
+            st['rows'] += sum(1 for p in batch if p.error is None)
+            if error is not None:
+                st['errors'] += 1
+
+        for p in batch:
+            p.done.set()
+
+
+_init_lock = threading.Lock()
+
+
+def get_buffer(app: Flask) -> GroupCommitBuffer:
+    """Return the app's buffer, creating it on first use."""
+    buf = app.extensions.get('group_commit')
+    if buf is None:
+        with _init_lock:
+            buf = app.extensions.get('group_commit')
+            if buf is None:
+                buf = GroupCommitBuffer(
+                    app,
+                    max_rows=app.config['SUBMIT_GROUP_COMMIT_MAX_ROWS'],
+                    max_wait_ms=app.config['SUBMIT_GROUP_COMMIT_MAX_WAIT_MS'],
+                )
+                app.extensions['group_commit'] = buf
+    return buf
@@ -1,6 +1,8 @@
+import functools
 import io
+import os
 from datetime import datetime
-from typing import Optional, List
+from typing import Callable, Dict, Optional, List
 
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
@@ -8,11 +10,11 @@ from reportlab.pdfgen import canvas
 from reportlab.lib import colors
 from reportlab.lib.utils import ImageReader
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from flask import current_app
 
-from .analytics import compute_campaign_analytics
+from .analytics_cache import get_campaign_analytics
+from .charts import ChartSpec
+from .vector_charts import draw_chart
 
 try:
     from app.utils.time import fmt_dt_local
@@ -64,21 +66,45 @@ def _safe_text(s) -> str:
     return str(s or "").replace("\n", " ").strip()
 
 
-def _pct(n: int, total: int) -> float:
-    if total <= 0:
-        return 0.0
-    return (float(n) / float(total)) * 100.0
-
-
 def _draw_png(c: canvas.Canvas, png_bytes: bytes, x: float, y: float, w: float, h: float):
     img = io.BytesIO(png_bytes)
     img.seek(0)
     c.drawImage(ImageReader(img), x, y, width=w, height=h, mask="auto")
 
 
+def _chart_drawers(specs: List[ChartSpec]) -> List[Callable]:
+    """One draw(c, x, y, w, h) per spec, for the configured PDF_CHART_BACKEND.
+
+    vector (default): reportlab paths and text, nothing to render up front.
+    png: matplotlib images from the chart cache, misses rendered in parallel.
+    """
+    if current_app.config.get("PDF_CHART_BACKEND", "vector") != "png":
+        return [lambda c, x, y, w, h, spec=spec: draw_chart(c, spec, x, y, w, h) for spec in specs]
+    from .chart_cache import cached_render_charts
+    return [lambda c, x, y, w, h, png=png: _draw_png(c, png, x, y, w, h) for png in cached_render_charts(specs)]
+
+
+# Absolute, so the report does not depend on the working directory
+IMG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "img")
+LOGO_LEFT = os.path.join(IMG_DIR, "BorgWarner_Logo_Technology_Blue.png")
+LOGO_RIGHT = os.path.join(IMG_DIR, "GPTW_Logo.png")
+
+
+@functools.lru_cache(maxsize=16)
+def _logo(path: Optional[str]) -> Optional[ImageReader]:
+    """Decoded logo, kept for the life of the process (None if missing/unreadable)."""
+    if not path:
+        return None
+    try:
+        img = ImageReader(path)
+        img.getRGBData()  # decode once, not on every document
+        return img
+    except Exception:
+        return None
+
+
 def _draw_header(c: canvas.Canvas, title: str, subtitle: str,
-                 logo_left_path: Optional[str], logo_right_path: Optional[str],
-                 page_no: int):
+                 logo_left: Optional[ImageReader], logo_right: Optional[ImageReader]):
     band_h = 0.62 * inch
     c.setFillColor(BW_BLUE)
     c.rect(0, PAGE_H - band_h, PAGE_W, band_h, stroke=0, fill=1)
@@ -90,21 +116,40 @@ def _draw_header(c: canvas.Canvas, title: str, subtitle: str,
     c.setFont("Helvetica", 9.5)
     c.drawString(MARGIN_X, PAGE_H - 0.56 * inch, subtitle)
 
-    def _draw_logo(path, x, y, h):
-        if not path:
+    def _draw_logo(img, x, y, h):
+        if img is None:
             return
-        try:
-            img = ImageReader(path)
-            iw, ih = img.getSize()
-            w = (iw / ih) * h
-            c.drawImage(img, x, y, width=w, height=h, mask="auto")
-        except Exception:
-            pass
+        iw, ih = img.getSize()
+        w = (iw / ih) * h
+        c.drawImage(img, x, y, width=w, height=h, mask="auto")
 
     logo_h = 0.36 * inch
     y = PAGE_H - 0.49 * inch
-    _draw_logo(logo_left_path, PAGE_W - (2.20 * inch), y, logo_h)
-    _draw_logo(logo_right_path, PAGE_W - (0.70 * inch), y, logo_h)
+    _draw_logo(logo_left, PAGE_W - (2.20 * inch), y, logo_h)
+    _draw_logo(logo_right, PAGE_W - (0.70 * inch), y, logo_h)
+
+
+class _PageChrome:
+    """Page header of one document, drawn once per title as a form XObject.
+
+    Every page then only references the form (doForm), so long annexes do
+    not repeat the band, texts and logo placements in each page stream.
+    """
+
+    def __init__(self, c: canvas.Canvas, subtitle: str):
+        self.c = c
+        self.subtitle = subtitle
+        self.forms: Dict[str, str] = {}
+
+    def header(self, title: str):
+        name = self.forms.get(title)
+        if name is None:
+            name = f"header{len(self.forms)}"
+            self.c.beginForm(name)
+            _draw_header(self.c, title, self.subtitle, _logo(LOGO_LEFT), _logo(LOGO_RIGHT))
+            self.c.endForm()
+            self.forms[title] = name
+        self.c.doForm(name)
 
 
 def _draw_footer(c: canvas.Canvas, page_no: int):
@@ -146,117 +191,44 @@ def _card(c: canvas.Canvas, x: float, y: float, w: float, h: float, title: str,
 
 # ---------------------- Charts (bonitos + % + conteo) ----------------------
 
-def _style_axes(ax):
-    ax.spines["top"].set_visible(False)
-    ax.spines["right"].set_visible(False)
-    ax.spines["left"].set_alpha(0.35)
-    ax.spines["bottom"].set_alpha(0.35)
-    ax.grid(axis="y", alpha=0.18, linewidth=0.8)
-    ax.set_axisbelow(True)
-
-
-def _chart_png_bar(labels: List[str], values: List[int], title: str, subtitle: str = "") -> bytes:
-    labels = [str(x) for x in labels]
-    values = [int(v) if v is not None else 0 for v in values]
-    total = sum(values)
+def _question_series(q: dict):
+    """(type, text, labels, values) of a question as drawn in the report."""
+    qid = q.get("id", "")
+    qtype = (q.get("type") or "").lower()
+    qtext = (q.get("text") or {}).get("es") or (q.get("text") or {}).get("en") or qid
+    labels = q.get("labels") or []
+    values = q.get("values") or []
 
-    fig = plt.figure(figsize=(7.2, 2.75), dpi=180)
-    ax = fig.add_subplot(111)
+    # Fix likert numeric labels if needed
+    if qtype == "likert":
+        preset_q = q.get("likert_preset") or "satisfaction"
+        scale = len(labels) or 5
+        if all(str(x).isdigit() for x in labels):
+            labels = _likert_labels(preset_q, "es")[:scale]
+    return qtype, _safe_text(qtext), labels, values
 
-    bar_color = "#00386C"  # BW_BLUE
-    bars = ax.bar(range(len(labels)), values, color=bar_color, alpha=0.92)
 
-    ax.set_title(title or "", fontsize=11.5, fontweight="bold", pad=10)
-    if subtitle:
-        ax.text(0.0, 1.02, subtitle, transform=ax.transAxes, fontsize=9.5, alpha=0.75)
+def _question_chart(qtype: str, labels, values, subtitle: str) -> Optional[ChartSpec]:
+    # Si es texto: no graficar barras, solo mostrar indicador
+    if qtype in ("text", "textarea", "comment"):
+        return None
 
-    _style_axes(ax)
+    # Top 10 si hay demasiadas opciones
+    if qtype == "single" and len(labels) > 12:
+        pairs = list(zip(labels, values))
+        pairs.sort(key=lambda x: int(x[1]), reverse=True)
+        pairs = pairs[:10]
+        labels = [p[0] for p in pairs]
+        values = [p[1] for p in pairs]
 
-    max_len = max((len(x) for x in labels), default=0)
-    rot = 0 if max_len <= 12 and len(labels) <= 6 else 22
-    ax.set_xticks(range(len(labels)))
-    ax.set_xticklabels(labels, rotation=rot, ha="right" if rot else "center", fontsize=9)
+    # Decide tipo de chart
+    use_horizontal = (len(labels) > 7) or any(len(str(x)) > 18 for x in labels)
+    return ChartSpec.build("horizontal" if use_horizontal else "bar", labels, values, "", subtitle)
 
-    ax.set_ylabel("Respuestas", fontsize=9)
 
-    ymax = max(values) if values else 0
-    ax.set_ylim(0, max(1, int(ymax * 1.25)))
-
-    for rect, v in zip(bars, values):
-        if total > 0:
-            p = _pct(v, total)
-            lab = f"{v} ({p:.1f}%)"
-        else:
-            lab = f"{v}"
-        ax.text(
-            rect.get_x() + rect.get_width() / 2.0,
-            rect.get_height() + (0.03 * ax.get_ylim()[1]),
-            lab,
-            ha="center",
-            va="bottom",
-            fontsize=8.5,
-            color="#0B1E33",
-        )
-
-    fig.tight_layout()
-    out = io.BytesIO()
-    fig.savefig(out, format="png", transparent=False)
-    plt.close(fig)
-    return out.getvalue()
-
-
-def _chart_png_horizontal(labels: List[str], values: List[int], title: str, subtitle: str = "") -> bytes:
-    labels = [str(x) for x in labels]
-    values = [int(v) if v is not None else 0 for v in values]
-    total = sum(values)
-
-    h = 2.6 + (0.18 * min(len(labels), 12))
-    fig = plt.figure(figsize=(7.2, h), dpi=180)
-    ax = fig.add_subplot(111)
-
-    bar_color = "#0E8187"  # BW_SEA
-    bars = ax.barh(range(len(labels)), values, color=bar_color, alpha=0.92)
-
-    ax.set_title(title or "", fontsize=11.5, fontweight="bold", pad=10)
-    if subtitle:
-        ax.text(0.0, 1.02, subtitle, transform=ax.transAxes, fontsize=9.5, alpha=0.75)
-
-    ax.spines["top"].set_visible(False)
-    ax.spines["right"].set_visible(False)
-    ax.spines["left"].set_alpha(0.35)
-    ax.spines["bottom"].set_alpha(0.35)
-    ax.grid(axis="x", alpha=0.18, linewidth=0.8)
-    ax.set_axisbelow(True)
-
-    ax.set_yticks(range(len(labels)))
-    ax.set_yticklabels(labels, fontsize=9)
-
-    ax.set_xlabel("Respuestas", fontsize=9)
-
-    xmax = max(values) if values else 0
-    ax.set_xlim(0, max(1, int(xmax * 1.30)))
-
-    for rect, v in zip(bars, values):
-        if total > 0:
-            p = _pct(v, total)
-            lab = f"{v} ({p:.1f}%)"
-        else:
-            lab = f"{v}"
-        ax.text(
-            rect.get_width() + (0.02 * ax.get_xlim()[1]),
-            rect.get_y() + rect.get_height() / 2.0,
-            lab,
-            va="center",
-            ha="left",
-            fontsize=8.5,
-            color="#0B1E33",
-        )
-
-    fig.tight_layout()
-    out = io.BytesIO()
-    fig.savefig(out, format="png", transparent=False)
-    plt.close(fig)
-    return out.getvalue()
+def _question_subtitle(values) -> str:
+    total_q = sum(int(v) for v in values) if values else 0
+    return f"Total respuestas de esta pregunta: {total_q}" if total_q else "Sin respuestas registradas"
 
 
 # ---------------------- Tables (paginadas) ----------------------
@@ -315,30 +287,44 @@ def _paginate_rows(rows: List[List[str]], per_page: int) -> List[List[List[str]]
 
 # ---------------------- Main PDF ----------------------
 
-def build_campaign_pdf(campaign, shifts=None) -> bytes:
-    analytics = compute_campaign_analytics(campaign)
+def build_campaign_pdf(campaign, shifts=None, progress: Optional[Callable[[float], None]] = None) -> bytes:
+    """Render the campaign report. `progress(fraction)` is called as sections complete."""
+    report = progress or (lambda fraction: None)
+    analytics = get_campaign_analytics(campaign)
+    report(0.1)
     totals = analytics.get("totals", {}) or {}
 
-    # Ajusta rutas según tu repo (si no existen, no truena)
-    logo_bw = "app/static/img/BorgWarner_Logo_Technology_Blue.png"
-    logo_gptw = "app/static/img/GPTW_Logo.png"
+    # Chart specs are collected (and, for PNGs, rendered) up front and drawn in order below
+    by_shift = analytics.get("by_shift") or []
+    by_area = (analytics.get("by_area") or [])[:10]
+    questions = analytics.get("questions") or []
+    specs = []
+    if by_shift:
+        values = [x[1] for x in by_shift]
+        specs.append(ChartSpec.build("bar", [x[0] for x in by_shift], values,
+                                     "Respuestas por turno", f"Total: {sum(values)}"))
+    if by_area:
+        values = [x[1] for x in by_area]
+        specs.append(ChartSpec.build("horizontal", [x[0] for x in by_area], values,
+                                     "Top 10 áreas por respuestas", f"Total: {sum(values)}"))
+    question_specs = []
+    for q in questions:
+        qtype, _, labels, values = _question_series(q)
+        question_specs.append(_question_chart(qtype, labels, values, _question_subtitle(values)))
+    specs.extend(s for s in question_specs if s is not None)
+    charts = iter(_chart_drawers(specs))
+    report(0.6)
 
     tz_name = getattr(campaign, "time_zone", None)
     generated_local = fmt_dt_local(datetime.utcnow(), tz_name)
 
     buf = io.BytesIO()
     c = canvas.Canvas(buf, pagesize=letter)
+    chrome = _PageChrome(c, f"Campaña: {_safe_text(campaign.name)}")
     page_no = 1
 
     # ---------------- Page 1: Executive Summary ----------------
-    _draw_header(
-        c,
-        title="BorgWarner Encuestas",
-        subtitle=f"Campaña: {_safe_text(campaign.name)}",
-        logo_left_path=logo_bw,
-        logo_right_path=logo_gptw,
-        page_no=page_no,
-    )
+    chrome.header("BorgWarner Encuestas")
 
     y = PAGE_H - (0.92 * inch)
 
@@ -399,27 +385,19 @@ def build_campaign_pdf(campaign, shifts=None) -> bytes:
     y -= (kpi_h + 0.35 * inch)
 
     # (Opcional) charts por turno / área en portada
-    by_shift = analytics.get("by_shift") or []
     if by_shift:
-        labels = [x[0] for x in by_shift]
-        values = [x[1] for x in by_shift]
-        png = _chart_png_bar(labels, values, "Respuestas por turno", subtitle=f"Total: {sum(values)}")
-        _draw_png(c, png, MARGIN_X, y - 2.25 * inch, PAGE_W - 2*MARGIN_X, 2.25 * inch)
+        next(charts)(c, MARGIN_X, y - 2.25 * inch, PAGE_W - 2*MARGIN_X, 2.25 * inch)
         y -= 2.55 * inch
 
-    by_area = analytics.get("by_area") or []
     if by_area:
-        labels = [x[0] for x in by_area[:10]]
-        values = [x[1] for x in by_area[:10]]
         if y < (3.20 * inch):
             _draw_footer(c, page_no)
             c.showPage()
             page_no += 1
-            _draw_header(c, "BorgWarner Encuestas", f"Campaña: {_safe_text(campaign.name)}", logo_bw, logo_gptw, page_no)
+            chrome.header("BorgWarner Encuestas")
             y = PAGE_H - (0.92 * inch)
 
-        png = _chart_png_horizontal(labels, values, "Top 10 áreas por respuestas", subtitle=f"Total: {sum(values)}")
-        _draw_png(c, png, MARGIN_X, y - 2.65 * inch, PAGE_W - 2*MARGIN_X, 2.65 * inch)
+        next(charts)(c, MARGIN_X, y - 2.65 * inch, PAGE_W - 2*MARGIN_X, 2.65 * inch)
         y -= 2.95 * inch
 
     # Nota breve
@@ -427,7 +405,7 @@ def build_campaign_pdf(campaign, shifts=None) -> bytes:
         _draw_footer(c, page_no)
         c.showPage()
         page_no += 1
-        _draw_header(c, "BorgWarner Encuestas", f"Campaña: {_safe_text(campaign.name)}", logo_bw, logo_gptw, page_no)
+        chrome.header("BorgWarner Encuestas")
         y = PAGE_H - (0.92 * inch)
 
     c.setFont("Helvetica", 9)
@@ -440,35 +418,22 @@ def build_campaign_pdf(campaign, shifts=None) -> bytes:
     page_no += 1
 
     # ---------------- Section: Todas las preguntas ----------------
-    _draw_header(c, "BW Encuestas Pro — Resultados", f"Campaña: {_safe_text(campaign.name)}", logo_bw, logo_gptw, page_no)
+    chrome.header("BW Encuestas Pro — Resultados")
     y = PAGE_H - (0.92 * inch)
 
     y = _section_title(c, y, "Resultados por pregunta (todas)")
     y -= 0.10 * inch
 
-    questions = analytics.get("questions") or []
-    for idx, q in enumerate(questions, start=1):
-        qid = q.get("id", "")
-        qtype = (q.get("type") or "").lower()
-        qtext = (q.get("text") or {}).get("es") or (q.get("text") or {}).get("en") or qid
-        qtext = _safe_text(qtext)
-
-        labels = q.get("labels") or []
-        values = q.get("values") or []
-
-        # Fix likert numeric labels if needed
-        if qtype == "likert":
-            preset_q = q.get("likert_preset") or "satisfaction"
-            scale = len(labels) or 5
-            if all(str(x).isdigit() for x in labels):
-                labels = _likert_labels(preset_q, "es")[:scale]
+    for idx, (q, spec) in enumerate(zip(questions, question_specs), start=1):
+        report(0.6 + 0.2 * (idx - 1) / len(questions))
+        _, qtext, _, values = _question_series(q)
 
         # Title line
         if y < (3.10 * inch):
             _draw_footer(c, page_no)
             c.showPage()
             page_no += 1
-            _draw_header(c, "BW Encuestas Pro — Resultados", f"Campaña: {_safe_text(campaign.name)}", logo_bw, logo_gptw, page_no)
+            chrome.header("BW Encuestas Pro — Resultados")
             y = PAGE_H - (0.92 * inch)
 
         c.setFont("Helvetica-Bold", 10.5)
@@ -476,43 +441,27 @@ def build_campaign_pdf(campaign, shifts=None) -> bytes:
         c.drawString(MARGIN_X, y, f"{idx}. {qtext[:110]}")
         y -= 0.18 * inch
 
-        total_q = sum(int(v) for v in values) if values else 0
-        subtitle = f"Total respuestas de esta pregunta: {total_q}" if total_q else "Sin respuestas registradas"
-
-        # Si es texto: no graficar barras, solo mostrar indicador
-        if qtype in ("text", "textarea", "comment"):
+        if spec is None:
+            total_q = sum(int(v) for v in values) if values else 0
             c.setFont("Helvetica", 9.2)
             c.setFillColor(colors.HexColor("#526581"))
             c.drawString(MARGIN_X, y, f"Tipo: Texto. Respuestas capturadas: {total_q}")
             y -= 0.28 * inch
             continue
 
-        # Top 10 si hay demasiadas opciones
-        if qtype == "single" and len(labels) > 12:
-            pairs = list(zip(labels, values))
-            pairs.sort(key=lambda x: int(x[1]), reverse=True)
-            pairs = pairs[:10]
-            labels = [p[0] for p in pairs]
-            values = [p[1] for p in pairs]
-
-        # Decide tipo de chart
-        use_horizontal = (len(labels) > 7) or any(len(str(x)) > 18 for x in labels)
-
-        if use_horizontal:
-            png = _chart_png_horizontal([str(x) for x in labels], [int(v) for v in values], "", subtitle=subtitle)
-            chart_h = 2.45 * inch + (0.10 * inch * min(len(labels), 10))
+        if spec.kind == "horizontal":
+            chart_h = 2.45 * inch + (0.10 * inch * min(len(spec.labels), 10))
         else:
-            png = _chart_png_bar([str(x) for x in labels], [int(v) for v in values], "", subtitle=subtitle)
             chart_h = 2.10 * inch
 
         if y < (chart_h + 1.10 * inch):
             _draw_footer(c, page_no)
             c.showPage()
             page_no += 1
-            _draw_header(c, "BW Encuestas Pro — Resultados", f"Campaña: {_safe_text(campaign.name)}", logo_bw, logo_gptw, page_no)
+            chrome.header("BW Encuestas Pro — Resultados")
             y = PAGE_H - (0.92 * inch)
 
-        _draw_png(c, png, MARGIN_X, y - chart_h, PAGE_W - 2*MARGIN_X, chart_h)
+        next(charts)(c, MARGIN_X, y - chart_h, PAGE_W - 2*MARGIN_X, chart_h)
         y -= (chart_h + 0.35 * inch)
 
     _draw_footer(c, page_no)
@@ -520,7 +469,8 @@ def build_campaign_pdf(campaign, shifts=None) -> bytes:
     page_no += 1
 
     # ---------------- Anexos: Comentarios (TODOS) ----------------
-    _draw_header(c, "BW Encuestas Pro — Anexos", f"Campaña: {_safe_text(campaign.name)}", logo_bw, logo_gptw, page_no)
+    report(0.8)
+    chrome.header("BW Encuestas Pro — Anexos")
     y = PAGE_H - (0.92 * inch)
 
     comments = analytics.get("comments") or []
@@ -548,7 +498,7 @@ def build_campaign_pdf(campaign, shifts=None) -> bytes:
                 _draw_footer(c, page_no)
                 c.showPage()
                 page_no += 1
-                _draw_header(c, "BW Encuestas Pro — Anexos", f"Campaña: {_safe_text(campaign.name)}", logo_bw, logo_gptw, page_no)
+                chrome.header("BW Encuestas Pro — Anexos")
                 y = PAGE_H - (0.92 * inch)
 
             title = f"Comentarios (página {pi}/{len(pages)})"
@@ -567,7 +517,8 @@ def build_campaign_pdf(campaign, shifts=None) -> bytes:
     page_no += 1
 
     # ---------------- Anexos: Followups (TODOS) ----------------
-    _draw_header(c, "BW Encuestas Pro — Anexos", f"Campaña: {_safe_text(campaign.name)}", logo_bw, logo_gptw, page_no)
+    report(0.9)
+    chrome.header("BW Encuestas Pro — Anexos")
     y = PAGE_H - (0.92 * inch)
 
     followups = analytics.get("followups") or []
@@ -596,7 +547,7 @@ def build_campaign_pdf(campaign, shifts=None) -> bytes:
                 _draw_footer(c, page_no)
                 c.showPage()
                 page_no += 1
-                _draw_header(c, "BW Encuestas Pro — Anexos", f"Campaña: {_safe_text(campaign.name)}", logo_bw, logo_gptw, page_no)
+                chrome.header("BW Encuestas Pro — Anexos")
                 y = PAGE_H - (0.92 * inch)
 
             title = f"Solicitudes de seguimiento (página {pi}/{len(pages)})"
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+
+from ..extensions import db
+from ..models import Campaign, CampaignRollup, QuestionRollup, Response
+from ..utils.cache import LRUCache, MISSING
+
+# question types whose answers are counted per value; others only count as "filled"
+VALUE_TYPES = ('likert', 'single')
+FILLED = '*'
+# campaign_rollups dimension counting indexed comments (kept by services/comments.py)
+COMMENTS = 'comments'
+
+# Snapshots never change after campaign creation, so this needs no TTL
+_kinds_cache = LRUCache(maxsize=256)
+
+
+def forget_campaign(campaign_id: int):
+    """Drop cached question kinds (campaign deleted; SQLite may reuse its id)."""
+    _kinds_cache.pop(campaign_id)
+
+
+def normalize_answer(val):
+    """Answer value as counted by analytics ({'value': x} / {'text': x} / x)."""
+    if isinstance(val, dict) and 'value' in val:
+        return val.get('value')
+    if isinstance(val, dict) and 'text' in val:
+        return val.get('text')
+    return val
+
+
+def question_kinds(snapshot: Optional[Mapping]) -> Dict[str, bool]:
+    """qid -> True when the question is counted per answer value."""
+    schema = (snapshot or {}).get('schema') or {}
+    questions = schema.get('questions') or []
+    return {
+        q.get('id'): (q.get('type') or '').lower() in VALUE_TYPES
+        for q in questions if isinstance(q, dict) and q.get('id')
+    }
+
+
+def _kinds_for(campaign_id: int) -> Dict[str, bool]:
+    kinds = _kinds_cache.get(campaign_id)
+    if kinds is MISSING:
+        snapshot = db.session.query(Campaign.snapshot_json).filter(Campaign.id == campaign_id).scalar()
+        kinds = question_kinds(snapshot)
+        _kinds_cache.set(campaign_id, kinds)
+    return kinds
+
+
+def _count_row(row: Mapping, kinds: Mapping[str, bool], dims: Counter, answers: Counter):
+    """Add one response's contribution to the (dimension, key) and (qid, value) counters."""
+    dims[('total', '')] += 1
+    if row.get('wants_followup'):
+        dims[('followup', '')] += 1
+    dims[('day', row['submitted_at'].date().isoformat())] += 1
+    if row.get('area_id'):
+        dims[('area', str(row['area_id']))] += 1
+    if row.get('shift'):
+        dims[('shift', str(row['shift'])[:64])] += 1
+
+    data = row.get('answers_json')
+    if not isinstance(data, dict):
+        return  # legacy rows stored before answers were validated
+    for qid, val in data.items():
+        if qid not in kinds or val is None:
+            continue
+        value = str(normalize_answer(val))[:255] if kinds[qid] else FILLED
+        answers[(qid, value)] += 1
+
+
+def _upsert(model, key_cols: Tuple[str, ...], rows: list):
+    """count += n for each row, inserting missing keys (one statement per table)."""
+    if not rows:
+        return
+    table = model.__table__
+    rows.sort(key=lambda r: tuple(r[k] for k in key_cols))  # stable lock order
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_cols),
+            set_={'count': table.c['count'] + stmt.excluded['count']},
+        )
+        db.session.execute(stmt, rows)
+        return
+
+    for r in rows:  # portable fallback
+        cond = [table.c[k] == r[k] for k in key_cols]
+        res = db.session.execute(update(table).where(*cond).values(count=table.c['count'] + r['count']))
+        if not res.rowcount:
+            db.session.execute(table.insert().values(**r))
+
+
+def add_counts(dimension: str, counts: Mapping[int, int]):
+    """campaign_rollups (campaign, dimension, '') += n, in the caller's transaction."""
+    _upsert(CampaignRollup, ('campaign_id', 'dimension', 'key'), [
+        {'campaign_id': cid, 'dimension': dimension, 'key': '', 'count': n} for cid, n in counts.items() if n
+    ])
+
+
+def _write(campaign_id: int, dims: Counter, answers: Counter):
+    _upsert(CampaignRollup, ('campaign_id', 'dimension', 'key'), [
+        {'campaign_id': campaign_id, 'dimension': d, 'key': k, 'count': n} for (d, k), n in dims.items()
+    ])
+    _upsert(QuestionRollup, ('campaign_id', 'question_id', 'value'), [
+        {'campaign_id': campaign_id, 'question_id': q, 'value': v, 'count': n} for (q, v), n in answers.items()
+    ])
+
+
+def apply_rollups(rows: Iterable[Mapping]):
+    """Count freshly inserted responses, in the caller's transaction."""
+    per_campaign = defaultdict(lambda: (Counter(), Counter()))
+    for row in rows:
+        dims, answers = per_campaign[row['campaign_id']]
+        _count_row(row, _kinds_for(row['campaign_id']), dims, answers)
+    for campaign_id, (dims, answers) in per_campaign.items():
+        _write(campaign_id, dims, answers)
+
+
+def count_responses(campaign_id: int, kinds: Mapping[str, bool]) -> Tuple[Counter, Counter]:
+    """Counters computed from the responses table (streamed, not hydrated)."""
+    dims, answers = Counter(), Counter()
+    stmt = (
+        select(Response.submitted_at, Response.area_id, Response.shift,
+               Response.wants_followup, Response.answers_json)
+        .where(Response.campaign_id == campaign_id)
+        .execution_options(yield_per=1000)
+    )
+    for row in db.session.execute(stmt):
+        _count_row(row._mapping, kinds, dims, answers)
+    return dims, answers
+
+
+def bump_generation(campaign_id: int):
+    """Invalidate every worker's cached analytics of a campaign (same transaction)."""
+    db.session.execute(
+        update(Campaign).where(Campaign.id == campaign_id)
+        .values(analytics_generation=Campaign.analytics_generation + 1)
+    )
+
+
+def rebuild_rollups(campaign_id: int) -> int:
+    """Recompute a campaign's rollups from its responses (backfills/repairs). Commits.
+
+    Frozen artifacts built from the old counters are dropped (the scheduler
+    freezes the campaign again).
+    """
+    try:
+        db.session.execute(delete(CampaignRollup).where(
+            CampaignRollup.campaign_id == campaign_id, CampaignRollup.dimension != COMMENTS))
+        db.session.execute(delete(QuestionRollup).where(QuestionRollup.campaign_id == campaign_id))
+        dims, answers = count_responses(campaign_id, _kinds_for(campaign_id))
+        _write(campaign_id, dims, answers)
+        bump_generation(campaign_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    from .artifacts import invalidate_artifacts  # artifacts -> analytics -> rollups
+    invalidate_artifacts(campaign_id)
+    return dims[('total', '')]
+
+
+def load_counters(campaign_id: int) -> Tuple[Counter, Counter]:
+    dims, answers = Counter(), Counter()
+    for d, k, n in db.session.query(CampaignRollup.dimension, CampaignRollup.key, CampaignRollup.count) \
+            .filter(CampaignRollup.campaign_id == campaign_id):
+        dims[(d, k)] = n
+    for q, v, n in db.session.query(QuestionRollup.question_id, QuestionRollup.value, QuestionRollup.count) \
+            .filter(QuestionRollup.campaign_id == campaign_id):
+        answers[(q, v)] = n
+    return dims, answers
+
+
+def rollup_count(campaign_id: int, dimension: str, key: str = '') -> int:
+    """One counter (e.g. 'total' or 'followup'), 0 when absent."""
+    n = db.session.query(CampaignRollup.count).filter_by(
+        campaign_id=campaign_id, dimension=dimension, key=key).scalar()
+    return n or 0
+
+
+def counters_to_counts(dims: Counter, answers: Counter) -> dict:
+    """Reshape counters into the aggregate dict used by analytics."""
+    out = {
+        'total': dims.get(('total', ''), 0),
+        'followup': dims.get(('followup', ''), 0),
+        'by_day': {},
+        'by_area': {},
+        'by_shift': {},
+        'dist': defaultdict(dict),
+    }
+    for (d, k), n in dims.items():
+        if d == 'day':
+            out['by_day'][k] = n
+        elif d == 'area':
+            out['by_area'][int(k)] = n
+        elif d == 'shift':
+            out['by_shift'][k] = n
+    for (q, v), n in answers.items():
+        out['dist'][q][v] = n
+    return out
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy import and_, not_, or_, text, update
+
+from ..extensions import db
+from ..models import Campaign
+from .campaign_cache import invalidate_campaign
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev boxes
+    fcntl = None
+
+# pg_try_advisory_xact_lock key for the transition job
+TRANSITION_LOCK_KEY = 7_315_001
+
+_local_lock = threading.Lock()
+
+
+@contextmanager
+def _transition_lock():
+    """Yield True if this process may run the transition job now.
+
+    Postgres: transaction-scoped advisory lock (released by the commit).
+    SQLite: non-blocking flock on a file in the instance folder, since every
+    worker runs on the same host.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        got = db.session.execute(text('SELECT pg_try_advisory_xact_lock(:k)'), {'k': TRANSITION_LOCK_KEY}).scalar()
+        yield bool(got)
+        return
+
+    if fcntl is None:
+        got = _local_lock.acquire(blocking=False)
+        try:
+            yield got
+        finally:
+            if got:
+                _local_lock.release()
+        return
+
+    os.makedirs(current_app.instance_path, exist_ok=True)
+    with open(os.path.join(current_app.instance_path, 'campaign_transitions.lock'), 'w') as fh:
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def run_transitions(now: Optional[datetime] = None) -> Optional[int]:
+    """Persist is_active for scheduled campaigns whose window opened or closed.
+
+    Reads never depend on this (see Campaign.active_at_clause); it keeps the
+    stored flag accurate for the admin list. Returns the number of updated
+    campaigns, or None if another worker holds the lock.
+    """
+    now = now or datetime.utcnow()
+    scheduled = or_(Campaign.start_at.isnot(None), Campaign.end_at.isnot(None))
+    in_window = and_(
+        or_(Campaign.start_at.is_(None), Campaign.start_at <= now),
+        or_(Campaign.end_at.is_(None), Campaign.end_at >= now),
+    )
+    try:
+        with _transition_lock() as got:
+            if not got:
+                db.session.rollback()
+                return None
+            opened = db.session.execute(
+                update(Campaign)
+                .where(scheduled, in_window, Campaign.is_active.is_(False))
+                .values(is_active=True)
+            ).rowcount
+            closed = db.session.execute(
+                update(Campaign)
+                .where(scheduled, not_(in_window), Campaign.is_active.is_(True))
+                .values(is_active=False)
+            ).rowcount
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    changed = (opened or 0) + (closed or 0)
+    if changed:
+        invalidate_campaign()
+    return changed
+
+
+def _loop(app: Flask):
+    interval = max(5, int(app.config['CAMPAIGN_TRANSITION_INTERVAL']))
+    while True:
+        try:
+            with app.app_context():
+                # the worker that ran the transitions also purges expired exports
+                # and freezes newly closed campaigns
+                if run_transitions() is not None:
+                    from .export_jobs import purge_expired_exports
+                    purge_expired_exports()
+                    if app.config['FINALIZE_CLOSED_CAMPAIGNS']:
+                        from .artifacts import finalize_closed_campaigns
+                        finalize_closed_campaigns()
+        except Exception:
+            app.logger.exception('campaign transition job failed')
+        time.sleep(interval)
+
+
+def init_scheduler(app: Flask):
+    """Start the transition loop in each serving process, on its first request.
+
+    Starting lazily keeps CLI commands (flask db upgrade, ...) thread-free and
+    works after gunicorn forks. The lock makes concurrent loops harmless.
+    """
+    if not app.config['CAMPAIGN_SCHEDULER']:
+        return
+    started = threading.Event()
+    start_lock = threading.Lock()
+
+    @app.before_request
+    def _start_transition_loop():
+        if started.is_set():
+            return
+        with start_lock:
+            if started.is_set():
+                return
+            threading.Thread(target=_loop, args=(app,), name='campaign-transitions', daemon=True).start()
+            started.set()
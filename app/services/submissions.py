@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models import Campaign, Response
+from .comments import index_comments
+from .rollups import apply_rollups
+
+logger = logging.getLogger(__name__)
+
+# optional payload fields stored as strings
+_TEXT_FIELDS = ('lang', 'shift', 'contact_name', 'employee_no', 'source')
+
+
+class PersistResult(NamedTuple):
+    id: int
+    duplicate: bool = False
+
+
+def _parse_area_id(area_id) -> Optional[int]:
+    try:
+        return int(area_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_submission_id(value) -> Optional[str]:
+    """Normalize the client submission UUID; anything else is ignored."""
+    if not value:
+        return None
+    try:
+        return str(uuid.UUID(str(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def validate_submission(campaign: Campaign, payload: dict, *, shifts: List[str], default_lang: str,
+                        active_areas: Mapping[int, str], user_agent: str = '') -> Tuple[Optional[dict], Optional[str]]:
+    """Validate a public submission payload and build the column values of its Response.
+
+    Returns (values, None) when valid or (None, error_code) otherwise. The error
+    codes are the ones the kiosk runtime already understands
+    (area_required, invalid_area, shift_required, invalid_shift, contact_required)
+    plus invalid_answers when answers is not an object and invalid_payload
+    when a text field is not a string.
+    """
+    answers = payload.get('answers') or {}
+    if not isinstance(answers, dict):
+        return None, 'invalid_answers'
+    if any(payload.get(k) is not None and not isinstance(payload.get(k), str) for k in _TEXT_FIELDS):
+        return None, 'invalid_payload'
+
+    lang = (payload.get('lang') or default_lang)[:8]
+
+    area_id = payload.get('area_id')
+    shift = payload.get('shift')
+    wants_followup = bool(payload.get('wants_followup'))
+    contact_name = (payload.get('contact_name') or '').strip()[:200]
+    employee_no = (payload.get('employee_no') or '').strip()[:50]
+    source = (payload.get('source') or 'kiosko')[:20]
+
+    if campaign.require_area:
+        if not area_id:
+            return None, 'area_required'
+        if _parse_area_id(area_id) not in active_areas:
+            return None, 'invalid_area'
+
+    if campaign.require_shift:
+        if not shift:
+            return None, 'shift_required'
+        if shift not in shifts:
+            return None, 'invalid_shift'
+    else:
+        if shift and shift not in shifts:
+            return None, 'invalid_shift'
+
+    if wants_followup:
+        if not contact_name or not employee_no:
+            return None, 'contact_required'
+    else:
+        contact_name = None
+        employee_no = None
+
+    values = {
+        'campaign_id': campaign.id,
+        'submitted_at': datetime.utcnow(),
+        'lang': lang,
+        'area_id': _parse_area_id(area_id) if area_id else None,
+        'shift': shift,
+        'wants_followup': wants_followup,
+        'contact_name': contact_name,
+        'employee_no': employee_no,
+        'answers_json': answers,
+        'user_agent': (user_agent or '')[:300],
+        'source': source,
+        'submission_id': _parse_submission_id(payload.get('submission_id')),
+    }
+    return values, None
+
+
+def insert_responses(rows: List[dict]) -> List[int]:
+    """Multi-row INSERT of validated responses in the current transaction.
+
+    Analytics rollups and the comment index are updated in the same
+    transaction. Returns the new ids
+    in the same order as rows. The caller commits.
+    """
+    if not rows:
+        return []
+    stmt = insert(Response).returning(Response.id, sort_by_parameter_order=True)
+    ids = list(db.session.scalars(stmt, rows).all())
+    apply_rollups(rows)
+    index_comments(rows, ids)
+    return ids
+
+
+def find_submissions(submission_ids: Iterable[str]) -> Dict[str, int]:
+    """Map already stored submission ids to their Response id (one indexed lookup)."""
+    sids = {sid for sid in submission_ids if sid}
+    if not sids:
+        return {}
+    rows = db.session.query(Response.submission_id, Response.id).filter(Response.submission_id.in_(sids)).all()
+    return {sid: id_ for sid, id_ in rows}
+
+
+def persist_responses(rows: List[dict]) -> List[PersistResult]:
+    """Insert validated responses in a single transaction.
+
+    Rows whose submission_id is already stored (or repeated within rows) are
+    not inserted again; their result carries the original id and
+    duplicate=True. Results are in the same order as rows.
+    """
+    for attempt in (1, 2):
+        existing = find_submissions(r.get('submission_id') for r in rows)
+        fresh = []
+        for r in rows:
+            sid = r.get('submission_id')
+            if sid and sid in existing:
+                continue
+            if sid:
+                existing[sid] = None  # first occurrence in this batch wins
+            fresh.append(r)
+        try:
+            ids = insert_responses(fresh)
+            db.session.commit()
+            break
+        except IntegrityError:
+            # A concurrent request stored the same submission_id first: look it up again
+            db.session.rollback()
+            if attempt == 2 or not any(r.get('submission_id') for r in fresh):
+                raise
+        except Exception:
+            db.session.rollback()
+            raise
+
+    new_ids = {id(r): id_ for r, id_ in zip(fresh, ids)}
+    stored = {r.get('submission_id'): new_ids[id(r)] for r in fresh if r.get('submission_id')}
+    out = []
+    for r in rows:
+        if id(r) in new_ids:
+            out.append(PersistResult(new_ids[id(r)]))
+        else:
+            sid = r['submission_id']
+            out.append(PersistResult(existing.get(sid) or stored[sid], duplicate=True))
+    return out
+
+
+def persist_each(rows: List[dict]) -> List[Optional[PersistResult]]:
+    """persist_responses() that keeps one failing row from losing the others.
+
+    The rows share one transaction; if it fails they are retried one by one
+    and the rows that still fail get None.
+    """
+    try:
+        return list(persist_responses(rows))
+    except Exception:
+        if len(rows) == 1:
+            logger.exception('Storing a submission failed')
+            return [None]
+        logger.exception('Storing a batch of %d submissions failed, retrying one by one', len(rows))
+    out: List[Optional[PersistResult]] = []
+    for row in rows:
+        out.extend(persist_each([row]))
+    return out
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import math
+from typing import List
+
+from reportlab.lib import colors
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from .charts import ChartSpec, _pct
+
+# Same palette/typography as the matplotlib charts (see charts.py)
+BAR_COLOR = colors.HexColor("#00386C")   # BW_BLUE
+HBAR_COLOR = colors.HexColor("#0E8187")  # BW_SEA
+TEXT_COLOR = colors.HexColor("#0B1E33")
+MUTED = colors.HexColor("#526581")
+AXIS = colors.HexColor("#A6AFBA")
+GRID = colors.HexColor("#E3E7EC")
+
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+TICK_SIZE = 8
+VALUE_SIZE = 7.5
+TITLE_SIZE = 10.5
+SUBTITLE_SIZE = 8.5
+
+
+def _value_label(v: int, total: int) -> str:
+    return f"{v} ({_pct(v, total):.1f}%)" if total > 0 else f"{v}"
+
+
+def _ticks(vmax: int) -> List[int]:
+    """0..vmax in 1/2/5·10^k integer steps, at most ~6 ticks."""
+    raw = max(vmax / 5.0, 1.0)
+    mag = 10 ** int(math.floor(math.log10(raw)))
+    step = next(m * mag for m in (1, 2, 5, 10) if m * mag >= raw)
+    return list(range(0, vmax + 1, int(step)))
+
+
+def _fit(text: str, font: str, size: float, width: float) -> str:
+    if stringWidth(text, font, size) <= width:
+        return text
+    while text and stringWidth(text + "…", font, size) > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _header(c: canvas.Canvas, spec: ChartSpec, x: float, top: float, w: float, left: float) -> float:
+    """Draw title/subtitle; returns the top of the plot area."""
+    top -= 4
+    if spec.title:
+        c.setFillColor(TEXT_COLOR)
+        c.setFont(FONT_BOLD, TITLE_SIZE)
+        c.drawCentredString(x + w / 2.0, top - TITLE_SIZE, spec.title)
+        top -= TITLE_SIZE + 6
+    if spec.subtitle:
+        c.setFillColor(MUTED)
+        c.setFont(FONT, SUBTITLE_SIZE)
+        c.drawString(x + left, top - SUBTITLE_SIZE, spec.subtitle)
+        top -= SUBTITLE_SIZE + 6
+    return top - 12  # room for the value labels above the tallest bar
+
+
+def _axis_title(c: canvas.Canvas, text: str, x: float, y: float, vertical: bool = False):
+    c.setFillColor(TEXT_COLOR)
+    c.setFont(FONT, TICK_SIZE)
+    if vertical:
+        c.saveState()
+        c.translate(x, y)
+        c.rotate(90)
+        c.drawCentredString(0, 0, text)
+        c.restoreState()
+    else:
+        c.drawCentredString(x, y, text)
+
+
+def _bar(c: canvas.Canvas, spec: ChartSpec, x: float, y: float, w: float, h: float):
+    labels, values = spec.labels, spec.values
+    total = sum(values)
+    ticks = _ticks(max(1, int(max(values, default=0) * 1.25)))
+    vmax = max(ticks[-1], max(values, default=0), 1)
+
+    max_len = max((len(s) for s in labels), default=0)
+    rotate = not (max_len <= 12 and len(labels) <= 6)
+    label_w = max((stringWidth(s, FONT, TICK_SIZE) for s in labels), default=0)
+    bottom = (min(label_w, h * 0.9) * math.sin(math.radians(22)) + 18) if rotate else 16
+    left = max(stringWidth(str(t), FONT, TICK_SIZE) for t in ticks) + 20
+
+    x0, x1 = x + left, x + w - 6
+    y0 = y + bottom
+    y1 = _header(c, spec, x, y + h, w, left)
+    if y1 <= y0 or not labels:
+        return
+    sy = (y1 - y0) / float(vmax)
+
+    # grid + y ticks
+    c.setLineWidth(0.6)
+    c.setFont(FONT, TICK_SIZE)
+    for t in ticks:
+        ty = y0 + t * sy
+        c.setStrokeColor(GRID)
+        c.line(x0, ty, x1, ty)
+        c.setFillColor(TEXT_COLOR)
+        c.drawRightString(x0 - 3, ty - TICK_SIZE / 3.0, str(t))
+    _axis_title(c, "Respuestas", x + TICK_SIZE, (y0 + y1) / 2.0, vertical=True)
+
+    slot = (x1 - x0) / float(len(labels))
+    bw = slot * 0.8
+    for i, (lab, v) in enumerate(zip(labels, values)):
+        cx = x0 + slot * (i + 0.5)
+        if v > 0:
+            c.setFillColor(BAR_COLOR)
+            c.rect(cx - bw / 2.0, y0, bw, v * sy, stroke=0, fill=1)
+        c.setFillColor(TEXT_COLOR)
+        c.setFont(FONT, VALUE_SIZE)
+        c.drawCentredString(cx, y0 + v * sy + 0.03 * (y1 - y0), _value_label(v, total))
+        c.setFont(FONT, TICK_SIZE)
+        if rotate:
+            c.saveState()
+            c.translate(cx, y0 - 4)
+            c.rotate(22)
+            c.drawRightString(0, -TICK_SIZE, _fit(lab, FONT, TICK_SIZE, h * 0.9))
+            c.restoreState()
+        else:
+            c.drawCentredString(cx, y0 - TICK_SIZE - 3, _fit(lab, FONT, TICK_SIZE, slot))
+
+    c.setStrokeColor(AXIS)
+    c.setLineWidth(0.8)
+    c.line(x0, y0, x1, y0)
+    c.line(x0, y0, x0, y1)
+
+
+def _horizontal(c: canvas.Canvas, spec: ChartSpec, x: float, y: float, w: float, h: float):
+    labels, values = spec.labels, spec.values
+    total = sum(values)
+    ticks = _ticks(max(1, int(max(values, default=0) * 1.30)))
+    vmax = max(ticks[-1], max(values, default=0), 1)
+
+    max_label_w = w * 0.4
+    label_w = min(max((stringWidth(s, FONT, TICK_SIZE) for s in labels), default=0), max_label_w)
+    left = label_w + 8
+    bottom = TICK_SIZE * 2 + 14
+
+    x0, x1 = x + left, x + w - 6
+    y0 = y + bottom
+    y1 = _header(c, spec, x, y + h, w, left) + 8
+    if y1 <= y0 or not labels:
+        return
+    sx = (x1 - x0) / float(vmax)
+
+    # grid + x ticks
+    c.setLineWidth(0.6)
+    c.setFont(FONT, TICK_SIZE)
+    for t in ticks:
+        tx = x0 + t * sx
+        c.setStrokeColor(GRID)
+        c.line(tx, y0, tx, y1)
+        c.setFillColor(TEXT_COLOR)
+        c.drawCentredString(tx, y0 - TICK_SIZE - 3, str(t))
+    _axis_title(c, "Respuestas", (x0 + x1) / 2.0, y + 2)
+
+    # first label at the bottom, as in the matplotlib version
+    slot = (y1 - y0) / float(len(labels))
+    bh = slot * 0.8
+    for i, (lab, v) in enumerate(zip(labels, values)):
+        cy = y0 + slot * (i + 0.5)
+        if v > 0:
+            c.setFillColor(HBAR_COLOR)
+            c.rect(x0, cy - bh / 2.0, v * sx, bh, stroke=0, fill=1)
+        c.setFillColor(TEXT_COLOR)
+        c.setFont(FONT, VALUE_SIZE)
+        c.drawString(x0 + v * sx + 0.02 * (x1 - x0), cy - VALUE_SIZE / 3.0, _value_label(v, total))
+        c.setFont(FONT, TICK_SIZE)
+        c.drawRightString(x0 - 4, cy - TICK_SIZE / 3.0, _fit(lab, FONT, TICK_SIZE, max_label_w))
+
+    c.setStrokeColor(AXIS)
+    c.setLineWidth(0.8)
+    c.line(x0, y0, x1, y0)
+    c.line(x0, y0, x0, y1)
+
+
+def draw_chart(c: canvas.Canvas, spec: ChartSpec, x: float, y: float, w: float, h: float):
+    """Draw a chart as PDF vector graphics in the box (x, y, w, h)."""
+    c.saveState()
+    try:
+        if spec.kind == "horizontal":
+            _horizontal(c, spec, x, y, w, h)
+        else:
+            _bar(c, spec, x, y, w, h)
+    finally:
+        c.restoreState()
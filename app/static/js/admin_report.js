@@ -87,8 +87,51 @@
     return `${a.toFixed(2)} (${lab})`;
   }
 
+  // ---------------- Background exports ----------------
+  // Export links queue a job and poll it; the plain href stays as a fallback.
+  const exportStatus = document.getElementById('exportStatus');
+  const sleep = (ms) => new Promise(r => setTimeout(r, ms));
+
+  async function runExport(link) {
+    const label = link.textContent;
+    link.classList.add('disabled');
+    try {
+      const res = await fetch(`/admin/api/campaigns/${campaignId}/exports`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ kind: link.dataset.exportKind }),
+      });
+      if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      let job = await res.json();
+      const { status_url: statusUrl, download_url: downloadUrl } = job;
+      while (job.status === 'queued' || job.status === 'running') {
+        if (exportStatus) exportStatus.textContent = `${label}: ${job.status === 'queued' ? 'en cola' : 'generando'} (${job.progress}%)`;
+        await sleep(1500);
+        const st = await fetch(statusUrl, { cache: 'no-store' });
+        if (!st.ok) throw new Error(`HTTP ${st.status}`);
+        job = await st.json();
+      }
+      if (job.status !== 'done') throw new Error(job.error || job.status);
+      if (exportStatus) exportStatus.textContent = `${label}: listo.`;
+      window.location.href = downloadUrl;
+    } catch (err) {
+      if (exportStatus) exportStatus.textContent = `${label}: error (${err.message}).`;
+    } finally {
+      link.classList.remove('disabled');
+    }
+  }
+
+  document.querySelectorAll('[data-export-kind]').forEach(link => {
+    link.addEventListener('click', (ev) => {
+      ev.preventDefault();
+      if (!link.classList.contains('disabled')) runExport(link);
+    });
+  });
+
   // ---------------- Fetch analytics ----------------
-  const res = await fetch(`/admin/api/campaigns/${campaignId}/analytics`, { cache: 'no-store' });
+  // Comments and follow-ups are paged through their own endpoints below
+  const sections = 'kpis,by_day,by_shift,questions,special';
+  const res = await fetch(`/admin/api/campaigns/${campaignId}/analytics?sections=${sections}`, { cache: 'no-store' });
   if (!res.ok) return;
   const data = await res.json();
 
@@ -356,32 +399,57 @@
     }
   }
 
-  function renderPager(el, meta, onPage) {
+  // Keyset pagination: the API returns next_cursor; earlier cursors are kept
+  // on a stack so "Anterior" can go back.
+  function cursorPager(load) {
+    const stack = [];
+    let current = '';
+    return {
+      first() { stack.length = 0; current = ''; return load(''); },
+      next(cursor) { stack.push(current); current = cursor; return load(cursor); },
+      prev() { current = stack.pop() || ''; return load(current); },
+      get page() { return stack.length + 1; },
+      get hasPrev() { return stack.length > 0; },
+    };
+  }
+
+  function renderPager(el, meta, pager) {
     if (!el || !meta) return;
     el.innerHTML = '';
 
     const info = document.createElement('div');
     info.className = 'muted';
-    info.textContent = `Mostrando página ${meta.page} de ${meta.pages} · Total: ${meta.total}`;
+    if (meta.total != null) {
+      const pages = Math.max(Math.ceil(meta.total / (meta.per_page || 10)), 1);
+      info.textContent = `Mostrando página ${pager.page} de ${pages} · Total: ${meta.total}`;
+    } else {
+      info.textContent = `Mostrando página ${pager.page}`;
+    }
     el.appendChild(info);
 
     const prev = document.createElement('button');
     prev.className = 'btn small';
     prev.textContent = 'Anterior';
-    prev.disabled = meta.page <= 1;
-    prev.onclick = () => onPage(meta.page - 1);
+    prev.disabled = !pager.hasPrev;
+    prev.onclick = () => pager.prev();
     el.appendChild(prev);
 
     const next = document.createElement('button');
     next.className = 'btn small';
     next.textContent = 'Siguiente';
-    next.disabled = meta.page >= meta.pages;
-    next.onclick = () => onPage(meta.page + 1);
+    next.disabled = !meta.next_cursor;
+    next.onclick = () => pager.next(meta.next_cursor);
     el.appendChild(next);
   }
 
-  async function loadResponses(page = 1) {
-    const res = await fetch(`/admin/api/campaigns/${campaignId}/responses?page=${page}&per_page=10`, { cache: 'no-store' });
+  function pageUrl(kind, cursor) {
+    const qs = new URLSearchParams({ per_page: '10' });
+    if (cursor) qs.set('cursor', cursor);
+    return `/admin/api/campaigns/${campaignId}/${kind}?${qs}`;
+  }
+
+  async function loadResponses(cursor = '') {
+    const res = await fetch(pageUrl('responses', cursor), { cache: 'no-store' });
     if (!res.ok) return;
     const data = await res.json();
 
@@ -403,11 +471,11 @@
         }
       }
     }
-    renderPager(pagerResponses, data, loadResponses);
+    renderPager(pagerResponses, data, responsesPager);
   }
 
-  async function loadFollowups(page = 1) {
-    const res = await fetch(`/admin/api/campaigns/${campaignId}/followups?page=${page}&per_page=10`, { cache: 'no-store' });
+  async function loadFollowups(cursor = '') {
+    const res = await fetch(pageUrl('followups', cursor), { cache: 'no-store' });
     if (!res.ok) return;
     const data = await res.json();
 
@@ -429,11 +497,11 @@
         }
       }
     }
-    renderPager(pagerFollowups, data, loadFollowups);
+    renderPager(pagerFollowups, data, followupsPager);
   }
 
-  async function loadComments(page = 1) {
-    const res = await fetch(`/admin/api/campaigns/${campaignId}/comments?page=${page}&per_page=10`, { cache: 'no-store' });
+  async function loadComments(cursor = '') {
+    const res = await fetch(pageUrl('comments', cursor), { cache: 'no-store' });
     if (!res.ok) return;
     const data = await res.json();
 
@@ -455,10 +523,14 @@
         }
       }
     }
-    renderPager(pagerComments, data, loadComments);
+    renderPager(pagerComments, data, commentsPager);
   }
 
-  loadResponses(1);
-  loadComments(1);
-  loadFollowups(1);
+  const responsesPager = cursorPager(loadResponses);
+  const commentsPager = cursorPager(loadComments);
+  const followupsPager = cursorPager(loadFollowups);
+
+  responsesPager.first();
+  commentsPager.first();
+  followupsPager.first();
 })();
\ No newline at end of file
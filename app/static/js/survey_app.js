@@ -9,6 +9,7 @@
   const offlineBanner = document.getElementById('offlineBanner');
 
   const QUEUE_KEY = 'bw_survey_queue_v1';
+  const QUEUE_CHUNK = 50;
   const IDLE_MS = 60000;
   let idleTimer = null;
 
@@ -54,24 +55,39 @@
     localStorage.setItem(QUEUE_KEY, JSON.stringify(items));
   }
 
+  let flushing = false;
+
   async function flushQueue(){
-    if(!navigator.onLine) return;
+    if(!navigator.onLine || flushing) return;
     const items = loadQueue();
     if(items.length === 0) return;
+    flushing = true;
     const remaining = [];
-    for(const item of items){
+    // Drain in chunks through the batch endpoint (one transaction per chunk)
+    for(let i = 0; i < items.length; i += QUEUE_CHUNK){
+      const chunk = items.slice(i, i + QUEUE_CHUNK);
       try{
-        const res = await fetch(`/api/submit/${encodeURIComponent(item.token)}`, {
+        const res = await fetch('/api/submit/batch', {
           method: 'POST',
           headers: {'Content-Type':'application/json'},
-          body: JSON.stringify(item.payload)
+          body: JSON.stringify({items: chunk.map(it => ({token: it.token, payload: it.payload}))})
+        });
+        if(!res.ok) throw new Error('batch failed');
+        const data = await res.json();
+        const results = data.results || [];
+        chunk.forEach((item, idx) => {
+          const r = results[idx];
+          // Stored items and permanent rejections (4xx) leave the queue
+          if(r && (r.ok || (r.status >= 400 && r.status < 500))) return;
+          remaining.push(item);
         });
-        if(!res.ok) throw new Error('submit failed');
       }catch(e){
-        remaining.push(item);
+        remaining.push(...chunk);
       }
     }
-    saveQueue(remaining);
+    // Keep anything queued while we were flushing
+    saveQueue(remaining.concat(loadQueue().slice(items.length)));
+    flushing = false;
   }
 
   function visibleQuestions(){
@@ -312,7 +328,7 @@
     // populate area list if needed
     if(requireArea){
       try{
-        const res = await fetch('/api/areas', { cache: 'no-store' });
+        const res = await fetch('/api/areas', { cache: 'no-cache' }); // revalidates via ETag
         if(res.ok){
           const data = await res.json();
           const sel = document.getElementById('areaSelect');
@@ -410,8 +426,20 @@
     return out;
   }
 
+  function newSubmissionId(){
+    // Sent with every (re)try of the same response so the server can drop duplicates
+    if(window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    const b = new Uint8Array(16);
+    crypto.getRandomValues(b);
+    b[6] = (b[6] & 0x0f) | 0x40;
+    b[8] = (b[8] & 0x3f) | 0x80;
+    const h = Array.from(b, x => x.toString(16).padStart(2, '0')).join('');
+    return `${h.slice(0,8)}-${h.slice(8,12)}-${h.slice(12,16)}-${h.slice(16,20)}-${h.slice(20)}`;
+  }
+
   async function submit(){
     const payload = {
+      submission_id: newSubmissionId(),
       lang,
       area_id: requireArea ? Number(areaId) : null,
       shift,
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Reporting dependencies that must only load on the first export/QR request
+LAZY_MODULES = ('matplotlib', 'reportlab', 'openpyxl', 'qrcode', 'PIL')
+
+_PROBE = (
+    'import json, sys, time\n'
+    't = time.perf_counter()\n'
+    'from app import create_app\n'
+    'create_app()\n'
+    'wall = (time.perf_counter() - t) * 1000\n'
+    'lazy = [m for m in {lazy!r} if m in sys.modules]\n'
+    'print(json.dumps({{"wall_ms": wall, "lazy_loaded": lazy}}))\n'
+)
+
+
+class StartupReport(NamedTuple):
+    import_ms: float  # sum of the top-level imports reported by -X importtime
+    wall_ms: float  # import + create_app(), including the importtime overhead
+    top: List[Tuple[float, str]]  # (cumulative ms, module) of the slowest top-level imports
+    lazy_loaded: List[str]  # LAZY_MODULES that create_app() imported anyway
+
+
+def _parse(stderr: str) -> Dict[str, float]:
+    """module -> cumulative ms of the top-level imports (no indentation)."""
+    out = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header line
+        name = parts[2]
+        if name.startswith(' ') and not name.startswith(' ' * 2):
+            out[name.strip()] = int(parts[1]) / 1000.0
+    return out
+
+
+def measure_startup(root: Optional[str] = None, top: int = 10) -> StartupReport:
+    """Import the app and run create_app() in a fresh interpreter with -X importtime.
+
+    The scheduler is disabled in the child so it exits right away.
+    """
+    root = root or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, CAMPAIGN_SCHEDULER='0')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE.format(lazy=LAZY_MODULES)],
+        cwd=root, env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    modules = _parse(proc.stderr)
+    slowest = sorted(((ms, name) for name, ms in modules.items()), reverse=True)[:top]
+    return StartupReport(sum(modules.values()), result['wall_ms'], slowest, result['lazy_loaded'])
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(ts: datetime, row_id: int) -> str:
+    """Opaque cursor for the (timestamp, id) position of a row."""
+    raw = f'{ts.isoformat()}|{int(row_id)}'.encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor(); ValueError if the cursor is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        ts, row_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii').split('|', 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except (TypeError, UnicodeError, ValueError) as exc:
+        raise ValueError('invalid cursor') from exc
+
+
+def keyset_page(query, ts_col, id_col, cursor: Optional[str], per_page: int) -> Tuple[List, Optional[str]]:
+    """Newest-first page of `query` after `cursor` (keyset on ts_col, id_col).
+
+    Returns (rows, next_cursor); next_cursor is None on the last page. The cost
+    does not depend on how deep the page is, unlike OFFSET.
+    """
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(ts_col, id_col) < tuple_(ts, row_id))
+    rows = query.order_by(ts_col.desc(), id_col.desc()).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, ts_col.key), getattr(last, id_col.key))
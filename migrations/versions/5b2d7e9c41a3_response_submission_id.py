@@ -0,0 +1,28 @@
+"""response submission_id (idempotent submits)
+
+Revision ID: 5b2d7e9c41a3
+Revises: 023179c59903
+Create Date: 2026-10-17 09:12:40.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2d7e9c41a3'
+down_revision = '023179c59903'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('submission_id', sa.String(length=36), nullable=True))
+        batch_op.create_index(batch_op.f('ix_responses_submission_id'), ['submission_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('responses', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_responses_submission_id'))
+        batch_op.drop_column('submission_id')
@@ -0,0 +1,26 @@
+"""campaign activity index
+
+Revision ID: 8c4f1a6d2e07
+Revises: 5b2d7e9c41a3
+Create Date: 2026-10-17 10:05:12.402811
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4f1a6d2e07'
+down_revision = '5b2d7e9c41a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('campaigns', schema=None) as batch_op:
+        batch_op.create_index('ix_campaigns_activity', ['is_active', 'start_at', 'end_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('campaigns', schema=None) as batch_op:
+        batch_op.drop_index('ix_campaigns_activity')
@@ -0,0 +1,34 @@
+"""campaign artifacts
+
+Revision ID: b5e0c7d21f46
+Revises: a83d5f0e9c12
+Create Date: 2026-10-17 18:12:40.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e0c7d21f46'
+down_revision = 'a83d5f0e9c12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('campaign_artifacts',
+    sa.Column('campaign_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('watermark', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=200), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], ),
+    sa.PrimaryKeyConstraint('campaign_id', 'kind')
+    )
+
+
+def downgrade():
+    op.drop_table('campaign_artifacts')
@@ -0,0 +1,41 @@
+"""analytics rollups
+
+Revision ID: c17e4b9a5d30
+Revises: 8c4f1a6d2e07
+Create Date: 2026-10-17 11:40:27.931554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c17e4b9a5d30'
+down_revision = '8c4f1a6d2e07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('campaign_rollups',
+    sa.Column('campaign_id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(length=16), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], ),
+    sa.PrimaryKeyConstraint('campaign_id', 'dimension', 'key')
+    )
+    op.create_table('question_rollups',
+    sa.Column('campaign_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.String(length=120), nullable=False),
+    sa.Column('value', sa.String(length=255), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], ),
+    sa.PrimaryKeyConstraint('campaign_id', 'question_id', 'value')
+    )
+    # Existing responses are counted by d3a8f5b2c640 (fill analytics rollups)
+
+
+def downgrade():
+    op.drop_table('question_rollups')
+    op.drop_table('campaign_rollups')
@@ -0,0 +1,114 @@
+"""fill analytics rollups
+
+Revision ID: d3a8f5b2c640
+Revises: b5e0c7d21f46
+Create Date: 2026-10-18 09:10:31.502114
+
+"""
+from collections import Counter
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8f5b2c640'
+down_revision = 'b5e0c7d21f46'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the counting rules in app/services/rollups.py (_count_row)
+VALUE_TYPES = ('likert', 'single')
+FILLED = '*'
+
+campaigns = sa.table('campaigns', sa.column('id', sa.Integer), sa.column('snapshot_json', sa.JSON))
+responses = sa.table(
+    'responses',
+    sa.column('campaign_id', sa.Integer),
+    sa.column('submitted_at', sa.DateTime),
+    sa.column('area_id', sa.Integer),
+    sa.column('shift', sa.String),
+    sa.column('wants_followup', sa.Boolean),
+    sa.column('answers_json', sa.JSON),
+)
+campaign_rollups = sa.table(
+    'campaign_rollups',
+    sa.column('campaign_id', sa.Integer),
+    sa.column('dimension', sa.String),
+    sa.column('key', sa.String),
+    sa.column('count', sa.Integer),
+)
+question_rollups = sa.table(
+    'question_rollups',
+    sa.column('campaign_id', sa.Integer),
+    sa.column('question_id', sa.String),
+    sa.column('value', sa.String),
+    sa.column('count', sa.Integer),
+)
+
+
+def _kinds(snapshot):
+    questions = ((snapshot or {}).get('schema') or {}).get('questions') or []
+    return {
+        q.get('id'): (q.get('type') or '').lower() in VALUE_TYPES
+        for q in questions if isinstance(q, dict) and q.get('id')
+    }
+
+
+def _normalize(val):
+    if isinstance(val, dict) and 'value' in val:
+        return val.get('value')
+    if isinstance(val, dict) and 'text' in val:
+        return val.get('text')
+    return val
+
+
+def _count(row, kinds, dims, answers):
+    dims[('total', '')] += 1
+    if row.wants_followup:
+        dims[('followup', '')] += 1
+    dims[('day', row.submitted_at.date().isoformat())] += 1
+    if row.area_id:
+        dims[('area', str(row.area_id))] += 1
+    if row.shift:
+        dims[('shift', str(row.shift)[:64])] += 1
+    if not isinstance(row.answers_json, dict):
+        return
+    for qid, val in row.answers_json.items():
+        if qid not in kinds or val is None:
+            continue
+        answers[(qid, str(_normalize(val))[:255] if kinds[qid] else FILLED)] += 1
+
+
+def upgrade():
+    # Count the responses stored before rollups were maintained on submit
+    # (recounts every campaign, so it also repairs partial counters)
+    bind = op.get_bind()
+    for campaign_id, snapshot in bind.execute(sa.select(campaigns.c.id, campaigns.c.snapshot_json)).all():
+        kinds = _kinds(snapshot)
+        dims, answers = Counter(), Counter()
+        stmt = (
+            sa.select(responses.c.submitted_at, responses.c.area_id, responses.c.shift,
+                      responses.c.wants_followup, responses.c.answers_json)
+            .where(responses.c.campaign_id == campaign_id)
+            .execution_options(yield_per=1000)
+        )
+        for row in bind.execute(stmt):
+            _count(row, kinds, dims, answers)
+
+        bind.execute(sa.delete(campaign_rollups).where(campaign_rollups.c.campaign_id == campaign_id))
+        bind.execute(sa.delete(question_rollups).where(question_rollups.c.campaign_id == campaign_id))
+        if dims:
+            bind.execute(sa.insert(campaign_rollups), [
+                {'campaign_id': campaign_id, 'dimension': d, 'key': k, 'count': n} for (d, k), n in dims.items()
+            ])
+        if answers:
+            bind.execute(sa.insert(question_rollups), [
+                {'campaign_id': campaign_id, 'question_id': q, 'value': v, 'count': n}
+                for (q, v), n in answers.items()
+            ])
+
+
+def downgrade():
+    # derived data: the tables are left as they are
+    pass
@@ -0,0 +1,46 @@
+"""response comments
+
+Revision ID: e4a9d21c7b58
+Revises: c17e4b9a5d30
+Create Date: 2026-10-17 13:05:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a9d21c7b58'
+down_revision = 'c17e4b9a5d30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('response_comments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('response_id', sa.Integer(), nullable=False),
+    sa.Column('campaign_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.String(length=120), nullable=False),
+    sa.Column('lang', sa.String(length=8), nullable=False),
+    sa.Column('area_id', sa.Integer(), nullable=True),
+    sa.Column('shift', sa.String(length=16), nullable=True),
+    sa.Column('submitted_at', sa.DateTime(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['area_id'], ['areas.id'], ),
+    sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], ),
+    sa.ForeignKeyConstraint(['response_id'], ['responses.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('response_comments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_response_comments_response_id'), ['response_id'], unique=False)
+        batch_op.create_index('ix_response_comments_page', ['campaign_id', 'submitted_at', 'id'], unique=False)
+    # Existing responses are indexed by f4d6a83b2e19 (fill response comments)
+
+
+def downgrade():
+    with op.batch_alter_table('response_comments', schema=None) as batch_op:
+        batch_op.drop_index('ix_response_comments_page')
+        batch_op.drop_index(batch_op.f('ix_response_comments_response_id'))
+
+    op.drop_table('response_comments')
@@ -0,0 +1,26 @@
+"""campaign analytics generation
+
+Revision ID: e7b2c94a1f58
+Revises: d3a8f5b2c640
+Create Date: 2026-10-18 10:02:14.880257
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7b2c94a1f58'
+down_revision = 'd3a8f5b2c640'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('campaigns', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('analytics_generation', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('campaigns', schema=None) as batch_op:
+        batch_op.drop_column('analytics_generation')
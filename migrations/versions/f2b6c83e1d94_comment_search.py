@@ -0,0 +1,64 @@
+"""comment full-text search
+
+Revision ID: f2b6c83e1d94
+Revises: e4a9d21c7b58
+Create Date: 2026-10-17 14:22:47.105233
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6c83e1d94'
+down_revision = 'e4a9d21c7b58'
+branch_labels = None
+depends_on = None
+
+
+def _sqlite_has_fts5(bind):
+    return bool(bind.execute(sa.text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar())
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute(
+            "ALTER TABLE response_comments ADD COLUMN text_tsv tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('spanish', text)) STORED"
+        )
+        op.execute("CREATE INDEX ix_response_comments_text_tsv ON response_comments USING gin (text_tsv)")
+    elif bind.dialect.name == 'sqlite' and _sqlite_has_fts5(bind):
+        # external-content index over response_comments, kept in sync by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE response_comments_fts USING fts5("
+            "text, content='response_comments', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE TRIGGER response_comments_fts_ai AFTER INSERT ON response_comments BEGIN "
+            "INSERT INTO response_comments_fts(rowid, text) VALUES (new.id, new.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER response_comments_fts_ad AFTER DELETE ON response_comments BEGIN "
+            "INSERT INTO response_comments_fts(response_comments_fts, rowid, text) VALUES ('delete', old.id, old.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER response_comments_fts_au AFTER UPDATE ON response_comments BEGIN "
+            "INSERT INTO response_comments_fts(response_comments_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+            "INSERT INTO response_comments_fts(rowid, text) VALUES (new.id, new.text); END"
+        )
+        op.execute("INSERT INTO response_comments_fts(response_comments_fts) VALUES ('rebuild')")
+    # other databases: services/comment_search falls back to LIKE
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_response_comments_text_tsv")
+        op.execute("ALTER TABLE response_comments DROP COLUMN IF EXISTS text_tsv")
+    elif bind.dialect.name == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS response_comments_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS response_comments_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS response_comments_fts_ai")
+        op.execute("DROP TABLE IF EXISTS response_comments_fts")
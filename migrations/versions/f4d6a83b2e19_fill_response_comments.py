@@ -0,0 +1,126 @@
+"""fill response comments
+
+Revision ID: f4d6a83b2e19
+Revises: e7b2c94a1f58
+Create Date: 2026-10-18 10:48:55.317904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4d6a83b2e19'
+down_revision = 'e7b2c94a1f58'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of the extraction rules in app/services/comments.py (_comment_rows)
+TEXT_TYPES = ('text', 'textarea', 'comment')
+COMMENTS = 'comments'
+
+campaigns = sa.table('campaigns', sa.column('id', sa.Integer), sa.column('snapshot_json', sa.JSON))
+responses = sa.table(
+    'responses',
+    sa.column('id', sa.Integer),
+    sa.column('campaign_id', sa.Integer),
+    sa.column('lang', sa.String),
+    sa.column('area_id', sa.Integer),
+    sa.column('shift', sa.String),
+    sa.column('submitted_at', sa.DateTime),
+    sa.column('answers_json', sa.JSON),
+)
+response_comments = sa.table(
+    'response_comments',
+    sa.column('response_id', sa.Integer),
+    sa.column('campaign_id', sa.Integer),
+    sa.column('question_id', sa.String),
+    sa.column('lang', sa.String),
+    sa.column('area_id', sa.Integer),
+    sa.column('shift', sa.String),
+    sa.column('submitted_at', sa.DateTime),
+    sa.column('text', sa.Text),
+)
+campaign_rollups = sa.table(
+    'campaign_rollups',
+    sa.column('campaign_id', sa.Integer),
+    sa.column('dimension', sa.String),
+    sa.column('key', sa.String),
+    sa.column('count', sa.Integer),
+)
+
+
+def _text_qids(snapshot):
+    if not isinstance(snapshot, dict):
+        return set()
+    questions = snapshot.get('questions')
+    if not isinstance(questions, list):
+        schema = snapshot.get('schema')
+        questions = schema.get('questions') if isinstance(schema, dict) else None
+    return {
+        str(q.get('id')) for q in (questions if isinstance(questions, list) else [])
+        if isinstance(q, dict) and (q.get('type') or '').lower() in TEXT_TYPES
+    }
+
+
+def _comment_text(val):
+    text_val = None
+    if isinstance(val, str):
+        text_val = val
+    elif isinstance(val, dict):
+        if isinstance(val.get('text'), str):
+            text_val = val.get('text')
+        elif isinstance(val.get('value'), str):
+            text_val = val.get('value')
+    return (text_val or '').strip() or None
+
+
+def upgrade():
+    # Index the text answers stored before comments were indexed on submit
+    # (reindexes every campaign, so responses from between revisions are not doubled)
+    bind = op.get_bind()
+    for campaign_id, snapshot in bind.execute(sa.select(campaigns.c.id, campaigns.c.snapshot_json)).all():
+        qids = _text_qids(snapshot)
+        bind.execute(sa.delete(response_comments).where(response_comments.c.campaign_id == campaign_id))
+        bind.execute(sa.delete(campaign_rollups).where(
+            campaign_rollups.c.campaign_id == campaign_id, campaign_rollups.c.dimension == COMMENTS))
+        if not qids:
+            continue
+        stmt = (
+            sa.select(responses)
+            .where(responses.c.campaign_id == campaign_id)
+            .execution_options(yield_per=1000)
+        )
+        total = 0
+        batch = []
+        for row in bind.execute(stmt):
+            if not isinstance(row.answers_json, dict):
+                continue
+            for qid, val in row.answers_json.items():
+                text_val = _comment_text(val) if str(qid) in qids else None
+                if text_val:
+                    batch.append({
+                        'response_id': row.id,
+                        'campaign_id': campaign_id,
+                        'question_id': str(qid)[:120],
+                        'lang': row.lang or 'es',
+                        'area_id': row.area_id,
+                        'shift': row.shift,
+                        'submitted_at': row.submitted_at,
+                        'text': text_val,
+                    })
+            if len(batch) >= 1000:
+                bind.execute(sa.insert(response_comments), batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            bind.execute(sa.insert(response_comments), batch)
+            total += len(batch)
+        if total:
+            bind.execute(sa.insert(campaign_rollups),
+                         [{'campaign_id': campaign_id, 'dimension': COMMENTS, 'key': '', 'count': total}])
+
+
+def downgrade():
+    # derived data: the rows are left as they are
+    pass
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models import Campaign, Survey
+from app.services.comments import _questions_cache
+from app.services.rollups import _kinds_cache
+
+SCHEMA = {
+    'questions': [
+        {'id': 'q_satisfaccion', 'type': 'likert', 'scale': 5, 'likert_preset': 'satisfaction',
+         'text': {'es': 'Satisfacción', 'en': 'Satisfaction'}},
+        {'id': 'q_motivo', 'type': 'single', 'text': {'es': 'Motivo'},
+         'options': [{'value': 'sabor', 'label': {'es': 'Sabor'}},
+                     {'value': 'precio', 'label': {'es': 'Precio'}}],
+         'show_if': [{'question': 'q_satisfaccion', 'op': 'in', 'value': ['1', '2']}]},
+        {'id': 'q_comentario', 'type': 'textarea', 'text': {'es': 'Comentario', 'en': 'Comment'}},
+    ],
+}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "app.db"}')
+    monkeypatch.setattr(Config, 'CAMPAIGN_SCHEDULER', False)
+    app = create_app()
+    app.config['TESTING'] = True
+    app.instance_path = str(tmp_path / 'instance')
+    # module-level caches keyed by campaign id outlive the per-test database
+    _kinds_cache.clear()
+    _questions_cache.clear()
+    with app.app_context():
+        # enforce foreign keys like Postgres does
+        event.listen(db.engine, 'connect', lambda conn, _: conn.execute('PRAGMA foreign_keys=ON'))
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin(client):
+    client.post('/auth/login', data={'username': Config.ADMIN_USERNAME, 'password': Config.ADMIN_PASSWORD})
+    return client
+
+
+@pytest.fixture
+def make_campaign(app):
+    def make(**kwargs):
+        survey = Survey(title='Comedor', category='COMEDOR', schema_json=SCHEMA)
+        db.session.add(survey)
+        db.session.flush()
+        values = dict(
+            token=Campaign.new_token(),
+            survey_id=survey.id,
+            name='Comedor test',
+            snapshot_json={'survey_id': survey.id, 'title': survey.title, 'category': survey.category,
+                           'schema': SCHEMA},
+            is_active=True,
+            require_area=False,
+            require_shift=False,
+        )
+        values.update(kwargs)
+        campaign = Campaign(**values)
+        db.session.add(campaign)
+        db.session.commit()
+        return campaign
+    return make
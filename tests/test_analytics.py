@@ -0,0 +1,168 @@
+from sqlalchemy import event
+
+from app.extensions import db
+from app.models import ResponseComment
+from app.services.analytics import compute_campaign_analytics
+
+
+def _submit(client, campaign, answers, **payload):
+    res = client.post(f'/api/submit/{campaign.token}', json=dict(payload, answers=answers))
+    assert res.status_code == 200, res.get_json()
+
+
+def _statements(app):
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    return seen, lambda: event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_comments_come_from_the_index(app, client, make_campaign):
+    c = make_campaign()
+    _submit(client, c, {'q_satisfaccion': '5', 'q_comentario': '  Muy rica  '}, shift='T1')
+    _submit(client, c, {'q_satisfaccion': '2', 'q_comentario': {'text': 'Fría'}})
+    _submit(client, c, {'q_satisfaccion': '3', 'q_comentario': '   '})
+
+    seen, stop = _statements(app)
+    try:
+        comments = compute_campaign_analytics(c, sections=['comments'])['comments']
+    finally:
+        stop()
+    assert not [s for s in seen if 'answers_json' in s]
+    assert sorted((x['text'], x['question'], x['shift']) for x in comments) == [
+        ('Fría', 'Comentario', None), ('Muy rica', 'Comentario', 'T1'),
+    ]
+
+
+def test_comments_fall_back_to_responses_when_not_indexed(app, client, make_campaign):
+    c = make_campaign()
+    _submit(client, c, {'q_comentario': 'Muy rica'}, shift='T1')
+    _submit(client, c, {'q_comentario': {'text': 'Fría'}})
+    indexed = compute_campaign_analytics(c, sections=['comments'])['comments']
+
+    ResponseComment.query.delete()
+    db.session.commit()
+    scanned = compute_campaign_analytics(c, sections=['comments'])['comments']
+    assert scanned == indexed
+    assert len(scanned) == 2
+
+
+def _seed_edge_cases(client, make_campaign):
+    from app.models import Area
+
+    c = make_campaign()
+    norte, sur = Area(name='Norte'), Area(name='Sur')
+    db.session.add_all([norte, sur])
+    db.session.commit()
+    _submit(client, c, {'q_satisfaccion': '5', 'q_motivo': 'sabor', 'q_comentario': 'ok'},
+            area_id=norte.id, shift='T1')
+    _submit(client, c, {'q_satisfaccion': 5, 'q_motivo': {'value': 'precio'}, 'q_comentario': ''},
+            area_id=sur.id, shift='T2')
+    _submit(client, c, {'q_satisfaccion': {'value': '1'}, 'q_motivo': 'otro', 'q_comentario': None},
+            area_id=norte.id)
+    _submit(client, c, {'q_satisfaccion': None, 'q_motivo': ['sabor', 'precio'], 'q_comentario': {'text': 'x'}})
+    _submit(client, c, {'q_satisfaccion': '2', 'q_motivo': {'text': 'sabor'}, 'extra': 'ignored'},
+            wants_followup=True, contact_name='Ana', employee_no='12')
+    _submit(client, c, {})
+    return c
+
+
+def _comparable(out):
+    out = dict(out)
+    out.pop('generated_at')
+    questions = []
+    for q in out['questions']:
+        q = dict(q)
+        if q['type'] == 'single':
+            # values outside the options follow counter order, which no backend promises
+            n = 2
+            q['extra'] = sorted(zip(q['labels'][n:], q['values'][n:]))
+            q['labels'], q['values'] = q['labels'][:n], q['values'][:n]
+        questions.append(q)
+    out['questions'] = questions
+    return out
+
+
+def test_backends_match_the_baseline_output(app, client, make_campaign):
+    """Counting backends against what the original per-response loop produced for the same data."""
+    from app.models import Response
+
+    c = _seed_edge_cases(client, make_campaign)
+    day = Response.query.first().submitted_at.date().isoformat()
+
+    for backend in ('rollups', 'sql', 'scan'):
+        out = compute_campaign_analytics(c, backend=backend, sections=['kpis', 'by_day', 'by_area', 'by_shift',
+                                                                        'questions', 'special'])
+        assert out['totals'] == {'responses': 6, 'followup_opt_in': 1}, backend
+        assert out['by_day'] == [[day, 6]], backend
+        assert out['by_area'] == [['Norte', 2], ['Sur', 1]], backend
+        assert out['by_shift'] == [['T1', 1], ['T2', 1]], backend
+
+        stats = {q['id']: q for q in _comparable(out)['questions']}
+        assert stats['q_satisfaccion']['labels'] == ['Muy malo', 'Malo', 'Regular', 'Bueno', 'Excelente']
+        assert stats['q_satisfaccion']['values'] == [1, 1, 0, 0, 2], backend
+        assert stats['q_motivo']['labels'] == ['Sabor', 'Precio']
+        assert stats['q_motivo']['values'] == [2, 1], backend
+        assert stats['q_motivo']['extra'] == [("['sabor', 'precio']", 1), ('otro', 1)], backend
+        assert (stats['q_comentario']['labels'], stats['q_comentario']['values']) == (['filled'], [3]), backend
+
+        special = out['special']
+        assert special['main_likert']['avg'] == 3.25, backend
+        assert special['main_likert']['dist'] == {'1': 1, '2': 1, '3': 0, '4': 0, '5': 2}, backend
+        assert special['reasons_negative'] == {
+            'qid': 'q_motivo',
+            'top': [('sabor', 2), ("['sabor', 'precio']", 1), ('otro', 1), ('precio', 1)],
+        }, backend
+        assert special['reasons_positive'] is None
+
+
+def test_backends_agree_on_the_full_output(app, client, make_campaign):
+    c = _seed_edge_cases(client, make_campaign)
+    rollups, sql, scan = (_comparable(compute_campaign_analytics(c, backend=b)) for b in ('rollups', 'sql', 'scan'))
+    assert rollups == sql == scan
+
+
+def test_rebuilding_rollups_invalidates_cached_analytics(app, client, make_campaign):
+    from sqlalchemy import update
+
+    from app.models import CampaignRollup
+    from app.services.analytics_cache import get_campaign_analytics
+    from app.services.rollups import rebuild_rollups
+
+    c = make_campaign()
+    _submit(client, c, {'q_satisfaccion': '5'})
+    _submit(client, c, {'q_satisfaccion': '4'})
+    db.session.execute(update(CampaignRollup).where(CampaignRollup.dimension == 'total').values(count=99))
+    db.session.commit()
+    assert get_campaign_analytics(c, frozenset(['kpis']))['totals']['responses'] == 99
+
+    rebuild_rollups(c.id)  # e.g. `flask analytics rebuild` in another process
+    db.session.expire_all()  # the next request loads the campaign again
+    assert get_campaign_analytics(c, frozenset(['kpis']))['totals']['responses'] == 2
+
+
+def test_comment_total_is_a_rollup_counter(app, admin, make_campaign):
+    from app.services.comments import backfill_comments
+    from app.services.rollups import COMMENTS, rebuild_rollups, rollup_count
+
+    c = make_campaign()
+    _submit(admin, c, {'q_comentario': 'Muy rica'})
+    _submit(admin, c, {'q_comentario': '  '})
+    _submit(admin, c, {'q_comentario': {'text': 'Fría'}})
+    assert rollup_count(c.id, COMMENTS) == 2
+
+    rebuild_rollups(c.id)  # keeps the comment counter
+    assert rollup_count(c.id, COMMENTS) == 2
+    assert backfill_comments(c.id) == 2
+    assert rollup_count(c.id, COMMENTS) == 2
+
+    seen, stop = _statements(app)
+    try:
+        page = admin.get(f'/admin/api/campaigns/{c.id}/comments').get_json()
+    finally:
+        stop()
+    assert page['total'] == 2 and len(page['items']) == 2
+    assert not [s for s in seen if 'count(' in s.lower() and 'response_comments' in s]
@@ -0,0 +1,65 @@
+import os
+from datetime import datetime, timedelta
+
+from app.services.analytics_cache import response_watermark
+from app.services.artifacts import artifacts_dir, finalize_closed_campaigns, get_artifact, list_artifacts
+from app.services.submissions import persist_responses
+
+
+def _store(campaign, **answers):
+    persist_responses([{'campaign_id': campaign.id, 'submitted_at': datetime.utcnow(), 'lang': 'es',
+                        'wants_followup': False, 'answers_json': answers, 'source': 'import'}])
+
+
+def test_stale_artifacts_are_frozen_again(app, make_campaign):
+    now = datetime.utcnow()
+    c = make_campaign(start_at=now - timedelta(days=2), end_at=now - timedelta(days=1))
+    _store(c, q_satisfaccion='5', q_comentario='Bien')
+
+    assert finalize_closed_campaigns() == 1
+    assert finalize_closed_campaigns() == 0
+    old_files = sorted(os.listdir(artifacts_dir(app)))
+    assert len(old_files) == 3
+
+    _store(c, q_satisfaccion='1')  # e.g. an import after the campaign closed
+    assert get_artifact(c, 'pdf') is None
+
+    assert finalize_closed_campaigns() == 1
+    arts = list_artifacts(c.id)
+    assert {a.kind for a in arts} == {'analytics', 'csv', 'pdf'}
+    assert {a.watermark for a in arts} == {response_watermark(c.id)}
+    assert get_artifact(c, 'pdf') is not None
+    files = sorted(os.listdir(artifacts_dir(app)))
+    assert files == sorted(a.filename for a in arts)
+    assert not set(files) & set(old_files)
+    assert finalize_closed_campaigns() == 0
+
+
+def test_rebuilt_counters_are_frozen_again(app, make_campaign):
+    from app.extensions import db
+    from app.models import CampaignRollup, QuestionRollup
+    from app.services.artifacts import frozen_analytics
+    from app.services.comments import backfill_comments
+    from app.services.rollups import rebuild_rollups
+
+    now = datetime.utcnow()
+    c = make_campaign(start_at=now - timedelta(days=2), end_at=now - timedelta(days=1))
+    for _ in range(3):
+        _store(c, q_satisfaccion='5')
+    # responses stored before rollups existed
+    CampaignRollup.query.delete()
+    QuestionRollup.query.delete()
+    db.session.commit()
+
+    assert finalize_closed_campaigns() == 0  # would freeze 0 responses
+    assert list_artifacts(c.id) == []
+
+    rebuild_rollups(c.id)
+    assert finalize_closed_campaigns() == 1
+    assert frozen_analytics(c)['totals']['responses'] == 3
+
+    rebuild_rollups(c.id)
+    assert list_artifacts(c.id) == []
+    assert finalize_closed_campaigns() == 1
+    backfill_comments(c.id)
+    assert list_artifacts(c.id) == []
@@ -0,0 +1,48 @@
+import io
+import json
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+from app.services import bundles
+from app.services.bundles import build_campaign_files, bundle_status, iter_bundle_zip
+
+
+class _BrokenPool:
+    """Builds the first campaign in-process; the pool breaks for the others."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, campaign_id, out_dir):
+        fut = Future()
+        self.submitted += 1
+        if self.submitted == 1:
+            fut.set_result(build_campaign_files(campaign_id, out_dir))
+        else:
+            fut.set_exception(BrokenProcessPool('a worker died'))
+        return fut
+
+
+def test_broken_pool_still_finishes_the_zip(app, make_campaign, monkeypatch):
+    pool = _BrokenPool()
+    monkeypatch.setattr(bundles, '_pool', lambda app: pool)
+    current_app.config['BUNDLE_WORKERS'] = 2
+    ids = [make_campaign(name=f'Comedor {n}').id for n in range(3)]
+
+    data = b''.join(iter_bundle_zip(ids, 'test', bundle_id='b1'))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        manifest = json.loads(zf.read('manifest.json'))
+        names = zf.namelist()
+
+    entries = {e['id']: e for e in manifest['campaigns']}
+    assert sorted(entries) == ids
+    assert entries[ids[1]]['error'] == entries[ids[2]]['error'] == 'worker pool failed'
+    for e in entries.values():
+        assert e['error'] == 'worker pool failed' or [f['path'] for f in e['files']] == [
+            p for p in names if p.startswith(f'{e["id"]}_')]
+    status = bundle_status('b1')
+    assert status['finished'] and status['done'] == 3
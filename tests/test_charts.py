@@ -0,0 +1,20 @@
+import time
+
+from app.services import charts
+from app.services.charts import ChartSpec, render_charts
+
+
+def test_idle_chart_pool_is_shut_down(monkeypatch):
+    monkeypatch.setattr(charts, 'POOL_IDLE_SECONDS', 0.2)
+    specs = [ChartSpec.build('bar', ['a', 'b'], [1, 2], 'uno'), ChartSpec.build('horizontal', ['c'], [3], 'dos')]
+    pngs = render_charts(specs, workers=2)
+    assert [p[:8] for p in pngs] == [b'\x89PNG\r\n\x1a\n'] * 2
+    assert charts._pool is not None
+
+    deadline = time.monotonic() + 5
+    while charts._pool is not None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert charts._pool is None
+
+    assert len(render_charts(specs, workers=2)) == 2  # started again on demand
+    charts._reset_pool()
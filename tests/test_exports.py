@@ -0,0 +1,66 @@
+import os
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Campaign, ExportJob
+from app.services.export_jobs import exports_dir
+
+
+def _done_job(app, campaign, kind='csv', expires_at=None):
+    job = ExportJob(id=os.urandom(16).hex(), campaign_id=campaign.id, kind=kind, status='done', progress=100,
+                    filename=f'campaign_{campaign.id}_{kind}.bin',
+                    expires_at=expires_at or datetime.utcnow() + timedelta(hours=1))
+    with open(os.path.join(exports_dir(app), job.filename), 'wb') as fh:
+        fh.write(b'x')
+    db.session.add(job)
+    db.session.commit()
+    return job.id, os.path.join(exports_dir(app), job.filename)
+
+
+def test_deleting_a_campaign_removes_its_export_jobs(app, admin, make_campaign):
+    c = make_campaign()
+    other = make_campaign(name='Otra')
+    job_id, path = _done_job(app, c)
+    other_job, other_path = _done_job(app, other)
+
+    res = admin.post(f'/admin/campaigns/{c.id}/delete')
+    assert res.status_code == 302
+    assert db.session.get(Campaign, c.id) is None
+    assert db.session.get(ExportJob, job_id) is None
+    assert not os.path.exists(path)
+    assert db.session.get(ExportJob, other_job) is not None
+    assert os.path.exists(other_path)
+
+
+def test_purge_command_removes_expired_exports(app, make_campaign):
+    c = make_campaign()
+    expired, expired_path = _done_job(app, c, expires_at=datetime.utcnow() - timedelta(minutes=1))
+    valid, valid_path = _done_job(app, c, kind='pdf')
+
+    result = app.test_cli_runner().invoke(args=['exports', 'purge'])
+    assert 'Export jobs removed: 1' in result.output
+    assert db.session.get(ExportJob, expired) is None
+    assert not os.path.exists(expired_path)
+    assert db.session.get(ExportJob, valid) is not None
+    assert os.path.exists(valid_path)
+
+
+def test_progress_is_shared_through_the_instance_folder(app, make_campaign):
+    from app.services.export_jobs import _ProgressWriter, _run, job_status
+
+    c = make_campaign()
+    job = ExportJob(id='a' * 32, campaign_id=c.id, kind='csv', status='running', progress=0)
+    db.session.add(job)
+    db.session.commit()
+
+    _ProgressWriter(app, job.id)(0.42)
+    assert job_status(job)['progress'] == 42  # what any worker polling the job sees
+
+    job.status = 'queued'
+    db.session.commit()
+    _run(app, job.id)
+    db.session.expire_all()
+    job = db.session.get(ExportJob, 'a' * 32)
+    assert job_status(job)['status'] == 'done'
+    assert job_status(job)['progress'] == 100
+    assert sorted(os.listdir(exports_dir(app))) == [job.filename]
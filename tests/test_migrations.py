@@ -0,0 +1,86 @@
+import os
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+from flask_migrate import upgrade
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+
+from .conftest import SCHEMA
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+@pytest.fixture
+def bare_app(tmp_path, monkeypatch):
+    """App on an empty database, schema built by the migrations (not create_all)."""
+    from app.services.comments import _questions_cache
+    from app.services.rollups import _kinds_cache
+
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "app.db"}')
+    monkeypatch.setattr(Config, 'CAMPAIGN_SCHEDULER', False)
+    app = create_app()
+    app.instance_path = str(tmp_path / 'instance')
+    _kinds_cache.clear()
+    _questions_cache.clear()
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+def _insert(table, **values):
+    """Raw insert: the models may have columns that the schema at this revision lacks."""
+    cols = [sa.column(k, sa.JSON if k.endswith('_json') else None) for k, v in values.items()]
+    return db.session.execute(sa.insert(sa.table(table, *cols)).values(**values)).lastrowid
+
+
+def seed_pre_rollup_responses():
+    """A campaign with responses written before rollups/comments were maintained on submit."""
+    now = datetime.utcnow()
+    survey_id = _insert('surveys', title='Comedor', category='COMEDOR', schema_json=SCHEMA,
+                        created_at=now, updated_at=now)
+    campaign_id = _insert('campaigns', token='tok', survey_id=survey_id, name='Vieja',
+                          snapshot_json={'category': 'COMEDOR', 'schema': SCHEMA}, is_active=True,
+                          require_area=False, require_shift=False, created_at=now)
+    for answers, followup, shift in (
+        ({'q_satisfaccion': '5', 'q_comentario': 'Rica'}, False, 'T1'),
+        ({'q_satisfaccion': {'value': '1'}, 'q_motivo': 'otro', 'q_comentario': '  '}, True, None),
+        ({'q_motivo': ['sabor'], 'q_comentario': {'text': 'Fría'}}, False, 'T2'),
+        ('legacy', False, None),
+    ):
+        _insert('responses', campaign_id=campaign_id, submitted_at=now, lang='es', wants_followup=followup,
+                shift=shift, answers_json=answers, source='kiosko')
+    db.session.commit()
+    return campaign_id
+
+
+def test_rollups_are_filled_for_existing_responses(bare_app):
+    from app.services.rollups import count_responses, load_counters, question_kinds, rollup_count
+
+    upgrade(directory=MIGRATIONS, revision='b5e0c7d21f46')
+    campaign_id = seed_pre_rollup_responses()
+    upgrade(directory=MIGRATIONS, revision='d3a8f5b2c640')
+
+    assert load_counters(campaign_id) == count_responses(campaign_id, question_kinds({'schema': SCHEMA}))
+    assert rollup_count(campaign_id, 'total') == 4
+    assert rollup_count(campaign_id, 'followup') == 1
+
+
+def test_existing_comments_are_indexed(bare_app):
+    from app.models import ResponseComment
+    from app.services.comment_search import search_comments
+    from app.services.rollups import COMMENTS, rollup_count
+
+    upgrade(directory=MIGRATIONS, revision='b5e0c7d21f46')
+    campaign_id = seed_pre_rollup_responses()
+    upgrade(directory=MIGRATIONS)
+
+    texts = sorted(c.text for c in ResponseComment.query.filter_by(campaign_id=campaign_id))
+    assert texts == ['Fría', 'Rica']
+    assert rollup_count(campaign_id, COMMENTS) == 2
+    rows, _ = search_comments(campaign_id, 'rica', limit=10, offset=0)
+    assert [r['text'] for r in rows] == ['Rica']
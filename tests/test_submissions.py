@@ -0,0 +1,117 @@
+import pytest
+
+from app.models import CampaignRollup, Response
+
+
+@pytest.mark.parametrize('answers', ['x', ['5'], 5, True])
+def test_submit_rejects_non_object_answers(client, make_campaign, answers):
+    c = make_campaign()
+    res = client.post(f'/api/submit/{c.token}', json={'answers': answers})
+    assert res.status_code == 400
+    assert res.get_json() == {'error': 'invalid_answers'}
+    assert Response.query.count() == 0
+    assert CampaignRollup.query.count() == 0
+
+
+def test_submit_without_answers_is_stored(client, make_campaign):
+    c = make_campaign()
+    res = client.post(f'/api/submit/{c.token}', json={'shift': 'T1'})
+    assert res.status_code == 200
+    assert Response.query.one().answers_json == {}
+
+
+def _item(token, **payload):
+    return {'token': token, 'payload': payload}
+
+
+def test_batch_reports_bad_items_without_failing_the_rest(client, make_campaign):
+    c = make_campaign()
+    items = [
+        _item(c.token, answers={'q_satisfaccion': '5'}),
+        _item(c.token, lang=5),
+        _item(c.token, answers='x'),
+        _item(c.token, wants_followup=True, contact_name=['Ana'], employee_no='12'),
+        _item('missing'),
+        _item(c.token, answers={'q_satisfaccion': '4'}),
+    ]
+    res = client.post('/api/submit/batch', json={'items': items})
+    assert res.status_code == 200
+    results = res.get_json()['results']
+    assert [r['ok'] for r in results] == [True, False, False, False, False, True]
+    assert [r.get('error') for r in results[1:5]] == ['invalid_payload', 'invalid_answers', 'invalid_payload', 'not_found']
+    assert [r['status'] for r in results[1:5]] == [400, 400, 400, 404]
+    assert Response.query.count() == 2
+
+
+def test_batch_isolates_items_that_fail_to_store(client, make_campaign, monkeypatch):
+    import app.services.submissions as submissions
+
+    apply_rollups = submissions.apply_rollups
+
+    def flaky(rows):
+        if any(r['source'] == 'boom' for r in rows):
+            raise RuntimeError('boom')
+        apply_rollups(rows)
+
+    monkeypatch.setattr(submissions, 'apply_rollups', flaky)
+    c = make_campaign()
+    items = [_item(c.token), _item(c.token, source='boom'), _item(c.token)]
+    res = client.post('/api/submit/batch', json={'items': items})
+    assert res.status_code == 200
+    results = res.get_json()['results']
+    assert [r['ok'] for r in results] == [True, False, True]
+    assert results[1]['status'] == 500
+    assert Response.query.count() == 2
+    assert CampaignRollup.query.filter_by(dimension='total').one().count == 2
+
+
+SID = '3f2b8a51-6c1d-4e7a-9b0f-2d4c6e8a1b3c'
+
+
+def test_resubmitting_a_submission_id_returns_the_original(client, make_campaign):
+    c = make_campaign()
+    first = client.post(f'/api/submit/{c.token}', json={'submission_id': SID, 'answers': {'q_satisfaccion': '5'}})
+    again = client.post(f'/api/submit/{c.token}', json={'submission_id': SID, 'answers': {'q_satisfaccion': '5'}})
+    assert first.get_json() == {'ok': True, 'id': first.get_json()['id']}
+    assert again.get_json() == {'ok': True, 'id': first.get_json()['id'], 'duplicate': True}
+    assert Response.query.count() == 1
+    assert CampaignRollup.query.filter_by(dimension='total').one().count == 1
+
+
+def test_batch_stores_a_repeated_submission_id_once(client, make_campaign):
+    c = make_campaign()
+    other = '9a1c3e5f-7b2d-4f6a-8c0e-1b3d5f7a9c2e'
+    items = [_item(c.token, submission_id=SID), _item(c.token, submission_id=other), _item(c.token, submission_id=SID)]
+    results = client.post('/api/submit/batch', json={'items': items}).get_json()['results']
+    assert [r['ok'] for r in results] == [True, True, True]
+    assert 'duplicate' not in results[0] and 'duplicate' not in results[1]
+    assert results[2]['duplicate'] is True
+    assert results[2]['id'] == results[0]['id']
+    assert Response.query.count() == 2
+
+    # the whole batch retried (e.g. the reply was lost): nothing new is stored
+    retry = client.post('/api/submit/batch', json={'items': items}).get_json()['results']
+    assert [(r['id'], r['duplicate']) for r in retry] == [(r['id'], True) for r in results]
+    assert Response.query.count() == 2
+
+
+def test_concurrent_insert_of_the_same_submission_id(client, make_campaign, monkeypatch):
+    """The lookup misses a row stored concurrently: the unique index rejects ours and we retry."""
+    import app.services.submissions as submissions
+
+    c = make_campaign()
+    original = client.post(f'/api/submit/{c.token}', json={'submission_id': SID}).get_json()['id']
+
+    find = submissions.find_submissions
+    calls = []
+
+    def racing_find(sids):
+        calls.append(1)
+        return {} if len(calls) == 1 else find(sids)  # first lookup ran before the other commit
+
+    monkeypatch.setattr(submissions, 'find_submissions', racing_find)
+    res = client.post(f'/api/submit/{c.token}', json={'submission_id': SID}).get_json()
+    assert res == {'ok': True, 'id': original, 'duplicate': True}
+    assert len(calls) == 2
+    assert Response.query.count() == 1
+    assert CampaignRollup.query.filter_by(dimension='total').one().count == 1